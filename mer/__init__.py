@@ -1,6 +1,27 @@
-from .mer import Mer, ensure_artifacts, ArtifactPaths
 from .postprocess import postprocess_text
 
+_LAZY_ATTRS = {
+    "Mer": ".mer",
+    "ArtifactPaths": ".artifacts",
+    "ensure_artifacts": ".artifacts",
+}
+
+
+def __getattr__(name: str):
+    # Keep `import mer` cheap: the recognizer (and its heavy dependencies) load on first use.
+    if name in _LAZY_ATTRS:
+        from importlib import import_module
+
+        value = getattr(import_module(_LAZY_ATTRS[name], __name__), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY_ATTRS))
+
+
 __all__ = [
     "Mer",
     "ArtifactPaths",
@@ -0,0 +1,40 @@
+"""
+Deferred imports for heavy dependencies.
+
+`import mer` only needs the standard library; NumPy, Pillow, ONNX Runtime and the Hugging Face
+client are loaded the first time one of their attributes is used (i.e. when a `Mer`/`Predictor`
+is built, an image is processed, or a download actually happens).
+"""
+from __future__ import annotations
+
+import importlib.util
+import sys
+from types import ModuleType
+
+
+def lazy_import(name: str) -> ModuleType:
+    """
+    Return `name` as a module whose body executes on first attribute access.
+    Already-imported modules are returned as is.
+    """
+    module = sys.modules.get(name)
+    if module is not None:
+        return module
+    spec = importlib.util.find_spec(name)
+    if spec is None or spec.loader is None:
+        raise ModuleNotFoundError(f"No module named {name!r}", name=name)
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    return module
+
+
+def is_loaded(name: str) -> bool:
+    """True when `name` has been imported and its body has actually run."""
+    module = sys.modules.get(name)
+    return module is not None and not isinstance(module, importlib.util._LazyModule)
+
+
+__all__ = ["lazy_import", "is_loaded"]
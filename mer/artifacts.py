@@ -5,19 +5,104 @@ from pathlib import Path
 import sys
 from typing import Optional, Union
 
-from huggingface_hub import hf_hub_download
-from tqdm.auto import tqdm
-
-from .constants import CONFIG_FILENAME, DEFAULT_CACHE_DIR, MODEL_FILENAME, REPO_ID
+from .constants import (
+    CONFIG_FILENAME,
+    DECODER_FILENAME,
+    DEFAULT_CACHE_DIR,
+    ENCODER_FILENAME,
+    MODEL_FILENAME,
+    PRECISIONS,
+    REPO_ID,
+)
 
 PathLike = Union[str, "os.PathLike[str]"]  # noqa: F821 - narrow typing without importing os here
 
 
+def __getattr__(name: str):
+    # The Hugging Face client and tqdm are only imported once a download is actually needed.
+    if name == "hf_hub_download":
+        from huggingface_hub import hf_hub_download
+
+        return hf_hub_download
+    if name == "tqdm":
+        from tqdm.auto import tqdm
+
+        return tqdm
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
 @dataclass(frozen=True, slots=True)
 class ArtifactPaths:
     base_dir: Path
     weights: Path
     config: Path
+    encoder: Optional[Path] = None
+    decoder: Optional[Path] = None
+    precision: str = "fp32"
+    last_position: bool = False
+
+    @property
+    def is_split(self) -> bool:
+        return self.encoder is not None and self.decoder is not None
+
+
+def precision_filename(filename: str, precision: str) -> str:
+    """`khmer_ocr.onnx` -> `khmer_ocr_int8.onnx`; fp32 names are unchanged."""
+    if precision == "fp32":
+        return filename
+    path = Path(filename)
+    return f"{path.stem}_{precision}{path.suffix}"
+
+
+def _with_split_graphs(base_dir: Path, weights: Path, config: Path, split: bool) -> ArtifactPaths:
+    encoder_path = base_dir / ENCODER_FILENAME
+    decoder_path = base_dir / DECODER_FILENAME
+    if split and not (encoder_path.exists() and decoder_path.exists()):
+        from .export import split_model
+
+        encoder_path, decoder_path = split_model(weights, output_dir=base_dir)
+    if encoder_path.exists() and decoder_path.exists():
+        return ArtifactPaths(base_dir, weights, config, encoder_path, decoder_path)
+    return ArtifactPaths(base_dir, weights, config)
+
+
+def _with_last_position(paths: ArtifactPaths, enabled: bool) -> ArtifactPaths:
+    """Swap the per-step graph (decoder, or the monolithic model) for its last-position rewrite."""
+    if not enabled:
+        return paths
+    step_graph = paths.decoder if paths.is_split else paths.weights
+    rewritten = step_graph.with_name(f"{step_graph.stem}_lastpos{step_graph.suffix}")
+    if not rewritten.exists():
+        from .export import gather_last_position
+
+        gather_last_position(step_graph, rewritten)
+    if paths.is_split:
+        return ArtifactPaths(paths.base_dir, paths.weights, paths.config, paths.encoder, rewritten, last_position=True)
+    return ArtifactPaths(paths.base_dir, rewritten, paths.config, last_position=True)
+
+
+def _with_precision(paths: ArtifactPaths, precision: str) -> ArtifactPaths:
+    """Point every graph at its `precision` variant, quantizing the fp32 graph when missing."""
+    if precision == "fp32":
+        return paths
+
+    def variant(source: Path) -> Path:
+        target = source.with_name(precision_filename(source.name, precision))
+        if not target.exists():
+            from .export import quantize_model
+
+            quantize_model(source, target)
+        return target
+
+    return ArtifactPaths(
+        paths.base_dir,
+        variant(paths.weights),
+        paths.config,
+        variant(paths.encoder) if paths.encoder else None,
+        variant(paths.decoder) if paths.decoder else None,
+        precision=precision,
+        last_position=paths.last_position,
+    )
 
 
 def ensure_artifacts(
@@ -27,12 +112,24 @@ def ensure_artifacts(
     config_filename: str = CONFIG_FILENAME,
     show_progress: bool = True,
     local_dir: Optional[PathLike] = None,
+    split: bool = False,
+    precision: str = "fp32",
+    last_position: bool = False,
 ) -> ArtifactPaths:
     """
     Make sure model weights and config exist locally, downloading from Hugging Face if missing.
     If `local_dir` is provided, the function will use files from that directory and never attempt
     to download.
+    Split encoder/decoder graphs found next to the weights are reported as well; with `split=True`
+    they are generated from the monolithic model when missing (requires `onnx`).
+    `precision="int8"` resolves dynamically quantized graphs instead: the int8 weights are
+    downloaded from the repo when published there, otherwise every graph in use is quantized
+    once from its fp32 counterpart and stored next to it (requires `onnx`).
+    `last_position=True` swaps the graph run on every decoding step for a rewrite that only
+    computes the logits of the current position (see `mer.export.gather_last_position`).
     """
+    if precision not in PRECISIONS:
+        raise ValueError(f"precision must be one of {PRECISIONS}, got {precision!r}")
     base_dir = Path(local_dir).expanduser() if local_dir else Path(cache_dir).expanduser()
     if not local_dir:
         base_dir.mkdir(parents=True, exist_ok=True)
@@ -46,13 +143,18 @@ def ensure_artifacts(
             raise FileNotFoundError(
                 f"Expected local model files in {base_dir}, missing: {', '.join(missing)}"
             )
-        return ArtifactPaths(base_dir, weights_path, config_path)
+        paths = _with_split_graphs(base_dir, weights_path, config_path, split)
+        return _with_precision(_with_last_position(paths, last_position), precision)
 
-    missing_files = [path for path in (weights_path, config_path) if not path.exists()]
-    progress: Optional[tqdm] = None
+    wanted = [weights_path, config_path]
+    if precision != "fp32" and not last_position:
+        wanted.append(base_dir / precision_filename(model_filename, precision))
+    missing_files = [path for path in wanted if not path.exists()]
+    progress: Optional["tqdm"] = None  # noqa: F821
+    this_module = sys.modules[__name__]  # resolves the lazy download helpers via __getattr__
     if missing_files:
         display_progress = show_progress and sys.stderr.isatty()
-        progress = tqdm(
+        progress = this_module.tqdm(
             total=len(missing_files),
             desc="Downloading Mer artifacts",
             unit="file",
@@ -63,7 +165,7 @@ def ensure_artifacts(
         if target.exists():
             return target
         try:
-            downloaded = hf_hub_download(
+            downloaded = this_module.hf_hub_download(
                 repo_id=repo_id,
                 filename=filename,
                 local_dir=base_dir,
@@ -78,10 +180,17 @@ def ensure_artifacts(
     try:
         weights_path = _download(model_filename, weights_path)
         config_path = _download(config_filename, config_path)
+        for quantized_path in wanted[2:]:
+            try:
+                _download(quantized_path.name, quantized_path)
+            except RuntimeError:
+                if progress:
+                    progress.update()  # not published upstream; quantized locally below
     finally:
         if progress:
             progress.close()
-    return ArtifactPaths(base_dir, weights_path, config_path)
+    paths = _with_split_graphs(base_dir, weights_path, config_path, split)
+    return _with_precision(_with_last_position(paths, last_position), precision)
 
 
-__all__ = ["ArtifactPaths", "ensure_artifacts"]
+__all__ = ["ArtifactPaths", "ensure_artifacts", "precision_filename"]
@@ -0,0 +1,197 @@
+from __future__ import annotations
+
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Iterable, List, Optional, Sequence, Union
+
+from ._lazy import lazy_import
+from .bulk import list_images
+from .constants import DEFAULT_SAMPLES_DIR
+
+np = lazy_import("numpy")
+Image = lazy_import("PIL.Image")
+
+PathLike = Union[str, os.PathLike]
+
+
+def default_inputs() -> List[Path]:
+    """The bundled `samples/sample_*.png` pages (annotated copies excluded)."""
+    return [p for p in sorted(DEFAULT_SAMPLES_DIR.glob("sample_*.png")) if not p.stem.endswith("_annotated")]
+
+
+_IMPORT_PROBE = (
+    "import time; start = time.perf_counter(); import mer; from mer import Mer; "
+    "print(time.perf_counter() - start)"
+)
+
+
+def _ms(seconds: float) -> float:
+    return round(seconds * 1000.0, 3)
+
+
+def _percentiles(samples_s: Sequence[float]) -> dict:
+    values = np.asarray(samples_s, dtype=np.float64) * 1000.0
+    if values.size == 0:
+        return {}
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {
+        "count": int(values.size),
+        "mean": round(float(values.mean()), 3),
+        "p50": round(float(p50), 3),
+        "p95": round(float(p95), 3),
+        "p99": round(float(p99), 3),
+        "max": round(float(values.max()), 3),
+    }
+
+
+def measure_import_time() -> float:
+    """Seconds for `import mer` + resolving `mer.Mer` in a fresh interpreter."""
+    result = subprocess.run(
+        [sys.executable, "-c", _IMPORT_PROBE],
+        capture_output=True,
+        text=True,
+        check=True,
+        cwd=str(Path(__file__).resolve().parents[1]),
+    )
+    return float(result.stdout.strip().splitlines()[-1])
+
+
+def load_lines(inputs: Iterable[PathLike], segment: bool = True) -> List["Image.Image"]:
+    """
+    Line images to benchmark with. Directories are scanned for images; with `segment`, each
+    image is split into lines first (the bundled samples are paragraphs).
+    """
+    from .segment import crop_lines, segment_lines
+
+    paths: List[Path] = []
+    for source in inputs:
+        path = Path(source).expanduser()
+        paths.extend(list_images(path) if path.is_dir() else [path])
+    lines: List[Image.Image] = []
+    for path in paths:
+        image = Image.open(path).convert("RGB")
+        if not segment:
+            lines.append(image)
+            continue
+        page = np.asarray(image)
+        lines.extend(Image.fromarray(crop) for crop in crop_lines(page, segment_lines(page)))
+    return lines
+
+
+def _package_version() -> str:
+    try:
+        from importlib.metadata import version
+
+        return version("mer")
+    except Exception:  # noqa: BLE001 - running from a source checkout
+        return "unknown"
+
+
+def run_benchmark(
+    inputs: Optional[Iterable[PathLike]] = None,
+    batch_sizes: Sequence[int] = (1, 4, 16),
+    threads: Sequence[Optional[int]] = (None,),
+    repeats: int = 3,
+    segment: bool = True,
+    **mer_kwargs,
+) -> dict:
+    """
+    Measure cold start, first-call latency, steady-state per-line latency, decode steps per
+    line and throughput across batch sizes and ONNX Runtime thread counts. Extra keyword
+    arguments are forwarded to `Mer`. Returns a JSON-serializable report.
+    """
+    from .artifacts import ensure_artifacts
+    from .constants import DEFAULT_CACHE_DIR, REPO_ID
+    from .mer import Mer
+
+    import_s = min(measure_import_time() for _ in range(3))  # best of three: scheduling noise only adds time
+    start = time.perf_counter()
+    ensure_artifacts(
+        cache_dir=mer_kwargs.get("cache_dir", DEFAULT_CACHE_DIR),
+        repo_id=mer_kwargs.get("repo_id", REPO_ID),
+        local_dir=mer_kwargs.get("model_path"),
+        show_progress=False,
+    )
+    artifacts_s = time.perf_counter() - start
+
+    lines = load_lines(inputs if inputs is not None else default_inputs(), segment=segment)
+    if not lines:
+        raise ValueError("No images found to benchmark")
+
+    start = time.perf_counter()
+    ocr = Mer(postprocess=False, **mer_kwargs)
+    session_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    ocr.recognize_line(lines[0])
+    first_call_s = time.perf_counter() - start
+
+    latencies: List[float] = []
+    steps: List[int] = []
+    for _ in range(max(1, repeats)):
+        steps = []
+        for line in lines:
+            start = time.perf_counter()
+            result = ocr.recognize_line(line, return_stats=True)
+            latencies.append(time.perf_counter() - start)
+            steps.append(result["stats"]["decode_steps"])
+
+    throughput = []
+    for thread_count in threads:
+        runner = ocr if thread_count is None else Mer(postprocess=False, intra_op_num_threads=thread_count, **mer_kwargs)
+        for batch_size in batch_sizes:
+            runner.recognize_lines(lines[:batch_size], batch_size=batch_size)  # warm-up
+            start = time.perf_counter()
+            for _ in range(max(1, repeats)):
+                runner.recognize_lines(lines, batch_size=batch_size)
+            elapsed = time.perf_counter() - start
+            throughput.append(
+                {
+                    "threads": thread_count,
+                    "batch_size": batch_size,
+                    "lines_per_sec": round(len(lines) * max(1, repeats) / elapsed, 3),
+                }
+            )
+
+    ort = sys.modules.get("onnxruntime")
+    return {
+        "meta": {
+            "mer_version": _package_version(),
+            "onnxruntime_version": getattr(ort, "__version__", None),
+            "providers": ocr._predictor.session.get_providers(),
+            "split": ocr._predictor.is_split,
+            "incremental": ocr._predictor.is_incremental,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        },
+        "lines": len(lines),
+        "cold_start_ms": {
+            "import": _ms(import_s),
+            "ensure_artifacts": _ms(artifacts_s),
+            "session_creation": _ms(session_s),
+        },
+        "first_call_ms": _ms(first_call_s),
+        "latency_ms": _percentiles(latencies),
+        "decode_steps_per_line": {
+            "mean": round(float(np.mean(steps)), 3),
+            "max": int(max(steps)),
+        },
+        "throughput": throughput,
+    }
+
+
+def write_report(report: dict, output_path: PathLike) -> Path:
+    output_path = Path(output_path).expanduser()
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    output_path.write_text(json.dumps(report, indent=2, ensure_ascii=False) + "\n", encoding="utf-8")
+    return output_path
+
+
+__all__ = ["run_benchmark", "write_report", "load_lines", "measure_import_time"]
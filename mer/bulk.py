@@ -0,0 +1,160 @@
+from __future__ import annotations
+
+import json
+import multiprocessing
+import os
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Union
+
+from .pool import default_intra_op_threads
+
+PathLike = Union[str, os.PathLike]
+
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".bmp", ".tif", ".tiff", ".webp")
+
+_WORKER_MER = None  # one recognizer per worker process, built by _init_worker
+
+
+def _build_mer(mer_kwargs: dict, threads: int):
+    from .mer import Mer
+
+    kwargs = dict(mer_kwargs)
+    kwargs.setdefault("intra_op_num_threads", threads)
+    kwargs.setdefault("inter_op_num_threads", 1)
+    return Mer(**kwargs)
+
+
+def _init_worker(mer_kwargs: dict, threads: int) -> None:
+    global _WORKER_MER
+    # Pin thread pools before ONNX Runtime/NumPy are loaded in this process.
+    for var in ("OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS"):
+        os.environ[var] = str(threads)
+    _WORKER_MER = _build_mer(mer_kwargs, threads)
+
+
+def _recognize_chunk(paths: List[str]) -> List[Dict[str, str]]:
+    return _recognize_with(_WORKER_MER, paths)
+
+
+def _recognize_with(mer, paths: List[str]) -> List[Dict[str, str]]:
+    """Decode and recognize one chunk; failures are isolated per file."""
+    try:
+        texts = mer.recognize_lines(paths, batch_size=len(paths))
+        return [{"path": path, "text": text} for path, text in zip(paths, texts)]
+    except Exception:
+        records = []
+        for path in paths:
+            try:
+                records.append({"path": path, "text": mer.recognize_line(path)})
+            except Exception as exc:  # noqa: BLE001 - reported in the output record
+                records.append({"path": path, "error": f"{type(exc).__name__}: {exc}"})
+        return records
+
+
+def _chunks(paths: Iterable[PathLike], chunk_size: int) -> Iterator[List[str]]:
+    chunk: List[str] = []
+    for path in paths:
+        chunk.append(str(path))
+        if len(chunk) == chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def recognize_paths(
+    paths: Iterable[PathLike],
+    processes: Optional[int] = None,
+    chunk_size: int = 16,
+    ordered: bool = True,
+    start_method: str = "spawn",
+    **mer_kwargs,
+) -> Iterator[Dict[str, str]]:
+    """
+    Recognize many line images with a pool of worker processes.
+
+    Each worker builds one `Mer` (extra keyword arguments are forwarded to it), reads and
+    decodes its own files so no pixel data crosses process boundaries, and runs with
+    `cpu_count // processes` ONNX Runtime threads. Chunks of `chunk_size` paths are decoded
+    as one batch. Yields `{"path", "text"}` records (or `{"path", "error"}` for files that
+    fail) in input order, or in completion order with `ordered=False`.
+    `processes=1` runs in the calling process.
+    """
+    if chunk_size < 1:
+        raise ValueError("chunk_size must be at least 1")
+    processes = processes or os.cpu_count() or 1
+    threads = default_intra_op_threads(processes)
+    chunks = _chunks(paths, chunk_size)
+
+    if processes == 1:
+        mer = _build_mer(mer_kwargs, threads)
+        for chunk in chunks:
+            yield from _recognize_with(mer, chunk)
+        return
+
+    context = multiprocessing.get_context(start_method)
+    with context.Pool(processes, initializer=_init_worker, initargs=(mer_kwargs, threads)) as pool:
+        mapper = pool.imap if ordered else pool.imap_unordered
+        for records in mapper(_recognize_chunk, chunks):
+            yield from records
+
+
+def list_images(directory: PathLike, recursive: bool = True) -> List[Path]:
+    """Image files under `directory`, sorted for a stable processing order."""
+    root = Path(directory).expanduser()
+    if not root.is_dir():
+        raise NotADirectoryError(f"Not a directory: {root}")
+    candidates = root.rglob("*") if recursive else root.glob("*")
+    return sorted(p for p in candidates if p.is_file() and p.suffix.lower() in IMAGE_EXTENSIONS)
+
+
+def completed_paths(output_path: PathLike) -> Set[str]:
+    """Paths already recorded in a JSONL results file; a truncated trailing line is ignored."""
+    done: Set[str] = set()
+    output_path = Path(output_path).expanduser()
+    if not output_path.exists():
+        return done
+    with open(output_path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if "text" in record:
+                done.add(record["path"])
+    return done
+
+
+def _ends_with_newline(path: Path) -> bool:
+    with open(path, "rb") as f:
+        f.seek(-1, os.SEEK_END)
+        return f.read(1) == b"\n"
+
+
+def run_bulk(
+    inputs: Iterable[PathLike],
+    output_path: PathLike,
+    resume: bool = True,
+    **kwargs,
+) -> int:
+    """
+    Recognize `inputs` into a JSONL file, one record per line, flushed as results arrive.
+    With `resume`, paths that already have a successful record are skipped and new records
+    are appended. Returns the number of records written.
+    """
+    output_path = Path(output_path).expanduser()
+    done = completed_paths(output_path) if resume else set()
+    todo = [str(path) for path in inputs if str(path) not in done]
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    written = 0
+    with open(output_path, "a" if resume else "w", encoding="utf-8") as out:
+        if resume and out.tell() > 0 and not _ends_with_newline(output_path):
+            out.write("\n")  # terminate a record truncated by an interrupted run
+        for record in recognize_paths(todo, **kwargs):
+            out.write(json.dumps(record, ensure_ascii=False) + "\n")
+            out.flush()
+            written += 1
+    return written
+
+
+__all__ = ["recognize_paths", "run_bulk", "list_images", "completed_paths", "IMAGE_EXTENSIONS"]
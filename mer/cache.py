@@ -0,0 +1,124 @@
+from __future__ import annotations
+
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Iterable, Optional, Union
+
+from ._lazy import lazy_import
+
+sqlite3 = lazy_import("sqlite3")
+
+PathLike = Union[str, os.PathLike]
+
+CACHE_DB_FILENAME = "recognition_cache.sqlite3"
+
+
+def model_identity(paths: Iterable[Optional[PathLike]], **settings: object) -> str:
+    """
+    Cheap fingerprint of the model files (name, size, mtime) plus decoding settings, so a
+    re-exported model or a different `max_length` never reuses stale results.
+    """
+    parts = []
+    for path in paths:
+        if path is None:
+            continue
+        path = Path(path)
+        stat = path.stat()
+        parts.append(f"{path.name}:{stat.st_size}:{stat.st_mtime_ns}")
+    parts.extend(f"{key}={value}" for key, value in sorted(settings.items()))
+    return "|".join(parts)
+
+
+class RecognitionCache:
+    """
+    Content-addressed cache of recognition results.
+
+    Keys hash the decoded pixel buffer (mode, size and raw bytes) together with a model
+    identity string. A bounded in-memory LRU sits in front of an optional SQLite file;
+    disk hits are promoted back into memory. Safe to share between threads.
+    """
+
+    def __init__(self, max_entries: int = 4096, namespace: str = "", disk_path: Optional[PathLike] = None) -> None:
+        if max_entries < 1:
+            raise ValueError("max_entries must be at least 1")
+        self.max_entries = int(max_entries)
+        self.namespace = namespace.encode("utf-8")
+        self._entries: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._db: Optional[sqlite3.Connection] = None
+        if disk_path is not None:
+            disk_path = Path(disk_path).expanduser()
+            disk_path.parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(str(disk_path), check_same_thread=False, isolation_level=None)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, text TEXT NOT NULL)")
+
+    def key_for(self, image) -> str:
+        """Key for a decoded PIL image."""
+        digest = hashlib.blake2b(self.namespace, digest_size=16)
+        digest.update(f"{image.mode}:{image.size[0]}x{image.size[1]}|".encode("ascii"))
+        digest.update(image.tobytes())
+        return digest.hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            text = self._entries.get(key)
+            if text is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return text
+            if self._db is not None:
+                row = self._db.execute("SELECT text FROM results WHERE key = ?", (key,)).fetchone()
+                if row is not None:
+                    self.disk_hits += 1
+                    self._remember(key, row[0])
+                    return row[0]
+            self.misses += 1
+            return None
+
+    def put(self, key: str, text: str) -> None:
+        with self._lock:
+            self._remember(key, text)
+            if self._db is not None:
+                self._db.execute("INSERT OR REPLACE INTO results (key, text) VALUES (?, ?)", (key, text))
+
+    def _remember(self, key: str, text: str) -> None:
+        self._entries[key] = text
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "disk": self._db is not None,
+            }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM results")
+
+    def close(self) -> None:
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+
+__all__ = ["RecognitionCache", "model_identity", "CACHE_DB_FILENAME"]
@@ -0,0 +1,211 @@
+from __future__ import annotations
+
+import argparse
+from typing import List, Optional
+
+from .constants import DECODE_MODES, DEFAULT_SAMPLES_DIR, MODEL_FILENAME, PRECISIONS
+
+
+def _cmd_split(args: argparse.Namespace) -> int:
+    from .export import split_model
+
+    encoder_path, decoder_path = split_model(args.model, output_dir=args.output_dir)
+    print(f"encoder: {encoder_path}")
+    print(f"decoder: {decoder_path}")
+    return 0
+
+
+def _cmd_last_position(args: argparse.Namespace) -> int:
+    from .export import gather_last_position
+
+    print(gather_last_position(args.model, output_path=args.out, emit=args.emit))
+    return 0
+
+
+def _add_model_args(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--model-path", default=None, help="Folder with local model files (skips downloads).")
+    parser.add_argument("--cache-dir", default=None, help="Where downloaded artifacts are stored.")
+    parser.add_argument("--device", default="cuda", help="'cpu' or 'cuda' (falls back to CPU).")
+    parser.add_argument(
+        "--optimized-cache", action="store_true", help="Save/reuse optimized ONNX Runtime graphs under the cache dir."
+    )
+    parser.add_argument("--precision", choices=PRECISIONS, default="fp32", help="Model weights to run (int8 is quantized).")
+    parser.add_argument("--decode", choices=DECODE_MODES, default="greedy", help="Decoding strategy.")
+    parser.add_argument("--beam-width", type=int, default=4, help="Hypotheses per line with --decode beam.")
+
+
+def _mer_kwargs(args: argparse.Namespace) -> dict:
+    kwargs = {"device": args.device}
+    if args.model_path:
+        kwargs["model_path"] = args.model_path
+    if args.cache_dir:
+        kwargs["cache_dir"] = args.cache_dir
+    if args.optimized_cache:
+        kwargs["optimized_cache"] = True
+    if args.precision != "fp32":
+        kwargs["precision"] = args.precision
+    if args.decode != "greedy":
+        kwargs["decode"] = args.decode
+        kwargs["beam_width"] = args.beam_width
+    return kwargs
+
+
+def _cmd_bulk(args: argparse.Namespace) -> int:
+    from pathlib import Path
+
+    from .bulk import list_images, run_bulk
+
+    inputs: List[Path] = []
+    for source in args.inputs:
+        path = Path(source).expanduser()
+        inputs.extend(list_images(path, recursive=not args.no_recursive) if path.is_dir() else [path])
+    written = run_bulk(
+        inputs,
+        args.out,
+        resume=not args.overwrite,
+        processes=args.processes,
+        chunk_size=args.chunk_size,
+        ordered=not args.unordered,
+        **_mer_kwargs(args),
+    )
+    print(f"wrote {written} records to {args.out}")
+    return 0
+
+
+def _int_list(value: str) -> List[int]:
+    return [int(part) for part in value.split(",") if part.strip()]
+
+
+def _cmd_bench(args: argparse.Namespace) -> int:
+    from .bench import run_benchmark, write_report
+
+    report = run_benchmark(
+        inputs=args.inputs or None,
+        batch_sizes=args.batch_sizes,
+        threads=args.threads or (None,),
+        repeats=args.repeats,
+        segment=not args.no_segment,
+        **_mer_kwargs(args),
+    )
+    write_report(report, args.out)
+    latency = report["latency_ms"]
+    print(
+        f"{report['lines']} lines | first call {report['first_call_ms']} ms | "
+        f"p50 {latency['p50']} ms p95 {latency['p95']} ms p99 {latency['p99']} ms"
+    )
+    for row in report["throughput"]:
+        print(f"threads={row['threads']} batch={row['batch_size']}: {row['lines_per_sec']} lines/s")
+    print(f"report written to {args.out}")
+    import_ms = report["cold_start_ms"]["import"]
+    if args.max_import_ms is not None and import_ms > args.max_import_ms:
+        print(f"import took {import_ms} ms, more than {args.max_import_ms} ms")
+        return 1
+    return 0
+
+
+def _cmd_check(args: argparse.Namespace) -> int:
+    from .evaluate import compare_precisions
+
+    kwargs = _mer_kwargs(args)
+    candidate = kwargs.pop("precision", "int8")
+    report = compare_precisions(args.samples, precisions=("fp32", candidate), **kwargs)
+    for precision in ("fp32", candidate):
+        result = report[precision]
+        print(f"{precision}: CER {result['cer']:.4f} | {result['seconds']} s | {result['model_mb']} MB")
+    print(f"CER delta ({candidate} - fp32): {report['cer_delta']:+.4f}")
+    if args.max_delta is not None and report["cer_delta"] > args.max_delta:
+        print(f"CER delta exceeds {args.max_delta}")
+        return 1
+    return 0
+
+
+def _cmd_serve(args: argparse.Namespace) -> int:
+    from .server import serve
+
+    serve(
+        host=args.host,
+        port=args.port,
+        max_body_size=args.max_body_size,
+        batch_max_queue=args.max_queue,
+        batch_max_size=args.max_batch_size,
+        batch_max_wait=args.max_wait,
+        workers=args.workers,
+        **_mer_kwargs(args),
+    )
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="mer", description="Mer Khmer OCR utilities.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    split = subparsers.add_parser(
+        "split",
+        help=f"Split {MODEL_FILENAME} into encoder/decoder graphs for faster decoding.",
+    )
+    split.add_argument("model", help=f"Path to the monolithic {MODEL_FILENAME}.")
+    split.add_argument("--output-dir", default=None, help="Where to write the graphs (defaults to the model's folder).")
+    split.set_defaults(func=_cmd_split)
+
+    last = subparsers.add_parser(
+        "last-position",
+        help="Rewrite a full-sequence decoder to output only the position being decoded.",
+    )
+    last.add_argument("model", help=f"Path to {MODEL_FILENAME} or the split decoder graph.")
+    last.add_argument("--out", default=None, help="Output path (default: <stem>_lastpos.onnx next to the model).")
+    last.add_argument("--emit", choices=("logits", "token"), default="logits", help="Output one logits row or the argmax token.")
+    last.set_defaults(func=_cmd_last_position)
+
+    bulk = subparsers.add_parser("bulk", help="OCR directories or lists of line images into a JSONL file.")
+    bulk.add_argument("inputs", nargs="+", help="Image files and/or directories to scan.")
+    bulk.add_argument("--out", required=True, help="JSONL output; existing results are skipped (resume).")
+    bulk.add_argument("--overwrite", action="store_true", help="Start a fresh output file instead of resuming.")
+    bulk.add_argument("--processes", type=int, default=None, help="Worker processes (default: CPU count).")
+    bulk.add_argument("--chunk-size", type=int, default=16, help="Images per worker task / decode batch.")
+    bulk.add_argument("--unordered", action="store_true", help="Write results in completion order.")
+    bulk.add_argument("--no-recursive", action="store_true", help="Do not descend into subdirectories.")
+    _add_model_args(bulk)
+    bulk.set_defaults(func=_cmd_bulk)
+
+    bench = subparsers.add_parser("bench", help="Measure cold start, latency percentiles and throughput.")
+    bench.add_argument("inputs", nargs="*", help="Images or directories (default: samples/sample_*.png).")
+    bench.add_argument("--out", default="bench.json", help="JSON report path.")
+    bench.add_argument("--batch-sizes", type=_int_list, default=[1, 4, 16], help="Comma-separated, e.g. 1,4,16.")
+    bench.add_argument("--threads", type=_int_list, default=None, help="Comma-separated intra-op thread counts.")
+    bench.add_argument("--repeats", type=int, default=3, help="Passes over the inputs per measurement.")
+    bench.add_argument("--no-segment", action="store_true", help="Treat inputs as line crops (skip segmentation).")
+    bench.add_argument(
+        "--max-import-ms", type=float, default=None, help="Exit with status 1 if `import mer` takes longer (best of 3)."
+    )
+    _add_model_args(bench)
+    bench.set_defaults(func=_cmd_bench)
+
+    check = subparsers.add_parser(
+        "check", help="Compare the character error rate of a quantized model against fp32 on ground-truth samples."
+    )
+    check.add_argument(
+        "--samples", default=str(DEFAULT_SAMPLES_DIR), help="Folder with <name>.png + <name>_text.md pairs."
+    )
+    check.add_argument("--max-delta", type=float, default=None, help="Exit with status 1 if the CER grows by more.")
+    _add_model_args(check)
+    check.set_defaults(func=_cmd_check, precision="int8")
+
+    serve = subparsers.add_parser("serve", help="Serve recognition over HTTP with batching and backpressure.")
+    serve.add_argument("--host", default="127.0.0.1", help="Interface to bind.")
+    serve.add_argument("--port", type=int, default=8000, help="Port to bind (0 picks a free one).")
+    serve.add_argument("--max-batch-size", type=int, default=16, help="Largest batch decoded at once.")
+    serve.add_argument("--max-wait", type=float, default=0.005, help="Seconds to wait for a batch to fill.")
+    serve.add_argument("--max-queue", type=int, default=256, help="Lines allowed to wait before answering 429.")
+    serve.add_argument("--workers", type=int, default=1, help="Batches decoded concurrently.")
+    serve.add_argument("--max-body-size", type=int, default=16 * 1024 * 1024, help="Largest request body in bytes.")
+    _add_model_args(serve)
+    serve.set_defaults(func=_cmd_serve)
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    return args.func(args)
+
+
+__all__ = ["main", "build_parser"]
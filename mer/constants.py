@@ -3,11 +3,27 @@ from pathlib import Path
 REPO_ID = "metythorn/ocr-stn-cnn-transformer-base"
 MODEL_FILENAME = "khmer_ocr.onnx"
 CONFIG_FILENAME = "config.json"
+ENCODER_FILENAME = "khmer_ocr_encoder.onnx"
+DECODER_FILENAME = "khmer_ocr_decoder.onnx"
+OPTIMIZED_DIRNAME = "optimized"
+PRECISIONS = ("fp32", "int8")
+DECODE_MODES = ("greedy", "beam")
+POSITION_INPUT = "position"
+TOKEN_OUTPUT = "next_token"
 DEFAULT_CACHE_DIR = Path.home() / ".mer" / "ocr-stn-cnn-transformer-base"
+DEFAULT_SAMPLES_DIR = Path("samples")
 
 __all__ = [
     "REPO_ID",
     "MODEL_FILENAME",
     "CONFIG_FILENAME",
+    "ENCODER_FILENAME",
+    "DECODER_FILENAME",
+    "OPTIMIZED_DIRNAME",
+    "PRECISIONS",
+    "DECODE_MODES",
+    "POSITION_INPUT",
+    "TOKEN_OUTPUT",
     "DEFAULT_CACHE_DIR",
+    "DEFAULT_SAMPLES_DIR",
 ]
@@ -0,0 +1,84 @@
+from __future__ import annotations
+
+import threading
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from .vocab import Vocabulary
+
+
+class NgramDrafter:
+    """
+    Character n-gram model that proposes likely continuations for speculative decoding.
+
+    Sequences are token ids as produced by `Vocabulary.encode` (`<SOS>` ... `<EOS>`). The
+    table is learned from an optional corpus and keeps learning from every decoded line, so
+    repeated words, headers and the previous line's text are drafted well. Proposals only
+    affect speed: the decoder verifies every drafted token against its own argmax.
+    Safe to share between threads.
+    """
+
+    def __init__(self, order: int = 4, max_contexts: int = 200_000) -> None:
+        if order < 2:
+            raise ValueError("order must be at least 2")
+        self.order = int(order)
+        self.max_contexts = int(max_contexts)
+        self._counts: Dict[Tuple[int, ...], Counter] = {}
+        self._best: Dict[Tuple[int, ...], int] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_texts(cls, vocab: Vocabulary, texts: Iterable[str], order: int = 4, **kwargs) -> "NgramDrafter":
+        """Drafter pre-trained on a lexicon or corpus, one line of text per item."""
+        drafter = cls(order=order, **kwargs)
+        for text in texts:
+            drafter.observe(vocab.encode(text))
+        return drafter
+
+    def __len__(self) -> int:
+        return len(self._counts)
+
+    def observe(self, tokens: Sequence[int]) -> None:
+        """Learn from one decoded sequence (ending with `<EOS>` unless it was cut off)."""
+        tokens = [int(token) for token in tokens]
+        with self._lock:
+            for end in range(1, len(tokens)):
+                nxt = tokens[end]
+                for size in range(1, self.order):
+                    if end - size < 0:
+                        break
+                    context = tuple(tokens[end - size : end])
+                    counts = self._counts.get(context)
+                    if counts is None:
+                        if len(self._counts) >= self.max_contexts:
+                            continue
+                        counts = self._counts[context] = Counter()
+                    counts[nxt] += 1
+                    best = self._best.get(context)
+                    if best is None or counts[nxt] > counts[best]:
+                        self._best[context] = nxt
+
+    def propose(self, tokens: Sequence[int], count: int, stop: Optional[int] = None) -> List[int]:
+        """
+        Up to `count` tokens continuing `tokens`, extending greedily from the longest context
+        seen in training. Stops early at an unseen context or right after drafting `stop`
+        (the `<EOS>` id), since nothing the decoder would verify follows it.
+        """
+        history = [int(token) for token in tokens[-(self.order - 1) :]]
+        draft: List[int] = []
+        while len(draft) < count:
+            nxt = None
+            for size in range(min(self.order - 1, len(history)), 0, -1):
+                nxt = self._best.get(tuple(history[-size:]))
+                if nxt is not None:
+                    break
+            if nxt is None:
+                break
+            draft.append(nxt)
+            if nxt == stop:
+                break
+            history.append(nxt)
+        return draft
+
+
+__all__ = ["NgramDrafter"]
@@ -0,0 +1,101 @@
+from __future__ import annotations
+
+import os
+import time
+from pathlib import Path
+from typing import Iterable, List, Sequence, Tuple, Union
+
+from .constants import DEFAULT_SAMPLES_DIR
+
+PathLike = Union[str, os.PathLike]
+
+_TEXT_SUFFIX = "_text.md"
+
+
+def _edit_distance(reference: str, hypothesis: str) -> int:
+    """Levenshtein distance over characters (two-row dynamic programming)."""
+    if len(reference) < len(hypothesis):
+        reference, hypothesis = hypothesis, reference
+    previous = list(range(len(hypothesis) + 1))
+    for row, ref_char in enumerate(reference, start=1):
+        current = [row]
+        for col, hyp_char in enumerate(hypothesis, start=1):
+            current.append(
+                min(previous[col] + 1, current[col - 1] + 1, previous[col - 1] + (ref_char != hyp_char))
+            )
+        previous = current
+    return previous[-1]
+
+
+def normalize_text(text: str) -> str:
+    """Strip every line and drop blank ones, so layout whitespace does not count as errors."""
+    return "\n".join(line.strip() for line in text.splitlines() if line.strip())
+
+
+def character_error_rate(reference: str, hypothesis: str) -> float:
+    """Edit distance between the normalized texts divided by the reference length."""
+    reference, hypothesis = normalize_text(reference), normalize_text(hypothesis)
+    if not reference:
+        return 0.0 if not hypothesis else 1.0
+    return _edit_distance(reference, hypothesis) / len(reference)
+
+
+def load_samples(directory: PathLike = DEFAULT_SAMPLES_DIR) -> List[Tuple[Path, str]]:
+    """`(image, ground truth)` pairs for every `<name>_text.md` with a `<name>.png` beside it."""
+    directory = Path(directory).expanduser()
+    samples = []
+    for text_path in sorted(directory.glob(f"*{_TEXT_SUFFIX}")):
+        image_path = text_path.with_name(text_path.name[: -len(_TEXT_SUFFIX)] + ".png")
+        if image_path.exists():
+            samples.append((image_path, text_path.read_text(encoding="utf-8")))
+    return samples
+
+
+def evaluate(ocr, samples: Iterable[Tuple[PathLike, str]]) -> dict:
+    """Recognize each sample as a page and report per-sample and aggregate CER."""
+    records = []
+    errors = 0
+    total = 0
+    start = time.perf_counter()
+    for image_path, reference in samples:
+        hypothesis = ocr.recognize_page(image_path)
+        normalized = normalize_text(reference)
+        distance = _edit_distance(normalized, normalize_text(hypothesis))
+        errors += distance
+        total += len(normalized)
+        records.append({"image": str(image_path), "cer": round(distance / max(1, len(normalized)), 4)})
+    return {
+        "cer": round(errors / max(1, total), 4),
+        "seconds": round(time.perf_counter() - start, 3),
+        "samples": records,
+    }
+
+
+def compare_precisions(
+    samples_dir: PathLike = DEFAULT_SAMPLES_DIR,
+    precisions: Sequence[str] = ("fp32", "int8"),
+    **mer_kwargs,
+) -> dict:
+    """
+    Evaluate the model at each precision on the ground-truth samples. The report holds one
+    entry per precision (CER, wall time, model size) and `cer_delta`, the CER of the last
+    precision minus the first.
+    """
+    from .mer import Mer
+
+    samples = load_samples(samples_dir)
+    if not samples:
+        raise ValueError(f"No `*{_TEXT_SUFFIX}` ground-truth samples found in {samples_dir}")
+    report: dict = {}
+    for precision in precisions:
+        ocr = Mer(precision=precision, **mer_kwargs)
+        graphs = [ocr.artifacts.encoder, ocr.artifacts.decoder] if ocr.artifacts.is_split else [ocr.artifacts.weights]
+        result = evaluate(ocr, samples)
+        result["model_mb"] = round(sum(path.stat().st_size for path in graphs) / 2**20, 2)
+        report[precision] = result
+        ocr.close()
+    report["cer_delta"] = round(report[precisions[-1]]["cer"] - report[precisions[0]]["cer"], 4)
+    return report
+
+
+__all__ = ["character_error_rate", "normalize_text", "load_samples", "evaluate", "compare_precisions"]
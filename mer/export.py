@@ -0,0 +1,339 @@
+from __future__ import annotations
+
+import os
+from pathlib import Path
+from typing import Iterable, List, Optional, Set, Tuple, Union
+
+from .constants import DECODER_FILENAME, ENCODER_FILENAME, POSITION_INPUT, TOKEN_OUTPUT
+
+PathLike = Union[str, os.PathLike]
+
+# Per-position ops that can run after the position gather instead of before it.
+_ELEMENTWISE_OPS = {"Relu", "Tanh", "Sigmoid", "Erf", "Gelu", "Cast", "Identity"}
+_BROADCAST_OPS = {"Add", "Sub", "Mul", "Div"}
+_SOFTMAX_OPS = {"Softmax", "LogSoftmax"}
+
+# Conv stays fp32: ConvInteger is slower than the fp32 kernels on most CPUs and the backbone
+# is the most precision-sensitive part of the model.
+DEFAULT_QUANTIZED_OPS = ("MatMul", "Attention", "Gather")
+
+
+def _require_onnx():
+    try:
+        import onnx
+    except ImportError as exc:  # pragma: no cover - depends on optional extra
+        raise ImportError("Graph export utilities require the `onnx` package: pip install 'mer[export]'") from exc
+    return onnx
+
+
+def _node_inputs(node) -> Set[str]:
+    """
+    Names read by a node, including values captured implicitly by control-flow subgraphs.
+    """
+    names = {name for name in node.input if name}
+    for attr in node.attribute:
+        subgraphs = list(attr.graphs)
+        if attr.HasField("g"):
+            subgraphs.append(attr.g)
+        for subgraph in subgraphs:
+            produced = {inp.name for inp in subgraph.input}
+            produced.update(init.name for init in subgraph.initializer)
+            for sub_node in subgraph.node:
+                names.update(name for name in _node_inputs(sub_node) if name not in produced)
+                produced.update(sub_node.output)
+    return names
+
+
+def _with_dependencies(nodes: List[int], static_nodes: List[int], graph_nodes: List) -> List:
+    """
+    Add the constant-only nodes (no graph input upstream) that `nodes` transitively read and
+    return the selection in the original topological order. Nodes are given by index.
+    """
+    needed: Set[str] = set()
+    for idx in nodes:
+        needed.update(_node_inputs(graph_nodes[idx]))
+    selected = set(nodes)
+    for idx in reversed(static_nodes):
+        if any(out in needed for out in graph_nodes[idx].output):
+            selected.add(idx)
+            needed.update(_node_inputs(graph_nodes[idx]))
+    return [graph_nodes[idx] for idx in sorted(selected)]
+
+
+def _build_graph(onnx, source, nodes: List, inputs: Iterable[str], outputs: Iterable[str], value_infos: dict, name: str):
+    consumed: Set[str] = set()
+    for node in nodes:
+        consumed.update(_node_inputs(node))
+    initializers = [init for init in source.graph.initializer if init.name in consumed]
+    graph = onnx.helper.make_graph(
+        nodes,
+        name,
+        [value_infos[n] for n in inputs],
+        [value_infos[n] for n in outputs],
+        initializer=initializers,
+    )
+    model = onnx.helper.make_model(
+        graph,
+        opset_imports=list(source.opset_import),
+        producer_name="mer.export",
+    )
+    model.ir_version = source.ir_version
+    onnx.checker.check_model(model)
+    return model
+
+
+def split_model(
+    model_path: PathLike,
+    output_dir: Optional[PathLike] = None,
+    image_input: str = "images",
+    tgt_input: str = "tgt",
+    encoder_filename: str = ENCODER_FILENAME,
+    decoder_filename: str = DECODER_FILENAME,
+) -> Tuple[Path, Path]:
+    """
+    Split the monolithic recognizer into an encoder graph (image -> memory) and a decoder
+    graph (memory + tgt -> logits) so the encoder only has to run once per image.
+
+    Every node is assigned by data dependency: anything reachable from `tgt` belongs to the
+    decoder, anything else reachable from `image_input` belongs to the encoder. Encoder values
+    read by the decoder become the interface between the two graphs and keep their original
+    names. Returns the paths of the written encoder and decoder models.
+    """
+    onnx = _require_onnx()
+    model_path = Path(model_path).expanduser()
+    if not model_path.exists():
+        raise FileNotFoundError(f"Model checkpoint not found: {model_path}")
+    target_dir = Path(output_dir).expanduser() if output_dir else model_path.parent
+    target_dir.mkdir(parents=True, exist_ok=True)
+
+    model = onnx.shape_inference.infer_shapes(onnx.load(str(model_path)))
+    graph = model.graph
+    input_names = {inp.name for inp in graph.input}
+    for required in (image_input, tgt_input):
+        if required not in input_names:
+            raise ValueError(f"Model {model_path.name} has no input named {required!r}")
+
+    image_values = {image_input}
+    tgt_values = {tgt_input}
+    graph_nodes = list(graph.node)
+    encoder_idx: List[int] = []
+    decoder_idx: List[int] = []
+    static_idx: List[int] = []
+    for idx, node in enumerate(graph_nodes):
+        reads = _node_inputs(node)
+        if reads & tgt_values:
+            decoder_idx.append(idx)
+            tgt_values.update(node.output)
+        elif reads & image_values:
+            encoder_idx.append(idx)
+            image_values.update(node.output)
+        else:
+            static_idx.append(idx)
+
+    output_names = [out.name for out in graph.output]
+    not_decoded = [name for name in output_names if name not in tgt_values]
+    if not_decoded:
+        raise ValueError(f"Graph outputs do not depend on {tgt_input!r}: {', '.join(not_decoded)}")
+
+    decoder_nodes = _with_dependencies(decoder_idx, static_idx, graph_nodes)
+    encoder_nodes = _with_dependencies(encoder_idx, static_idx, graph_nodes)
+
+    decoder_reads: Set[str] = set()
+    for node in decoder_nodes:
+        decoder_reads.update(_node_inputs(node))
+    if image_input in decoder_reads:
+        raise ValueError(f"Decoder reads {image_input!r} directly; the graph cannot be split")
+    memory_names = [
+        name
+        for node in encoder_nodes
+        for name in node.output
+        if name in decoder_reads and name in image_values
+    ]
+    if not memory_names:
+        raise ValueError("No encoder values feed the decoder; the graph cannot be split")
+
+    value_infos = {vi.name: vi for vi in graph.value_info}
+    value_infos.update({vi.name: vi for vi in graph.input})
+    value_infos.update({vi.name: vi for vi in graph.output})
+    untyped = [name for name in memory_names if name not in value_infos]
+    if untyped:
+        raise ValueError(f"Shape inference could not type the encoder outputs: {', '.join(untyped)}")
+
+    encoder = _build_graph(onnx, model, encoder_nodes, [image_input], memory_names, value_infos, "mer_encoder")
+    decoder = _build_graph(
+        onnx, model, decoder_nodes, [*memory_names, tgt_input], output_names, value_infos, "mer_decoder"
+    )
+
+    encoder_path = target_dir / encoder_filename
+    decoder_path = target_dir / decoder_filename
+    onnx.save(encoder, str(encoder_path))
+    onnx.save(decoder, str(decoder_path))
+    return encoder_path, decoder_path
+
+
+def quantize_model(
+    model_path: PathLike,
+    output_path: Optional[PathLike] = None,
+    op_types: Iterable[str] = DEFAULT_QUANTIZED_OPS,
+    per_channel: bool = False,
+) -> Path:
+    """
+    Write a dynamically quantized (int8 weights, activations quantized at run time) copy of
+    `model_path`, by default as `<stem>_int8.onnx` next to it. Only `op_types` are quantized.
+    Returns the written path.
+    """
+    _require_onnx()
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    model_path = Path(model_path).expanduser()
+    if not model_path.exists():
+        raise FileNotFoundError(f"Model checkpoint not found: {model_path}")
+    output_path = Path(output_path).expanduser() if output_path else model_path.with_name(f"{model_path.stem}_int8.onnx")
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    staging = output_path.with_name(f"{output_path.stem}.{os.getpid()}.tmp{output_path.suffix}")
+    quantize_dynamic(
+        str(model_path),
+        str(staging),
+        op_types_to_quantize=list(op_types),
+        per_channel=per_channel,
+        weight_type=QuantType.QInt8,
+    )
+    os.replace(staging, output_path)
+    return output_path
+
+
+def _constant_shapes(graph) -> dict:
+    shapes = {init.name: list(init.dims) for init in graph.initializer}
+    for node in graph.node:
+        if node.op_type == "Constant":
+            for attr in node.attribute:
+                if attr.name == "value":
+                    shapes[node.output[0]] = list(attr.t.dims)
+    return shapes
+
+
+def _positionwise_input(node, constants: dict, opset: int) -> Optional[str]:
+    """
+    The data input of `node` if it acts on every sequence position independently (so it
+    commutes with gathering one position on axis 1), else None.
+    """
+    if node.op_type in _ELEMENTWISE_OPS:
+        return node.input[0]
+    if node.op_type == "MatMul" and len(constants.get(node.input[1], [])) == 2:
+        return node.input[0]
+    if node.op_type in _BROADCAST_OPS:
+        const = [name for name in node.input if name in constants]
+        data = [name for name in node.input if name not in constants]
+        if len(const) == 1 and len(data) == 1 and len(constants[const[0]]) <= 1:
+            return data[0]
+        return None
+    if node.op_type in _SOFTMAX_OPS:
+        axis = next((attr.i for attr in node.attribute if attr.name == "axis"), -1 if opset >= 13 else 1)
+        return node.input[0] if axis in (-1, 2) else None
+    return None
+
+
+def gather_last_position(
+    model_path: PathLike,
+    output_path: Optional[PathLike] = None,
+    logits_output: str = "logits",
+    position_input: str = POSITION_INPUT,
+    emit: str = "logits",
+) -> Path:
+    """
+    Rewrite a full-sequence decoder so it only produces the step being decoded.
+
+    A `position` input (int64, shape `[1]`) is added and a Gather on the sequence axis is
+    inserted as early as possible: it moves above the trailing per-position ops (output
+    projection MatMul, bias Add, softmax, activations), so those run on one position instead
+    of `max_len`. The logits output becomes `(N, 1, vocab)`; with `emit="token"` it is
+    replaced by an ArgMax `next_token` output of shape `(N, 1)`. Works on the monolithic
+    model and on the split decoder. Written as `<stem>_lastpos.onnx` by default.
+    """
+    if emit not in ("logits", "token"):
+        raise ValueError(f"emit must be 'logits' or 'token', got {emit!r}")
+    onnx = _require_onnx()
+    helper = onnx.helper
+    model_path = Path(model_path).expanduser()
+    if not model_path.exists():
+        raise FileNotFoundError(f"Model checkpoint not found: {model_path}")
+    output_path = Path(output_path).expanduser() if output_path else model_path.with_name(f"{model_path.stem}_lastpos.onnx")
+
+    model = onnx.load(str(model_path))
+    graph = model.graph
+    input_names = [inp.name for inp in graph.input]
+    if position_input in input_names:
+        raise ValueError(f"{model_path.name} already has a {position_input!r} input")
+    if any(name.startswith(("past_key_values", "past")) for name in input_names):
+        raise ValueError(f"{model_path.name} is an incremental decoder; it already emits one position per step")
+    output_index = next((i for i, out in enumerate(graph.output) if out.name == logits_output), None)
+    if output_index is None:
+        raise ValueError(f"{model_path.name} has no output named {logits_output!r}")
+    if any(logits_output in _node_inputs(node) for node in graph.node):
+        raise ValueError(f"{logits_output!r} is also read inside the graph; cannot narrow it to one position")
+
+    opset = next((op.version for op in model.opset_import if op.domain in ("", "ai.onnx")), 13)
+    constants = _constant_shapes(graph)
+    nodes = list(graph.node)
+    producer = {name: idx for idx, node in enumerate(nodes) for name in node.output}
+    readers: dict = {}
+    for idx, node in enumerate(nodes):
+        for name in _node_inputs(node):
+            readers.setdefault(name, []).append(idx)
+    graph_outputs = {out.name for out in graph.output}
+
+    # Walk up from the logits through per-position ops whose results nothing else reads.
+    tensor = logits_output
+    first: Optional[int] = None
+    rewired: List[str] = []
+    while tensor in producer:
+        idx = producer[tensor]
+        data = _positionwise_input(nodes[idx], constants, opset)
+        if data is None or data in graph_outputs or len(readers.get(data, [])) != 1:
+            break
+        rewired.append(tensor)
+        first, tensor = idx, data
+
+    gathered = f"{tensor}_at_{position_input}"
+    gather = helper.make_node("Gather", [tensor, position_input], [gathered], axis=1, name=f"mer_gather_{position_input}")
+    if first is None:
+        # Nothing to hoist above: gather the finished logits.
+        idx = producer[logits_output]
+        full = f"{logits_output}_all_positions"
+        nodes[idx].output[list(nodes[idx].output).index(logits_output)] = full
+        gather.input[0] = full
+        gather.output[0] = logits_output
+        nodes.insert(idx + 1, gather)
+    else:
+        node = nodes[first]
+        node.input[list(node.input).index(tensor)] = gathered
+        nodes.insert(first, gather)
+
+    logits_info = graph.output[output_index]
+    dims = logits_info.type.tensor_type.shape.dim
+    if len(dims) >= 2:
+        dims[1].Clear()
+        dims[1].dim_value = 1
+    stale = set(rewired)
+    kept_infos = [vi for vi in graph.value_info if vi.name not in stale]
+    del graph.value_info[:]
+    graph.value_info.extend(kept_infos)
+
+    if emit == "token":
+        nodes.append(helper.make_node("ArgMax", [logits_output], [TOKEN_OUTPUT], axis=-1, keepdims=0))
+        batch_dim = (dims[0].dim_param or dims[0].dim_value or "batch") if len(dims) else "batch"
+        graph.output.remove(logits_info)
+        graph.output.insert(
+            output_index, helper.make_tensor_value_info(TOKEN_OUTPUT, onnx.TensorProto.INT64, [batch_dim, 1])
+        )
+
+    del graph.node[:]
+    graph.node.extend(nodes)
+    graph.input.append(helper.make_tensor_value_info(position_input, onnx.TensorProto.INT64, [1]))
+    onnx.checker.check_model(model)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    onnx.save(model, str(output_path))
+    return output_path
+
+
+__all__ = ["split_model", "quantize_model", "gather_last_position", "DEFAULT_QUANTIZED_OPS"]
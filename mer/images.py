@@ -0,0 +1,77 @@
+from __future__ import annotations
+
+import os
+from io import BytesIO
+from pathlib import Path
+from typing import TYPE_CHECKING, Optional, Tuple, Union
+
+from ._lazy import lazy_import
+
+if TYPE_CHECKING:  # pragma: no cover
+    import numpy
+
+np = lazy_import("numpy")
+Image = lazy_import("PIL.Image")
+
+PathLike = Union[str, os.PathLike]
+ImageInput = Union[bytes, bytearray, memoryview, "numpy.ndarray", "Image.Image", PathLike]
+
+# Modes the predictor consumes directly: grayscale is resized as one channel and broadcast.
+NATIVE_MODES = ("RGB", "L")
+
+
+def from_array(pixels: object) -> "Image.Image":
+    """
+    Wrap a uint8 `(H, W)`, `(H, W, 1)` or `(H, W, 3)` pixel buffer (NumPy array, memoryview or
+    any buffer-protocol object) as a PIL image. Contiguous grayscale buffers are shared, not
+    copied; RGB pixels are unpacked once into PIL's layout.
+    """
+    array = np.asarray(pixels)
+    if array.dtype != np.uint8:
+        raise ValueError(f"Expected uint8 pixels, got {array.dtype}")
+    if array.ndim == 3 and array.shape[2] == 1:
+        array = array[:, :, 0]
+    if array.ndim == 2 or (array.ndim == 3 and array.shape[2] == 3):
+        return Image.fromarray(array)
+    raise ValueError(f"Expected (H, W), (H, W, 1) or (H, W, 3) pixels, got shape {array.shape}")
+
+
+def _is_pixel_buffer(image: object) -> bool:
+    if isinstance(image, np.ndarray):
+        return True
+    if isinstance(image, (bytes, bytearray, str, os.PathLike)):
+        return False
+    try:
+        view = memoryview(image)
+    except TypeError:
+        return False
+    return view.ndim >= 2  # a flat buffer holds an encoded file, like bytes
+
+
+def open_image(image: ImageInput, draft_size: Optional[Tuple[int, int]] = None) -> "Image.Image":
+    """
+    PIL image in "RGB" or "L" mode for any supported input: a PIL image, encoded file bytes
+    (bytes, bytearray or a flat buffer), a pixel buffer (see `from_array`) or a path.
+    Images already in a native mode are returned as is. With `draft_size` (width, height),
+    JPEG files are decoded at the smallest 1/2, 1/4 or 1/8 scale that still covers it.
+    """
+    if isinstance(image, Image.Image):
+        return image if image.mode in NATIVE_MODES else image.convert("RGB")
+    if _is_pixel_buffer(image):
+        return from_array(image)
+    if isinstance(image, (bytes, bytearray, memoryview)):
+        opened = Image.open(BytesIO(image))
+    else:
+        path = Path(image).expanduser()
+        if not path.exists():
+            raise FileNotFoundError(f"Image path does not exist: {path}")
+        opened = Image.open(path)
+    if draft_size is not None and opened.format == "JPEG":
+        opened.draft(None, draft_size)
+    if opened.mode not in NATIVE_MODES:
+        return opened.convert("RGB")
+    opened.load()
+    return opened
+
+
+__all__ = ["ImageInput", "open_image", "from_array", "NATIVE_MODES"]
@@ -0,0 +1,72 @@
+from __future__ import annotations
+
+import time
+from contextlib import contextmanager, nullcontext
+from typing import Callable, ContextManager, Dict, Iterator, Optional
+
+STAGES = ("decode_image", "segment", "blank_check", "preprocess", "encode", "decode", "postprocess")
+
+
+class Trace:
+    """
+    Timing breakdown and counters for one recognition call (a line or a batch).
+
+    Only created when a caller asks for stats or a callback is registered; the inference
+    path checks `trace is not None` once per stage, never per decoding step.
+    """
+
+    __slots__ = (
+        "timings",
+        "session_runs",
+        "decode_steps",
+        "batch_size",
+        "cache_hits",
+        "blank_skipped",
+        "length_capped",
+        "loop_stopped",
+        "_start",
+    )
+
+    def __init__(self, batch_size: int = 1) -> None:
+        self.timings: Dict[str, float] = {}
+        self.session_runs = 0
+        self.decode_steps = 0
+        self.batch_size = batch_size
+        self.cache_hits = 0
+        self.blank_skipped = 0
+        self.length_capped = 0
+        self.loop_stopped = 0
+        self._start = time.perf_counter()
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings[name] = self.timings.get(name, 0.0) + time.perf_counter() - start
+
+    def as_dict(self) -> dict:
+        timings = {name: round(seconds * 1000.0, 3) for name, seconds in self.timings.items()}
+        timings["total"] = round((time.perf_counter() - self._start) * 1000.0, 3)
+        return {
+            "timings_ms": timings,
+            "session_runs": self.session_runs,
+            "decode_steps": self.decode_steps,
+            "batch_size": self.batch_size,
+            "cache_hits": self.cache_hits,
+            "blank_skipped": self.blank_skipped,
+            "length_capped": self.length_capped,
+            "loop_stopped": self.loop_stopped,
+        }
+
+
+def stage(trace: Optional[Trace], name: str) -> ContextManager[None]:
+    """`trace.stage(name)`, or a no-op context when instrumentation is off."""
+    return trace.stage(name) if trace is not None else nullcontext()
+
+
+StatsCallback = Callable[[dict], None]
+
+
+__all__ = ["Trace", "StatsCallback", "STAGES", "stage"]
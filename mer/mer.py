@@ -1,88 +1,705 @@
 from __future__ import annotations
 
-from io import BytesIO
+import json
+import os
+import threading
+from collections import deque
 from pathlib import Path
-from threading import Lock
-from typing import Optional, Union, Dict
-
-import torch
-from PIL import Image
+from typing import TYPE_CHECKING, Deque, Dict, Iterable, Iterator, List, Optional, Tuple, Union
 
+from ._lazy import lazy_import
 from .artifacts import ArtifactPaths, ensure_artifacts
-from .constants import DEFAULT_CACHE_DIR, REPO_ID
-from .predictor import Predictor, PathLike
+from .cache import CACHE_DB_FILENAME, RecognitionCache, model_identity
+from .constants import DEFAULT_CACHE_DIR, OPTIMIZED_DIRNAME, REPO_ID
+from .draft import NgramDrafter
+from .images import ImageInput, open_image
+from .instrument import StatsCallback, Trace, stage
+from .pool import PredictorPool, default_intra_op_threads
+from .predictor import Predictor, PathLike, check_decoding
 from .postprocess import postprocess_text
+from .registry import default_registry
+from .segment import crop_lines, ink_fraction, segment_lines
+
+if TYPE_CHECKING:  # pragma: no cover - torch is an optional extra
+    from concurrent.futures import Future
+
+    import torch
+
+    from .scheduler import BatchScheduler
+
+asyncio = lazy_import("asyncio")
+futures = lazy_import("concurrent.futures")
+np = lazy_import("numpy")
+Image = lazy_import("PIL.Image")
+
+Decoding = Tuple[str, int]  # (decode mode, beam width) for scored recognition
 
 
 class Mer:
     """
-    Public-facing helper around the single-line CNN-Transformer recognizer.
+    Public-facing helper around the CNN-Transformer line recognizer.
     """
 
     def __init__(
         self,
         cache_dir: PathLike = DEFAULT_CACHE_DIR,
         repo_id: str = REPO_ID,
-        device: Optional[Union[str, torch.device]] = "cuda",
+        device: Optional[Union[str, "torch.device"]] = "cuda",
         max_length: Optional[int] = None,
         model_path: Optional[PathLike] = None,
         providers: Optional[list[str]] = None,
         markdown: bool = False,
         postprocess: bool = True,
         json_result: bool = False,
+        split: bool = False,
+        workers: int = 1,
+        shared_session: bool = True,
+        intra_op_num_threads: Optional[int] = None,
+        inter_op_num_threads: Optional[int] = None,
+        batch_max_size: int = 16,
+        batch_max_wait: float = 0.005,
+        batch_max_queue: Optional[int] = None,
+        cache_size: int = 0,
+        cache_disk: bool = False,
+        callbacks: Optional[Iterable[StatsCallback]] = None,
+        profile_dir: Optional[PathLike] = None,
+        session_options: Optional[Dict[str, object]] = None,
+        optimized_cache: bool = False,
+        precision: str = "fp32",
+        last_position: bool = False,
+        speculative: bool = False,
+        draft_tokens: int = 8,
+        draft_corpus: Optional[Iterable[str]] = None,
+        decode: str = "greedy",
+        beam_width: int = 4,
+        blank_threshold: Optional[float] = 0.001,
+        length_rate: Optional[float] = 6.0,
+        length_margin: int = 8,
+        loop_window: Optional[int] = None,
+        shared_models: bool = True,
     ) -> None:
+        """
+        `workers` sets how many recognitions may run concurrently from different threads.
+        Workers share one ONNX Runtime session by default (`shared_session=False` gives each
+        its own); when several workers are requested and `intra_op_num_threads` is unset, the
+        cores are divided between them to avoid oversubscription.
+        `batch_max_size`/`batch_max_wait` (seconds) tune the micro-batching behind the
+        `arecognize_*` coroutines; with `batch_max_queue`, they raise
+        `mer.scheduler.Overloaded` when a call's lines would not fit among that many waiting.
+        `cache_size` > 0 enables an in-memory LRU of results keyed by the decoded pixels and
+        the model identity; `cache_disk=True` also persists them in SQLite under `cache_dir`.
+        `callbacks` receive a stats dict (stage timings, session runs, decode steps) after every
+        recognition call; see `add_callback`. `profile_dir` enables ONNX Runtime's profiler,
+        whose trace files are flushed by `end_profiling()`.
+        `session_options` are forwarded to every ONNX Runtime session (see `Predictor`);
+        `optimized_cache=True` saves the optimized graphs under `cache_dir` so later starts skip
+        graph optimization.
+        `precision="int8"` runs dynamically quantized graphs, created on first use and kept
+        in the artifact cache (see `ensure_artifacts`). `last_position=True` decodes with a
+        graph rewritten to compute only the current position's logits on each step.
+        `speculative=True` verifies up to `draft_tokens` tokens per session call, drafted by a
+        character n-gram model trained on `draft_corpus` (lines of text) and on every line
+        recognized so far. Results are identical to greedy decoding.
+        `decode="beam"` runs beam search with `beam_width` hypotheses per line by default;
+        every recognition call can override both.
+        Line images whose ink fraction (see `mer.segment.ink_fraction`) is below
+        `blank_threshold` are returned as empty results without running the model and counted
+        as `blank_skipped` in the stats; `None` or `0` disables the check.
+        Every line may decode at most `length_rate` tokens per text height of inked width
+        (measured before resizing) plus `length_margin`, instead of always `max_length`;
+        `length_rate=None` disables the budget. `loop_window` stops lines whose last
+        `loop_window` tokens repeat a short cycle. Lines cut short either way are counted as
+        `length_capped` / `loop_stopped` in the stats (see `Predictor`).
+        With `shared_models` (the default), instances loading the same model with the same
+        session settings share one copy of its sessions and vocabulary through
+        `mer.registry.default_registry`; see `mer.registry.preload` for pre-fork servers.
+        Instances with `shared_session=False` or `profile_dir` always load their own.
+        """
         if markdown:
             raise ValueError("Markdown output is no longer supported; Mer now focuses on line recognition only.")
+        check_decoding(decode, beam_width)
         artifacts = ensure_artifacts(
             cache_dir=cache_dir,
             repo_id=repo_id,
             local_dir=model_path,
+            split=split,
+            precision=precision,
+            last_position=last_position,
         )
         self.artifacts = artifacts
         self._default_json_result = bool(json_result)
         self._apply_postprocess = postprocess
-        self._predictor_lock = Lock()
-        self._predictor = Predictor(
+        self._decode = decode
+        self._beam_width = int(beam_width)
+        self._blank_threshold = blank_threshold
+        if intra_op_num_threads is None and workers > 1:
+            intra_op_num_threads = default_intra_op_threads(workers)
+        drafter = NgramDrafter() if speculative else None  # one table shared by every worker
+        decoding_kwargs = dict(
+            max_length=max_length,
+            drafter=drafter,
+            draft_tokens=draft_tokens,
+            length_rate=length_rate,
+            length_margin=length_margin,
+            loop_window=loop_window,
+        )
+
+        session_kwargs = dict(
             model_path=str(artifacts.weights),
             config_path=str(artifacts.config),
             device=device,
-            max_length=max_length,
             providers=providers,
+            encoder_path=str(artifacts.encoder) if artifacts.encoder else None,
+            decoder_path=str(artifacts.decoder) if artifacts.decoder else None,
+            intra_op_num_threads=intra_op_num_threads,
+            inter_op_num_threads=inter_op_num_threads,
+            session_options=session_options,
+            optimized_model_dir=str(Path(cache_dir).expanduser() / OPTIMIZED_DIRNAME) if optimized_cache else None,
         )
+        # Profiled sessions stop profiling for good in end_profiling(), so they are never shared.
+        share = shared_models and shared_session and not profile_dir
 
-    def _predict_image(self, image: Image.Image) -> str:
-        with self._predictor_lock:
-            raw = self._predictor.predict(image)
+        def build_predictor() -> Predictor:
+            if share:
+                return default_registry.predictor(**decoding_kwargs, **session_kwargs)
+            return Predictor(
+                profile_prefix=Path(profile_dir).expanduser() / "mer" if profile_dir else None,
+                **decoding_kwargs,
+                **session_kwargs,
+            )
+
+        self._pool = PredictorPool(build_predictor, workers=workers, shared_session=shared_session)
+        self._predictor = self._pool.primary
+        if drafter is not None:
+            for text in draft_corpus or []:
+                drafter.observe(self._predictor.vocab.encode(text))
+        self._batch_max_size = batch_max_size
+        self._batch_max_wait = batch_max_wait
+        self._batch_max_queue = batch_max_queue
+        self._scheduler: Optional[BatchScheduler] = None
+        self._scheduler_lock = threading.Lock()
+        self._cache: Optional[RecognitionCache] = None
+        if cache_size > 0 or cache_disk:
+            identity = model_identity(
+                [artifacts.weights, artifacts.config, artifacts.encoder, artifacts.decoder],
+                max_length=max_length,
+                length_budget=(length_rate, length_margin, loop_window),
+            )
+            disk_path = Path(cache_dir).expanduser() / CACHE_DB_FILENAME if cache_disk else None
+            self._cache = RecognitionCache(max(1, cache_size or 4096), namespace=identity, disk_path=disk_path)
+        self._callbacks: List[StatsCallback] = list(callbacks or [])
+
+    def add_callback(self, callback: StatsCallback) -> None:
+        """
+        Call `callback(stats)` after every recognition call, e.g. to feed a metrics exporter.
+        `stats` holds `timings_ms` per stage (`decode_image`, `segment`, `preprocess`,
+        `encode`, `decode`, `postprocess`, `total`), `session_runs`, `decode_steps`,
+        `batch_size`, `cache_hits`, `blank_skipped`, `length_capped` and `loop_stopped`.
+        Callbacks run on the calling (or batching) thread.
+        """
+        self._callbacks.append(callback)
+
+    def _start_trace(self, return_stats: bool, batch_size: int = 1) -> Optional[Trace]:
+        # Instrumentation is only paid for when someone is going to read it.
+        if return_stats or self._callbacks:
+            return Trace(batch_size)
+        return None
+
+    def _finish_trace(self, trace: Optional[Trace]) -> Optional[dict]:
+        if trace is None:
+            return None
+        stats = trace.as_dict()
+        for callback in self._callbacks:
+            callback(stats)
+        return stats
+
+    def end_profiling(self) -> List[str]:
+        """Flush ONNX Runtime profiles (enabled with `profile_dir`) and return their paths."""
+        paths: List[str] = []
+        seen = set()
+        for predictor in self._pool.predictors:
+            if id(predictor.session) in seen:
+                continue  # clones share their primary's sessions
+            seen.add(id(predictor.session))
+            paths.extend(predictor.end_profiling())
+        return paths
+
+    def _finalize_text(self, raw: object) -> str:
         if not isinstance(raw, str):
             return str(raw)
         return postprocess_text(raw) if self._apply_postprocess else raw
 
+    def _finalize_result(self, raw: object) -> Union[str, Dict[str, object]]:
+        if isinstance(raw, dict):
+            return {**raw, "text": self._finalize_text(raw["text"])}
+        return self._finalize_text(raw)
+
+    def _decoding(self, json_result: bool, decode: Optional[str], beam_width: Optional[int]) -> Optional[Decoding]:
+        """
+        `(decode, beam_width)` for calls that need the scored decoder (JSON results or beam
+        search), or None for the plain greedy text path.
+        """
+        decode = self._decode if decode is None else decode
+        beam_width = self._beam_width if beam_width is None else int(beam_width)
+        check_decoding(decode, beam_width)
+        if json_result or decode == "beam":
+            return decode, beam_width
+        return None
+
+    def _cache_key(self, image: Image.Image, decoding: Optional[Decoding]) -> str:
+        key = self._cache.key_for(image)
+        if decoding is None:
+            return key
+        decode, beam_width = decoding
+        return f"{key}:{decode if decode == 'greedy' else f'beam{beam_width}'}"
+
+    def _cache_get(self, key: str, decoding: Optional[Decoding]) -> object:
+        cached = self._cache.get(key)
+        if cached is None or decoding is None:
+            return cached
+        return json.loads(cached)
+
+    def _cache_put(self, key: str, raw: object) -> None:
+        if isinstance(raw, str):
+            self._cache.put(key, raw)
+        elif isinstance(raw, dict):
+            self._cache.put(key, json.dumps(raw, ensure_ascii=False))
+
+    def _is_blank(self, image: Image.Image) -> bool:
+        if not self._blank_threshold:
+            return False
+        gray = image if image.mode == "L" else image.convert("L")
+        return ink_fraction(np.asarray(gray)) < self._blank_threshold
+
     @staticmethod
-    def _coerce_image(image: Union[bytes, Image.Image, PathLike]) -> Image.Image:
-        if isinstance(image, Image.Image):
-            return image.convert("RGB")
-        if isinstance(image, (bytes, bytearray)):
-            return Image.open(BytesIO(image)).convert("RGB")
-        image_path = Path(image).expanduser()
-        if not image_path.exists():
-            raise FileNotFoundError(f"Image path does not exist: {image_path}")
-        return Image.open(image_path).convert("RGB")
-
-    def recognize_line(self, image: Union[bytes, Image.Image, PathLike], json_result: bool = False) -> Union[str, Dict[str, str]]:
-        """Run the custom CNN-Transformer line recognizer directly."""
-        pil_image = self._coerce_image(image)
-        text = self._predict_image(pil_image)
+    def _blank_result(decoding: Optional[Decoding]) -> Union[str, Dict[str, object]]:
+        return "" if decoding is None else {"text": "", "log_prob": 0.0, "chars": []}
+
+    def _predict_image(self, image: Image.Image, trace: Optional[Trace] = None) -> str:
+        with stage(trace, "blank_check"):
+            blank = self._is_blank(image)
+        if blank:
+            if trace is not None:
+                trace.blank_skipped += 1
+            return ""
+        key = self._cache.key_for(image) if self._cache is not None else None
+        raw = self._cache.get(key) if key is not None else None
+        if raw is None:
+            with self._pool.acquire() as predictor:
+                raw = predictor.predict(image, trace=trace)
+            if key is not None and isinstance(raw, str):
+                self._cache.put(key, raw)
+        elif trace is not None:
+            trace.cache_hits += 1
+        with stage(trace, "postprocess"):
+            return self._finalize_text(raw)
+
+    def _run_predictor(
+        self,
+        images: List[Image.Image],
+        trace: Optional[Trace],
+        decoding: Optional[Decoding],
+        batch_size: Optional[int] = None,
+    ) -> list:
+        with self._pool.acquire() as predictor:
+            if decoding is None:
+                return predictor.predict_batch(images, trace=trace, batch_size=batch_size)
+            decode, beam_width = decoding
+            return predictor.predict_scored(
+                images, decode=decode, beam_width=beam_width, trace=trace, batch_size=batch_size
+            )
+
+    def _predict_images(
+        self,
+        images: List[Image.Image],
+        trace: Optional[Trace] = None,
+        decoding: Optional[Decoding] = None,
+        batch_size: Optional[int] = None,
+    ) -> List[Union[str, Dict[str, object]]]:
+        """
+        Texts, or scored result dicts when `decoding` is set (see `_decoding`). Blank images
+        are left out of the batch handed to the model. Without `batch_size`, every image is
+        decoded in one batch; with it, see `Predictor.predict_batch`.
+        """
+        with stage(trace, "blank_check"):
+            blank = [self._is_blank(image) for image in images]
+        if not any(blank):
+            return self._predict_inked(images, trace, decoding, batch_size)
+        if trace is not None:
+            trace.blank_skipped += sum(blank)
+        inked = [image for image, skip in zip(images, blank) if not skip]
+        decoded = iter(self._predict_inked(inked, trace, decoding, batch_size) if inked else [])
+        return [self._blank_result(decoding) if skip else next(decoded) for skip in blank]
+
+    def _predict_inked(
+        self,
+        images: List[Image.Image],
+        trace: Optional[Trace],
+        decoding: Optional[Decoding],
+        batch_size: Optional[int] = None,
+    ) -> List[Union[str, Dict[str, object]]]:
+        if self._cache is None:
+            raw = self._run_predictor(images, trace, decoding, batch_size)
+            with stage(trace, "postprocess"):
+                return [self._finalize_result(item) for item in raw]
+
+        keys = [self._cache_key(image, decoding) for image in images]
+        found: Dict[str, object] = {}
+        pending: Dict[str, Image.Image] = {}
+        for key, image in zip(keys, images):
+            if key in found or key in pending:
+                continue  # duplicates within the batch are decoded once
+            cached = self._cache_get(key, decoding)
+            if cached is None:
+                pending[key] = image
+            else:
+                found[key] = cached
+        if trace is not None:
+            trace.cache_hits += len(found)
+        if pending:
+            raw = self._run_predictor(list(pending.values()), trace, decoding, batch_size)
+            for key, item in zip(pending, raw):
+                found[key] = item
+                self._cache_put(key, item)
+        with stage(trace, "postprocess"):
+            return [self._finalize_result(found[key]) for key in keys]
+
+    def cache_stats(self) -> dict:
+        """Hit/miss/eviction counters of the recognition cache (empty when disabled)."""
+        if self._cache is None:
+            return {}
+        return self._cache.stats()
+
+    def _predict_in_batches(
+        self,
+        images: List[Image.Image],
+        batch_size: int,
+        trace: Optional[Trace] = None,
+        decoding: Optional[Decoding] = None,
+    ) -> List[Union[str, Dict[str, object]]]:
+        if batch_size < 1:
+            raise ValueError("batch_size must be at least 1")
+        return self._predict_images(images, trace=trace, decoding=decoding, batch_size=batch_size)
+
+    def _coerce_image(self, image: ImageInput, page: bool = False) -> Image.Image:
+        """
+        Line inputs as "RGB"/"L" images (see `mer.images.open_image`); JPEG lines are decoded
+        at reduced resolution since they are resized to the model input anyway. Pages keep
+        full resolution for segmentation.
+        """
+        return open_image(image, draft_size=None if page else self._predictor.input_size)
+
+    @staticmethod
+    def _shape_result(
+        result: Union[str, Dict[str, object]], json_result: bool, stats: Optional[dict], return_stats: bool
+    ) -> Union[str, Dict[str, object]]:
+        record = result if isinstance(result, dict) else {"text": result}
         if json_result:
-            return {"text": text}
+            return {**record, "stats": stats} if return_stats else record
+        if return_stats:
+            return {"text": record["text"], "stats": stats}
+        return record["text"]
+
+    def recognize_line(
+        self,
+        image: ImageInput,
+        json_result: bool = False,
+        return_stats: bool = False,
+        decode: Optional[str] = None,
+        beam_width: Optional[int] = None,
+    ) -> Union[str, Dict[str, object]]:
+        """
+        Run the custom CNN-Transformer line recognizer directly.
+        With `json_result`, returns `{"text", "log_prob", "chars"}`: the line's total
+        log-probability and `{"char", "log_prob"}` for every decoded character (taken before
+        postprocessing, so they may differ from `text` in whitespace).
+        With `return_stats`, the result also carries the call's `"stats"` (see `add_callback`).
+        `decode`/`beam_width` override the instance defaults for this call.
+        """
+        decoding = self._decoding(json_result, decode, beam_width)
+        trace = self._start_trace(return_stats)
+        with stage(trace, "decode_image"):
+            pil_image = self._coerce_image(image)
+        if decoding is None:
+            result = self._predict_image(pil_image, trace=trace)
+        else:
+            result = self._predict_images([pil_image], trace=trace, decoding=decoding)[0]
+        stats = self._finish_trace(trace)
+        return self._shape_result(result, json_result, stats, return_stats)
+
+    def recognize_lines(
+        self,
+        images: Iterable[ImageInput],
+        batch_size: int = 16,
+        json_result: bool = False,
+        return_stats: bool = False,
+        decode: Optional[str] = None,
+        beam_width: Optional[int] = None,
+    ) -> List[Union[str, Dict[str, object]]]:
+        """
+        Recognize many line images, decoding up to `batch_size` of them per session call.
+        Lines are scheduled by their expected length, longest first, and full-sequence
+        decoders start the next line in a slot as soon as one finishes, so short lines do not
+        wait for the longest line of a fixed batch (see `Predictor.predict_batch`).
+        Results are returned in input order, shaped like `recognize_line`'s. With
+        `return_stats`, every record carries the `"stats"` of the whole call.
+        """
+        decoding = self._decoding(json_result, decode, beam_width)
+        images = list(images)
+        trace = self._start_trace(return_stats, batch_size=len(images))
+        with stage(trace, "decode_image"):
+            pil_images = [self._coerce_image(image) for image in images]
+        results = self._predict_in_batches(pil_images, batch_size, trace=trace, decoding=decoding)
+        stats = self._finish_trace(trace)
+        return [self._shape_result(result, json_result, stats, return_stats) for result in results]
+
+    def iter_recognize(
+        self,
+        images: Iterable[ImageInput],
+        prefetch: int = 2,
+        batch_size: int = 8,
+        json_result: bool = False,
+        threads: Optional[int] = None,
+        decode: Optional[str] = None,
+        beam_width: Optional[int] = None,
+    ) -> Iterator[Union[str, Dict[str, object]]]:
+        """
+        Lazily recognize an arbitrarily long iterable of images, yielding results in order.
+
+        Images are decoded in rounds of `prefetch` batches (at least one), each scheduled
+        over `batch_size` slots like `recognize_lines`. Decoding and preprocessing of the next
+        `prefetch + 1` batches runs on a pool of `threads` workers while the current round is
+        inside the session, so CPU-side image work overlaps with inference. At most one round
+        plus `(prefetch + 1) * batch_size` images are held in memory.
+        """
+        decoding = self._decoding(json_result, decode, beam_width)
+        if batch_size < 1:
+            raise ValueError("batch_size must be at least 1")
+        if prefetch < 0:
+            raise ValueError("prefetch must be non-negative")
+        source = iter(images)
+        window = (prefetch + 1) * batch_size
+        round_size = max(1, prefetch) * batch_size
+        pending: Deque[Future] = deque()
+        executor = futures.ThreadPoolExecutor(
+            max_workers=threads or min(batch_size, os.cpu_count() or 1),
+            thread_name_prefix="mer-prefetch",
+        )
+
+        def fill() -> None:
+            while len(pending) < window:
+                try:
+                    item = next(source)
+                except StopIteration:
+                    return
+                pending.append(executor.submit(self._prepare_item, item, decoding))
+
+        try:
+            fill()
+            while pending:
+                batch = [pending.popleft() for _ in range(min(round_size, len(pending)))]
+                fill()  # start preparing the next round before this one hits the session
+                for result in self._decode_prepared([future.result() for future in batch], decoding, batch_size):
+                    yield self._shape_result(result, json_result, None, False)
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    def _prepare_item(
+        self, image: ImageInput, decoding: Optional[Decoding] = None
+    ) -> Tuple[Optional[str], object, Optional[Tuple[np.ndarray, int]]]:
+        """
+        Decode one input; returns (cache key, ready raw result, (preprocessed array, step
+        budget)). Blank images come back ready without a key.
+        """
+        pil_image = self._coerce_image(image)
+        if self._is_blank(pil_image):
+            return None, self._blank_result(decoding), None
+        key = self._cache_key(pil_image, decoding) if self._cache is not None else None
+        cached = self._cache_get(key, decoding) if key is not None else None
+        if cached is not None:
+            return key, cached, None
+        return key, None, self._predictor.prepare(pil_image)
+
+    def _decode_prepared(
+        self,
+        prepared: List[Tuple[Optional[str], object, Optional[Tuple[np.ndarray, int]]]],
+        decoding: Optional[Decoding] = None,
+        batch_size: Optional[int] = None,
+    ) -> List[Union[str, Dict[str, object]]]:
+        trace = self._start_trace(False, batch_size=len(prepared))
+        inputs = [item for _, cached, item in prepared if cached is None]
+        decoded: list = []
+        if inputs:
+            batch = np.concatenate([array for array, _ in inputs], axis=0)
+            budgets = None
+            if self._predictor.length_rate is not None:
+                budgets = np.array([budget for _, budget in inputs], dtype=np.int64)
+            with self._pool.acquire() as predictor:
+                if decoding is None:
+                    decoded = predictor.decode_batch(batch, trace=trace, budgets=budgets, batch_size=batch_size)
+                else:
+                    decoded = predictor.decode_scored(
+                        batch,
+                        decode=decoding[0],
+                        beam_width=decoding[1],
+                        trace=trace,
+                        budgets=budgets,
+                        batch_size=batch_size,
+                    )
+        if trace is not None:
+            blank = sum(1 for key, ready, _ in prepared if key is None and ready is not None)
+            trace.blank_skipped += blank
+            trace.cache_hits += len(prepared) - len(inputs) - blank
+        fresh = iter(decoded)
+        results: List[Union[str, Dict[str, object]]] = []
+        with stage(trace, "postprocess"):
+            for key, cached, _ in prepared:
+                raw = cached if cached is not None else next(fresh)
+                if cached is None and key is not None:
+                    self._cache_put(key, raw)
+                results.append(self._finalize_result(raw))
+        self._finish_trace(trace)
+        return results
+
+    def recognize_page(
+        self,
+        image: ImageInput,
+        batch_size: int = 16,
+        json_result: bool = False,
+        return_stats: bool = False,
+        decode: Optional[str] = None,
+        beam_width: Optional[int] = None,
+    ) -> Union[str, Dict[str, object]]:
+        """
+        Segment a page or paragraph image into lines and recognize them in batches.
+        Returns the line texts joined with newlines in reading order; with `json_result`
+        returns `{"text": ..., "lines": [{"text", "log_prob", "chars", "bbox": [x0, y0, x1, y1]}, ...]}`
+        (see `recognize_line`). `return_stats` implies `json_result` and adds the call's `"stats"`.
+        """
+        decoding = self._decoding(json_result or return_stats, decode, beam_width)
+        trace = self._start_trace(return_stats)
+        with stage(trace, "decode_image"):
+            pil_image = self._coerce_image(image, page=True)
+        with stage(trace, "segment"):
+            page = np.asarray(pil_image)
+            boxes = segment_lines(page)
+            crops = [Image.fromarray(crop) for crop in crop_lines(page, boxes)]
+        if trace is not None:
+            trace.batch_size = len(crops)
+        records = [
+            self._shape_result(result, True, None, False)
+            for result in self._predict_in_batches(crops, batch_size, trace=trace, decoding=decoding)
+        ]
+        text = "\n".join(record["text"] for record in records if record["text"])
+        stats = self._finish_trace(trace)
+        if json_result or return_stats:
+            result: Dict[str, object] = {
+                "text": text,
+                "lines": [dict(record, bbox=list(box)) for record, box in zip(records, boxes)],
+            }
+            if return_stats:
+                result["stats"] = stats
+            return result
         return text
 
-    def predict(self, image: Union[bytes, Image.Image, PathLike], json_result: Optional[bool] = None) -> Union[str, Dict[str, str]]:
+    def _batch_scheduler(self) -> BatchScheduler:
+        if self._scheduler is None:
+            from .scheduler import BatchScheduler
+
+            with self._scheduler_lock:
+                if self._scheduler is None:
+                    self._scheduler = BatchScheduler(
+                        self._run_scheduled_batch,
+                        max_batch_size=self._batch_max_size,
+                        max_wait=self._batch_max_wait,
+                        workers=self._pool.workers,
+                        max_queue_size=self._batch_max_queue,
+                    )
+        return self._scheduler
+
+    def _run_scheduled_batch(
+        self, items: List[Tuple[Image.Image, Optional[Decoding]]]
+    ) -> List[Union[str, Dict[str, object]]]:
+        # Requests with different decoding settings share a batch window but not a decode loop.
+        groups: Dict[Optional[Decoding], List[int]] = {}
+        for idx, (_, decoding) in enumerate(items):
+            groups.setdefault(decoding, []).append(idx)
+        results: List[Union[str, Dict[str, object]]] = [""] * len(items)
+        for decoding, indices in groups.items():
+            trace = self._start_trace(False, batch_size=len(indices))
+            decoded = self._predict_images([items[idx][0] for idx in indices], trace=trace, decoding=decoding)
+            self._finish_trace(trace)
+            for idx, result in zip(indices, decoded):
+                results[idx] = result
+        return results
+
+    async def arecognize_line(
+        self,
+        image: ImageInput,
+        json_result: bool = False,
+        decode: Optional[str] = None,
+        beam_width: Optional[int] = None,
+    ) -> Union[str, Dict[str, object]]:
+        """
+        Coroutine variant of `recognize_line`. Concurrent calls arriving within
+        `batch_max_wait` seconds are decoded together in one batch.
+        """
+        results = await self.arecognize_lines([image], json_result=json_result, decode=decode, beam_width=beam_width)
+        return results[0]
+
+    async def arecognize_lines(
+        self,
+        images: Iterable[ImageInput],
+        json_result: bool = False,
+        decode: Optional[str] = None,
+        beam_width: Optional[int] = None,
+    ) -> List[Union[str, Dict[str, object]]]:
+        """
+        Coroutine variant of `recognize_lines`; results are returned in input order. With
+        `batch_max_queue`, the lines are admitted all together or `Overloaded` is raised
+        before any image is decoded, so a rejected call leaves no work queued.
+        """
+        decoding = self._decoding(json_result, decode, beam_width)
+        images = list(images)
+        scheduler = self._batch_scheduler()
+        scheduler.check_capacity(len(images))
+        loop = asyncio.get_running_loop()
+        pil_images = await asyncio.gather(*(loop.run_in_executor(None, self._coerce_image, image) for image in images))
+        # Another request may have filled the queue meanwhile; `submit_many` is all or nothing.
+        futures = scheduler.submit_many([(pil_image, decoding) for pil_image in pil_images])
+        results = await asyncio.gather(*(asyncio.wrap_future(future) for future in futures))
+        return [self._shape_result(result, json_result, None, False) for result in results]
+
+    def batching_stats(self) -> dict:
+        """Queue depth and batch-size statistics of the micro-batching scheduler."""
+        if self._scheduler is None:
+            return {}
+        return self._scheduler.stats()
+
+    def close(self) -> None:
+        """Stop the background batching threads and release the on-disk cache, if any."""
+        if self._scheduler is not None:
+            self._scheduler.close()
+            self._scheduler = None
+        if self._cache is not None:
+            self._cache.close()
+
+    def predict(
+        self,
+        image: ImageInput,
+        json_result: Optional[bool] = None,
+        return_stats: bool = False,
+        decode: Optional[str] = None,
+        beam_width: Optional[int] = None,
+    ) -> Union[str, Dict[str, object]]:
         """
         Backwards-compatible alias for recognize_line.
         json_result defaults to the value provided at initialization.
         """
         effective_json = self._default_json_result if json_result is None else json_result
-        return self.recognize_line(image, json_result=effective_json)
+        return self.recognize_line(
+            image, json_result=effective_json, return_stats=return_stats, decode=decode, beam_width=beam_width
+        )
 
     def load(self, load_surya: bool = True) -> None:
         """
@@ -0,0 +1,59 @@
+from __future__ import annotations
+
+import os
+import queue
+from contextlib import contextmanager
+from typing import Callable, Iterator, List, Optional
+
+from .predictor import Predictor
+
+
+def default_intra_op_threads(workers: int) -> int:
+    """Split the machine's cores between workers so concurrent runs don't oversubscribe."""
+    return max(1, (os.cpu_count() or 1) // max(1, workers))
+
+
+class PredictorPool:
+    """
+    Fixed-size pool of predictors handed out to concurrent callers.
+
+    With `shared_session=True` every worker is a `Predictor.clone()` of the first one: a
+    single set of ONNX Runtime sessions runs several requests concurrently while each worker
+    keeps its own input buffers. With `shared_session=False` each worker owns separate
+    sessions built by `factory`, trading memory for isolation.
+    """
+
+    def __init__(self, factory: Callable[[], Predictor], workers: int = 1, shared_session: bool = True) -> None:
+        if workers < 1:
+            raise ValueError("workers must be at least 1")
+        self.workers = int(workers)
+        self.shared_session = shared_session
+        primary = factory()
+        self.predictors: List[Predictor] = [primary]
+        for _ in range(self.workers - 1):
+            self.predictors.append(primary.clone() if shared_session else factory())
+        self._idle: "queue.LifoQueue[Predictor]" = queue.LifoQueue()
+        for predictor in self.predictors:
+            self._idle.put(predictor)
+
+    @property
+    def primary(self) -> Predictor:
+        return self.predictors[0]
+
+    @contextmanager
+    def acquire(self, timeout: Optional[float] = None) -> Iterator[Predictor]:
+        """Borrow an idle predictor, blocking until one is free (or `timeout` expires)."""
+        try:
+            predictor = self._idle.get(timeout=timeout)
+        except queue.Empty:
+            raise TimeoutError(f"No idle predictor within {timeout} seconds") from None
+        try:
+            yield predictor
+        finally:
+            self._idle.put(predictor)
+
+    def idle(self) -> int:
+        return self._idle.qsize()
+
+
+__all__ = ["PredictorPool", "default_intra_op_threads"]
@@ -1,19 +1,52 @@
 from __future__ import annotations
 
+import copy
+import hashlib
+import itertools
 import json
 import os
+import platform
 from pathlib import Path
-from typing import List, Optional, Union
-
-import numpy as np
-import onnxruntime as ort
-from PIL import Image
-from torchvision import transforms
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple, Union
 
+from ._lazy import lazy_import
+from .cache import model_identity
+from .constants import DECODE_MODES, POSITION_INPUT
+from .draft import NgramDrafter
+from .images import ImageInput, open_image
+from .instrument import Trace, stage
+from .segment import ink_extent
 from .vocab import Vocabulary
 
+np = lazy_import("numpy")
+ort = lazy_import("onnxruntime")
+Image = lazy_import("PIL.Image")
+
 PathLike = Union[str, os.PathLike]
 
+# ImageNet statistics the backbone was trained with (torchvision Normalize defaults).
+_MEAN = (0.485, 0.456, 0.406)
+_STD = (0.229, 0.224, 0.225)
+
+_PAST_PREFIXES = ("past_key_values", "past")
+_ORT_DTYPES = {
+    "tensor(float)": "float32",
+    "tensor(float16)": "float16",
+    "tensor(double)": "float64",
+}
+_OPTIMIZATION_LEVELS = {
+    "disable": "ORT_DISABLE_ALL",
+    "basic": "ORT_ENABLE_BASIC",
+    "extended": "ORT_ENABLE_EXTENDED",
+    "all": "ORT_ENABLE_ALL",
+}
+_EXECUTION_MODES = {
+    "sequential": "ORT_SEQUENTIAL",
+    "parallel": "ORT_PARALLEL",
+}
+# Line images are reduced to about this many rows before their ink is measured for scheduling.
+_ESTIMATE_HEIGHT = 32
+
 
 def _providers_from_device(device: Optional[Union[str, os.PathLike]]) -> Optional[List[str]]:
     """
@@ -22,14 +55,35 @@ def _providers_from_device(device: Optional[Union[str, os.PathLike]]) -> Optiona
     """
     if device is None:
         return None
-    if isinstance(device, str):
-        if device.startswith("cuda"):
-            return ["CUDAExecutionProvider", "CPUExecutionProvider"]
-        if device.lower() == "cpu":
-            return ["CPUExecutionProvider"]
+    device = str(device)  # accepts torch.device objects without importing torch
+    if device.startswith("cuda"):
+        return ["CUDAExecutionProvider", "CPUExecutionProvider"]
+    if device.lower() == "cpu":
+        return ["CPUExecutionProvider"]
     return None
 
 
+def _lookup(choices: Dict[str, str], option: str, value: str) -> str:
+    try:
+        return choices[value.lower()]
+    except KeyError:
+        raise ValueError(f"{option} must be one of {sorted(choices)}, got {value!r}") from None
+
+
+def _log_softmax(logits: np.ndarray) -> np.ndarray:
+    """Log-probabilities over the last axis of `logits`."""
+    shifted = logits - logits.max(axis=-1, keepdims=True)
+    shifted -= np.log(np.exp(shifted).sum(axis=-1, keepdims=True))
+    return shifted
+
+
+def check_decoding(decode: str, beam_width: int) -> None:
+    if decode not in DECODE_MODES:
+        raise ValueError(f"decode must be one of {DECODE_MODES}, got {decode!r}")
+    if beam_width < 1:
+        raise ValueError("beam_width must be at least 1")
+
+
 class Predictor:
     """
     ONNX Runtime inference for the Khmer OCR model.
@@ -44,7 +98,43 @@ class Predictor:
         max_length: Optional[int] = None,
         providers: Optional[List[str]] = None,
         session: Optional[ort.InferenceSession] = None,
+        encoder_path: Optional[PathLike] = None,
+        decoder_path: Optional[PathLike] = None,
+        intra_op_num_threads: Optional[int] = None,
+        inter_op_num_threads: Optional[int] = None,
+        profile_prefix: Optional[PathLike] = None,
+        session_options: Optional[Dict[str, object]] = None,
+        optimized_model_dir: Optional[PathLike] = None,
+        drafter: Optional[NgramDrafter] = None,
+        draft_tokens: int = 8,
+        length_rate: Optional[float] = None,
+        length_margin: int = 8,
+        loop_window: Optional[int] = None,
     ) -> None:
+        """
+        When both `encoder_path` and `decoder_path` are given (see `mer.export.split_model`),
+        the encoder runs once per image and only the decoder runs on every decode step.
+        Otherwise the monolithic graph at `model_path` is run on every step.
+        `intra_op_num_threads`/`inter_op_num_threads` are forwarded to ONNX Runtime; leave them
+        unset to use its defaults (one intra-op thread per core).
+        `profile_prefix` turns on ONNX Runtime's profiler; each session writes a Chrome trace
+        JSON named `<prefix>_<role>_<timestamp>.json` (see `end_profiling`).
+        `session_options` sets `ort.SessionOptions` attributes by name; `graph_optimization_level`
+        ("disable", "basic", "extended", "all") and `execution_mode` ("sequential", "parallel")
+        also accept strings, and a `config` dict is passed to `add_session_config_entry`.
+        With `optimized_model_dir`, the optimized graph is saved there in ORT format on first
+        load and reused afterwards, keyed by ONNX Runtime version, providers, CPU architecture,
+        session options and the source file.
+        With a `drafter`, full-sequence decoders use speculative decoding: up to `draft_tokens`
+        proposed tokens per row are verified in one session call and the longest prefix that
+        matches the greedy argmax is kept, so the output is identical to greedy decoding.
+        With `length_rate`, every line gets its own decoding budget before decoding starts:
+        `length_rate` tokens per text height of inked width in the original image, plus
+        `length_margin` (see `step_budget`). With `loop_window`, a line whose last
+        `loop_window` tokens repeat a cycle of at most `loop_window // 4` tokens stops there.
+        Either way the output is a prefix of the unbounded greedy output; the rows cut short
+        are counted as `length_capped` / `loop_stopped` in the trace.
+        """
         self.model_path = Path(model_path).expanduser()
         self.vocab_path = Path(vocab_path).expanduser() if vocab_path else None
         self.config_path = Path(config_path).expanduser() if config_path else None
@@ -57,16 +147,135 @@ class Predictor:
         resolved_max_len = max_length if max_length is not None else self.hparams.get("max_decode_len", 128)
         self.max_length = int(resolved_max_len)
         self.vocab = self._load_vocab()
-        self.transform = self._build_transform()
+        # ToTensor + Normalize folded into one multiply-add: x * 1/(255*std) - mean/std.
+        mean = np.array(_MEAN, dtype=np.float32).reshape(3, 1, 1)
+        std = np.array(_STD, dtype=np.float32).reshape(3, 1, 1)
+        self._pixel_scale = 1.0 / (255.0 * std)
+        self._pixel_offset = -mean / std
+        self._input_buffer: Optional[np.ndarray] = None
+        self._logits_buffer: Optional[np.ndarray] = None
+        self._memory_axes: Optional[Dict[str, int]] = None
 
         self.providers = self._resolve_providers(providers, device)
-        self.session = session or ort.InferenceSession(
-            str(self.model_path),
-            providers=self.providers or ort.get_available_providers(),
-        )
+        self.intra_op_num_threads = intra_op_num_threads
+        self.inter_op_num_threads = inter_op_num_threads
+        self.profile_prefix = str(Path(profile_prefix).expanduser()) if profile_prefix else None
+        self.session_options = dict(session_options or {})
+        self.optimized_model_dir = Path(optimized_model_dir).expanduser() if optimized_model_dir else None
+        self.drafter = drafter
+        self.draft_tokens = int(draft_tokens)
+        if loop_window is not None and loop_window < 4:
+            raise ValueError("loop_window must be at least 4")
+        self.length_rate = length_rate
+        self.length_margin = int(length_margin)
+        self.loop_window = loop_window
+        self.encoder_session: Optional[ort.InferenceSession] = None
+        if encoder_path and decoder_path:
+            self.encoder_session = self._create_session(encoder_path, role="encoder")
+            self.session = session or self._create_session(decoder_path, role="decoder")
+        else:
+            self.session = session or self._create_session(self.model_path)
+        self.memory_names = [out.name for out in self.encoder_session.get_outputs()] if self.encoder_session else []
         self.output_name = self._select_output_name()
+        self.emits_tokens = self._output_type() == "tensor(int64)"
+        self.position_input_name = POSITION_INPUT if POSITION_INPUT in self._input_names() else None
+        self._logits_dim = self._static_logits_dim()
+        self._bind_device = "cuda" if self.session.get_providers()[0] == "CUDAExecutionProvider" else "cpu"
+        self.past_names, self.present_names = self._select_cache_names()
         self.image_input_name, self.tgt_input_name = self._select_input_names()
 
+    def _create_session(self, path: PathLike, role: str = "model") -> ort.InferenceSession:
+        path = Path(path).expanduser()
+        if not path.exists():
+            raise FileNotFoundError(f"Model graph not found: {path}")
+        providers = self.providers or ort.get_available_providers()
+        optimized = self._optimized_model_path(path, providers)
+        if optimized is not None and optimized.exists():
+            try:
+                return ort.InferenceSession(str(optimized), sess_options=self._session_options(role), providers=providers)
+            except Exception:  # noqa: BLE001 - a truncated or stale cache entry is rebuilt below
+                optimized.unlink(missing_ok=True)
+
+        options = self._session_options(role)
+        staging = None
+        if optimized is not None:
+            optimized.parent.mkdir(parents=True, exist_ok=True)
+            # Write under a private name and rename, so concurrent starts never read a partial file.
+            staging = optimized.with_name(f"{optimized.stem}.{os.getpid()}.tmp{optimized.suffix}")
+            options.optimized_model_filepath = str(staging)
+        session = ort.InferenceSession(str(path), sess_options=options, providers=providers)
+        if staging is not None and staging.exists():
+            os.replace(staging, optimized)
+        return session
+
+    def _optimized_model_path(self, path: Path, providers: Sequence[str]) -> Optional[Path]:
+        if self.optimized_model_dir is None:
+            return None
+        identity = model_identity(
+            [path],
+            onnxruntime=ort.__version__,
+            providers=",".join(providers),
+            machine=platform.machine(),
+            options=sorted((name, repr(value)) for name, value in self.session_options.items()),
+        )
+        digest = hashlib.blake2b(identity.encode("utf-8"), digest_size=8).hexdigest()
+        return self.optimized_model_dir / f"{path.stem}-{digest}.ort"
+
+    def _session_options(self, role: str = "model") -> ort.SessionOptions:
+        options = ort.SessionOptions()
+        if self.intra_op_num_threads is not None:
+            options.intra_op_num_threads = int(self.intra_op_num_threads)
+        if self.inter_op_num_threads is not None:
+            options.inter_op_num_threads = int(self.inter_op_num_threads)
+        for name, value in self.session_options.items():
+            if name == "config":
+                for key, entry in dict(value).items():
+                    options.add_session_config_entry(key, str(entry))
+                continue
+            if name == "graph_optimization_level" and isinstance(value, str):
+                value = getattr(ort.GraphOptimizationLevel, _lookup(_OPTIMIZATION_LEVELS, name, value))
+            elif name == "execution_mode" and isinstance(value, str):
+                value = getattr(ort.ExecutionMode, _lookup(_EXECUTION_MODES, name, value))
+            if name.startswith("_") or not hasattr(options, name):
+                raise ValueError(f"Unknown session option {name!r}")
+            setattr(options, name, value)
+        if self.profile_prefix:
+            Path(self.profile_prefix).parent.mkdir(parents=True, exist_ok=True)
+            options.enable_profiling = True
+            options.profile_file_prefix = f"{self.profile_prefix}_{role}"
+        return options
+
+    def end_profiling(self) -> List[str]:
+        """
+        Stop ONNX Runtime profiling and return the written trace files. Profiling stays off
+        for the rest of the sessions' lifetime. Returns an empty list when it was never on.
+        """
+        if not self.profile_prefix:
+            return []
+        sessions = [s for s in (self.encoder_session, self.session) if s is not None]
+        self.profile_prefix = None
+        return [path for path in (s.end_profiling() for s in sessions) if path]
+
+    def clone(self) -> "Predictor":
+        """
+        A predictor sharing this one's sessions, vocabulary and config but with its own
+        scratch buffers, so several threads can decode concurrently
+        (`InferenceSession.run` is thread-safe).
+        """
+        twin = copy.copy(self)
+        twin._input_buffer = None
+        twin._logits_buffer = None
+        return twin
+
+    @property
+    def is_split(self) -> bool:
+        return self.encoder_session is not None
+
+    @property
+    def is_incremental(self) -> bool:
+        """True when the decoder takes past key/value tensors and decodes one token per step."""
+        return bool(self.past_names)
+
     def _load_config(self) -> dict:
         search_paths: List[Optional[Path]] = []
         if self.config_path:
@@ -109,15 +318,6 @@ class Predictor:
         resolved["max_decode_len"] = int(resolved["max_decode_len"])
         return resolved
 
-    def _build_transform(self) -> transforms.Compose:
-        return transforms.Compose(
-            [
-                transforms.Resize((self.hparams["img_height"], self.hparams["img_width"])),
-                transforms.ToTensor(),
-                transforms.Normalize(mean=[0.485, 0.456, 0.406], std=[0.229, 0.224, 0.225]),
-            ]
-        )
-
     def _resolve_providers(self, providers: Optional[List[str]], device: Optional[Union[str, os.PathLike]]) -> Optional[List[str]]:
         if providers:
             return providers
@@ -135,54 +335,1023 @@ class Predictor:
                 return candidate.name
         return outputs[0].name
 
+    def _output_type(self) -> str:
+        return next(out.type for out in self.session.get_outputs() if out.name == self.output_name)
+
+    def _input_names(self) -> List[str]:
+        return [inp.name for inp in self.session.get_inputs()]
+
+    @property
+    def is_last_position(self) -> bool:
+        """True for decoders rewritten by `mer.export.gather_last_position` (one position per step)."""
+        return self.position_input_name is not None
+
+    def _static_logits_dim(self) -> Optional[int]:
+        for out in self.session.get_outputs():
+            if out.name == self.output_name and out.shape and isinstance(out.shape[-1], int):
+                return out.shape[-1]
+        return None
+
+    def _logits_out(self, batch_size: int, seq_len: int) -> Optional[np.ndarray]:
+        """
+        Reusable output buffer for IO binding, grown on demand: `(N, seq, vocab)` logits, or
+        `(N, seq)` int64 tokens for graphs that emit the argmax. None while the vocabulary
+        dimension is unknown (symbolic in the graph and not yet observed).
+        """
+        if self.emits_tokens:
+            shape, dtype = (batch_size, seq_len), np.int64
+        elif self._logits_dim is None:
+            return None
+        else:
+            shape, dtype = (batch_size, seq_len, self._logits_dim), np.float32
+        buffer = self._logits_buffer
+        if buffer is None or buffer.shape[0] < batch_size or buffer.shape[1:] != shape[1:] or buffer.dtype != dtype:
+            buffer = self._logits_buffer = np.empty(shape, dtype=dtype)
+        return buffer[:batch_size]
+
+    def _select_cache_names(self) -> tuple[List[str], List[str]]:
+        """
+        Pair past key/value inputs (`past_key_values.0.key`, `past_0_value`, ...) with the
+        `present*` outputs that carry the updated cache. Unmatched names pair up by position.
+        """
+        past_names = [inp.name for inp in self.session.get_inputs() if inp.name.startswith(_PAST_PREFIXES)]
+        if not past_names:
+            return [], []
+        output_names = [out.name for out in self.session.get_outputs()]
+        present_outputs = [name for name in output_names if name.startswith("present")]
+        if len(present_outputs) != len(past_names):
+            raise ValueError(
+                f"Decoder exposes {len(past_names)} past key/value inputs but {len(present_outputs)} present outputs"
+            )
+        present_names: List[str] = []
+        for idx, past in enumerate(past_names):
+            prefix = next(p for p in _PAST_PREFIXES if past.startswith(p))
+            candidate = "present" + past[len(prefix):]
+            present_names.append(candidate if candidate in present_outputs else present_outputs[idx])
+        return past_names, present_names
+
+    def _empty_past(self, batch_size: int) -> Dict[str, np.ndarray]:
+        """
+        Zero-length caches for the first incremental step. Axis 0 is the batch; the past
+        sequence axis is the symbolic dimension named like `*seq*`/`*len*`/`past*`, else the
+        second-to-last axis. All other dimensions must be static.
+        """
+        feeds: Dict[str, np.ndarray] = {}
+        for inp in self.session.get_inputs():
+            if inp.name not in self.past_names:
+                continue
+            dims = list(inp.shape)
+            symbolic = [i for i, d in enumerate(dims) if i > 0 and not isinstance(d, int)]
+            named = [i for i in symbolic if any(key in str(dims[i]).lower() for key in ("seq", "len", "past"))]
+            seq_axis = named[0] if named else len(dims) - 2
+            shape = []
+            for axis, dim in enumerate(dims):
+                if axis == 0:
+                    shape.append(batch_size)
+                elif axis == seq_axis:
+                    shape.append(0)
+                elif isinstance(dim, int):
+                    shape.append(dim)
+                else:
+                    raise ValueError(f"Cannot infer static dimension {axis} of past input {inp.name!r}: {dims}")
+            feeds[inp.name] = np.zeros(shape, dtype=_ORT_DTYPES.get(inp.type, "float32"))
+        return feeds
+
     def _select_input_names(self) -> tuple[str, str]:
+        if self.encoder_session is not None:
+            encoder_names = [inp.name for inp in self.encoder_session.get_inputs()]
+            img_name = "images" if "images" in encoder_names else encoder_names[0]
+            decoder_names = [
+                inp.name
+                for inp in self.session.get_inputs()
+                if inp.name not in self.memory_names
+                and inp.name not in self.past_names
+                and inp.name != self.position_input_name
+            ]
+            tgt_name = "tgt" if "tgt" in decoder_names else decoder_names[0]
+            return img_name, tgt_name
         inputs = self.session.get_inputs()
-        names = [inp.name for inp in inputs]
+        names = [inp.name for inp in inputs if inp.name not in self.past_names and inp.name != self.position_input_name]
         img_name = "images" if "images" in names else names[0]
         tgt_name = "tgt" if "tgt" in names else (names[1] if len(names) > 1 else names[0])
         return img_name, tgt_name
 
-    def _prepare_image(self, image: Union[PathLike, Image.Image]) -> np.ndarray:
-        if isinstance(image, Image.Image):
-            pil_image = image.convert("RGB")
-        else:
-            image_path = Path(image).expanduser()
-            if not image_path.exists():
-                raise FileNotFoundError(f"Image not found: {image_path}")
-            pil_image = Image.open(image_path).convert("RGB")
-        tensor = self.transform(pil_image)  # (C, H, W)
-        return tensor.unsqueeze(0).cpu().numpy().astype(np.float32)  # (1, C, H, W)
-
-    def _greedy_decode(self, image_array: np.ndarray) -> List[int]:
+    @property
+    def input_size(self) -> Tuple[int, int]:
+        """Model input `(width, height)` every line image is resized to."""
+        return self.hparams["img_width"], self.hparams["img_height"]
+
+    def _load_image(self, image: ImageInput) -> Image.Image:
+        return open_image(image, draft_size=self.input_size)
+
+    def _prepare_into(self, image: ImageInput, out: np.ndarray) -> int:
+        """
+        Resize and normalize one image straight into `out`, a float32 `(C, H, W)` view, and
+        return its decoding budget (see `step_budget`).
+        Matches torchvision's Resize (PIL bilinear) + ToTensor + Normalize. Grayscale images
+        are resized as one channel and broadcast, which equals converting to RGB first.
+        """
+        loaded = self._load_image(image)
+        pixels = np.asarray(loaded.resize(self.input_size, Image.BILINEAR))  # (H, W[, C]) uint8
+        budget = self._budget_from_pixels(loaded.size, pixels)
+        if pixels.ndim == 2:
+            pixels = pixels[:, :, None]
+        np.multiply(pixels.transpose(2, 0, 1), self._pixel_scale, out=out)
+        out += self._pixel_offset
+        return budget
+
+    def _budget_from_pixels(self, size: Tuple[int, int], pixels: np.ndarray) -> int:
+        """`step_budget` of an image of `size` (width, height), given its resized pixels."""
+        limit = self.max_length - 1
+        if self.length_rate is None:
+            return limit
+        ink_width, ink_height = ink_extent(pixels)  # measured at model resolution, then rescaled
+        ratio = 0.0
+        if ink_width:
+            (width, height), (model_width, model_height) = size, self.input_size
+            ratio = (ink_width * width / model_width) / (ink_height * height / model_height)
+        return max(1, min(limit, int(np.ceil(self.length_rate * ratio)) + self.length_margin))
+
+    def step_budget(self, image: ImageInput) -> int:
+        """
+        Decoding steps (tokens, <EOS> included) allowed for a line image: the inked width of
+        the original image in text heights, times `length_rate`, plus `length_margin`, capped
+        at `max_length - 1`. Without `length_rate` it is always `max_length - 1`.
+        """
+        loaded = self._load_image(image)
+        return self._budget_from_pixels(loaded.size, np.asarray(loaded.resize(self.input_size, Image.BILINEAR)))
+
+    def length_estimate(self, image: ImageInput) -> float:
+        """
+        Expected output length of a line image, in text heights: its inked width over its
+        inked height (see `mer.segment.ink_extent`), measured on a grayscale copy reduced to
+        about 32 rows. Only used to order images for batching, so it skips the model resize.
+        """
+        loaded = self._load_image(image)
+        gray = loaded if loaded.mode == "L" else loaded.convert("L")
+        factor = max(1, gray.height // _ESTIMATE_HEIGHT)
+        ink_width, ink_height = ink_extent(np.asarray(gray.reduce(factor) if factor > 1 else gray))
+        return ink_width / ink_height if ink_width else 0.0
+
+    def _budgets(self, count: int) -> Optional[np.ndarray]:
+        return np.empty(count, dtype=np.int64) if self.length_rate is not None else None
+
+    def _prepare_image(self, image: ImageInput, budgets: Optional[np.ndarray] = None) -> np.ndarray:
+        shape = (1, 3, self.hparams["img_height"], self.hparams["img_width"])
+        image_array = np.empty(shape, dtype=np.float32)
+        budget = self._prepare_into(image, image_array[0])
+        if budgets is not None:
+            budgets[0] = budget
+        return image_array  # (1, C, H, W)
+
+    def _encode(self, image_array: np.ndarray, trace: Optional[Trace] = None) -> Dict[str, np.ndarray]:
+        """
+        Build the per-image feeds shared by every decode step: the encoder memory in split
+        mode, or the image tensor itself for the monolithic graph.
+        """
+        if self.encoder_session is None:
+            return {self.image_input_name: image_array}
+        with stage(trace, "encode"):
+            memory = self.encoder_session.run(self.memory_names, {self.image_input_name: image_array})
+        if trace is not None:
+            trace.session_runs += 1
+        return dict(zip(self.memory_names, memory))
+
+    def _greedy_decode(
+        self, image_array: np.ndarray, trace: Optional[Trace] = None, budgets: Optional[np.ndarray] = None
+    ) -> List[int]:
+        return self._greedy_decode_batch(image_array, trace=trace, budgets=budgets)[0]
+
+    def _looping(self, tails: np.ndarray) -> np.ndarray:
+        """Rows of `(N, loop_window)` token tails made of one cycle of at most `loop_window // 4` tokens."""
+        looping = np.zeros(tails.shape[0], dtype=bool)
+        for period in range(1, tails.shape[1] // 4 + 1):
+            looping |= (tails[:, period:] == tails[:, :-period]).all(axis=1)
+        return looping
+
+    def _cut_rows(
+        self,
+        tokens: np.ndarray,
+        length: Union[int, np.ndarray],
+        active: np.ndarray,
+        budgets: Optional[np.ndarray],
+        trace: Optional[Trace],
+    ) -> None:
+        """
+        Deactivate (in place) the `active` rows of `tokens` that used up their step budget or
+        ended in a loop. Every active row holds `length` tokens (one count for the whole
+        batch, or one per row), <SOS> included.
+        """
+        lengths = np.broadcast_to(np.asarray(length, dtype=np.int64), active.shape)
+        if budgets is not None:
+            capped = active & (budgets <= lengths - 1)
+            if capped.any():
+                active &= ~capped
+                if trace is not None:
+                    trace.length_capped += int(capped.sum())
+        window = self.loop_window
+        if window:
+            eligible = active & (lengths - 1 >= window)
+            if eligible.any():
+                columns = np.maximum(lengths[:, None] - window + np.arange(window), 0)
+                looping = eligible & self._looping(np.take_along_axis(tokens, columns, axis=1))
+                if looping.any():
+                    active &= ~looping
+                    if trace is not None:
+                        trace.loop_stopped += int(looping.sum())
+
+    def _greedy_decode_batch(
+        self,
+        image_array: np.ndarray,
+        trace: Optional[Trace] = None,
+        scores: Optional[np.ndarray] = None,
+        budgets: Optional[np.ndarray] = None,
+    ) -> List[List[int]]:
+        """
+        Vectorized greedy decoding over a `(N, C, H, W)` batch. Every step is one session call
+        for the whole batch; rows stop growing once they emit <EOS> and the loop ends as soon
+        as all rows have finished. Returns the generated tokens (starting with <SOS>) per row.
+        With a `trace`, session calls and decode steps are counted and the loop is timed.
+        Last-position decoders get the step index as `position` and return one row per step
+        (logits or the argmax token) instead of the whole sequence.
+        With `scores`, an `(N, max_len)` float buffer, the log-probability of the token chosen
+        at each step (<EOS> included) is written to `scores[:, step]` for the rows still
+        decoding. `budgets` caps every row's steps (see `step_budget`).
+        Graphs with a static batch dimension get smaller batches padded with blank rows that
+        never decode; only the real rows are returned.
+        """
         sos_idx = self.vocab.char2idx["<SOS>"]
         eos_idx = self.vocab.char2idx["<EOS>"]
         pad_idx = self.vocab.char2idx["<PAD>"]
-        generated = [sos_idx]
+        live = image_array.shape[0]
+        padding = max(0, (self.max_batch_size or 0) - live)
+        if padding:  # fill a static batch dimension with blank rows that start out finished
+            blank = np.zeros((padding, *image_array.shape[1:]), dtype=image_array.dtype)
+            image_array = np.concatenate((image_array, blank))
+            if budgets is not None:
+                budgets = np.concatenate((budgets, np.ones(padding, dtype=np.int64)))
+        batch_size = image_array.shape[0]
         max_len = self.max_length
+        feeds = self._encode(image_array, trace=trace)
+        if self.past_names:
+            return self._incremental_decode_batch(feeds, batch_size, trace=trace, scores=scores, budgets=budgets, live=live)
+        if self.is_speculative and scores is None:
+            return self._speculative_decode_batch(feeds, batch_size, trace=trace, budgets=budgets, live=live)
+        max_steps = max_len - 1 if budgets is None else int(min(max_len - 1, budgets.max()))
+
+        tgt = np.full((batch_size, max_len), pad_idx, dtype=np.int64)
+        tgt[:, 0] = sos_idx
+        lengths = np.ones(batch_size, dtype=np.int64)
+        active = np.arange(batch_size) < live
+        next_tokens = np.empty(batch_size, dtype=np.int64)
+        not_eos = np.empty(batch_size, dtype=bool)
 
-        for _ in range(max_len - 1):  # leave room for EOS
-            tgt = np.full((1, max_len), pad_idx, dtype=np.int64)
-            tgt[0, : len(generated)] = generated
-            outputs = self.session.run(
-                [self.output_name],
-                {
-                    self.image_input_name: image_array,
-                    self.tgt_input_name: tgt,
-                },
+        # Bind the per-image inputs once. On CPU the tgt OrtValue aliases the numpy buffer, so
+        # writing the next token into `tgt` is all a step needs; device copies are refreshed.
+        binding = self.session.io_binding()
+        for name, value in feeds.items():
+            binding.bind_ortvalue_input(
+                name, ort.OrtValue.ortvalue_from_numpy(np.ascontiguousarray(value), self._bind_device, 0)
             )
-            logits = outputs[0]  # (1, seq, vocab)
-            next_pos = len(generated) - 1
-            next_token = int(logits[0, next_pos, :].argmax(axis=-1))
-            if next_token == eos_idx:
-                break
-            generated.append(next_token)
-
-        return generated
-
-    def predict(self, image: Union[PathLike, Image.Image]) -> str:
-        image_array = self._prepare_image(image)
-        tokens = self._greedy_decode(image_array)
+        tgt_value = ort.OrtValue.ortvalue_from_numpy(tgt, self._bind_device, 0)
+        binding.bind_ortvalue_input(self.tgt_input_name, tgt_value)
+        position = np.zeros(1, dtype=np.int64)
+        position_value = None
+        if self.position_input_name:
+            position_value = ort.OrtValue.ortvalue_from_numpy(position, self._bind_device, 0)
+            binding.bind_ortvalue_input(self.position_input_name, position_value)
+        rows = 1 if self.position_input_name else max_len
+        logits = self._logits_out(batch_size, rows)
+        if logits is not None:
+            binding.bind_ortvalue_output(self.output_name, ort.OrtValue.ortvalue_from_numpy(logits))
+        else:
+            binding.bind_output(self.output_name, "cpu")
+
+        steps = 0
+        with stage(trace, "decode"):
+            for step in range(max_steps):  # leave room for EOS
+                position[0] = step
+                if self._bind_device != "cpu" and step:
+                    tgt_value.update_inplace(tgt)
+                    if position_value is not None:
+                        position_value.update_inplace(position)
+                self.session.run_with_iobinding(binding)
+                steps += 1
+                if logits is None:
+                    # Vocabulary size was symbolic; learn it and bind a reusable buffer from now on.
+                    produced = binding.copy_outputs_to_cpu()[0]
+                    self._logits_dim = produced.shape[-1]
+                    logits = self._logits_out(batch_size, rows)
+                    logits[...] = produced
+                    binding.bind_ortvalue_output(self.output_name, ort.OrtValue.ortvalue_from_numpy(logits))
+                row = 0 if self.position_input_name else step
+                if self.emits_tokens:
+                    np.copyto(next_tokens, logits[:, row])
+                else:
+                    np.argmax(logits[:, row, :], axis=-1, out=next_tokens)
+                if scores is not None:
+                    chosen = np.take_along_axis(_log_softmax(logits[:, row, :]), next_tokens[:, None], axis=-1)
+                    np.copyto(scores[:, step], chosen[:, 0], where=active)
+                np.not_equal(next_tokens, eos_idx, out=not_eos)
+                active &= not_eos
+                if not active.any():
+                    break
+                np.copyto(tgt[:, step + 1], next_tokens, where=active)
+                lengths += active
+                if budgets is not None or self.loop_window:
+                    self._cut_rows(tgt, step + 2, active, budgets, trace)
+                    if not active.any():
+                        break
+        if trace is not None:
+            trace.session_runs += steps
+            trace.decode_steps += steps
+
+        return [tgt[row, : lengths[row]].tolist() for row in range(live)]
+
+    @property
+    def is_speculative(self) -> bool:
+        """Speculative decoding needs logits for every position, i.e. a full-sequence decoder."""
+        return self.drafter is not None and self.draft_tokens > 0 and not self.past_names and not self.position_input_name
+
+    def _speculative_decode_batch(
+        self,
+        feeds: Dict[str, np.ndarray],
+        batch_size: int,
+        trace: Optional[Trace] = None,
+        budgets: Optional[np.ndarray] = None,
+        live: Optional[int] = None,
+    ) -> List[List[int]]:
+        """
+        Draft-and-verify greedy decoding. Each row's drafted tokens are written after its
+        prefix and the whole batch is scored in one call; because the decoder is causal, the
+        logits at position `i` are exactly what greedy decoding would see after `tgt[:i+1]`.
+        Drafted tokens are accepted while they equal the argmax, and the first argmax that
+        disagrees is appended too, so every call makes at least one token of progress.
+        Decoded rows are fed back to the drafter. A row's budget or a loop stops it at the same
+        token greedy decoding would stop at. Rows from `live` on only pad a static batch
+        dimension and are never decoded.
+        """
+        sos_idx = self.vocab.char2idx["<SOS>"]
+        eos_idx = self.vocab.char2idx["<EOS>"]
+        pad_idx = self.vocab.char2idx["<PAD>"]
+        max_len = self.max_length
+        tgt = np.full((batch_size, max_len), pad_idx, dtype=np.int64)
+        tgt[:, 0] = sos_idx
+        live = batch_size if live is None else live
+        lengths = [1] * batch_size
+        active = [row < live for row in range(batch_size)]
+        ended = [False] * batch_size
+        # Tokens each row may hold, <SOS> included.
+        limits = [max_len] * batch_size if budgets is None else [min(max_len, int(budget) + 1) for budget in budgets]
+        window = self.loop_window
+        feeds[self.tgt_input_name] = tgt
+
+        steps = 0
+        with stage(trace, "decode"):
+            while any(active):
+                drafted = [0] * batch_size
+                for row in range(batch_size):
+                    if not active[row]:
+                        continue
+                    length = lengths[row]
+                    draft = self.drafter.propose(tgt[row, :length], min(self.draft_tokens, limits[row] - length), eos_idx)
+                    tgt[row, length : length + len(draft)] = draft
+                    drafted[row] = len(draft)
+                logits = self.session.run([self.output_name], feeds)[0]  # (N, seq, vocab)
+                steps += 1
+                for row in range(batch_size):
+                    if not active[row]:
+                        continue
+                    length = lengths[row]
+                    count = drafted[row]
+                    greedy = logits[row, length - 1 : length + count, :].argmax(axis=-1)
+                    for offset, token in enumerate(greedy.tolist()):
+                        if token == eos_idx:
+                            active[row], ended[row] = False, True
+                            break
+                        confirmed = offset < count and token == tgt[row, length]
+                        tgt[row, length] = token
+                        length += 1
+                        # Greedy decoding stops at the same token without looking further.
+                        if length >= limits[row]:
+                            active[row] = False
+                            if budgets is not None and trace is not None:
+                                trace.length_capped += 1
+                            break
+                        if window and length - 1 >= window and self._looping(tgt[row : row + 1, length - window : length])[0]:
+                            active[row] = False
+                            if trace is not None:
+                                trace.loop_stopped += 1
+                            break
+                        if not confirmed:
+                            break
+                    tgt[row, length:] = pad_idx  # drop rejected drafts
+                    lengths[row] = length
+        if trace is not None:
+            trace.session_runs += steps
+            trace.decode_steps += steps
+
+        tokens = [tgt[row, : lengths[row]].tolist() for row in range(live)]
+        for row, sequence in enumerate(tokens):
+            self.drafter.observe(sequence + [eos_idx] if ended[row] else sequence)
+        return tokens
+
+    def _incremental_decode_batch(
+        self,
+        feeds: Dict[str, np.ndarray],
+        batch_size: int,
+        trace: Optional[Trace] = None,
+        scores: Optional[np.ndarray] = None,
+        budgets: Optional[np.ndarray] = None,
+        live: Optional[int] = None,
+    ) -> List[List[int]]:
+        """
+        Greedy decoding that feeds only the newest token and carries the key/value cache
+        between steps, so each step costs O(1) decoder positions instead of O(max_len).
+        Finished rows keep feeding <EOS> until the whole batch is done. Only the first `live`
+        rows (default: all) are decoded; the rest only pad a static batch dimension.
+        """
+        sos_idx = self.vocab.char2idx["<SOS>"]
+        eos_idx = self.vocab.char2idx["<EOS>"]
+        live = batch_size if live is None else live
+        generated = np.full((batch_size, self.max_length), sos_idx, dtype=np.int64)
+        lengths = np.ones(batch_size, dtype=np.int64)
+        active = np.arange(batch_size) < live
+        output_names = [self.output_name, *self.present_names]
+        feeds.update(self._empty_past(batch_size=batch_size))
+        last = np.full((batch_size, 1), sos_idx, dtype=np.int64)
+        max_steps = self.max_length - 1 if budgets is None else int(min(self.max_length - 1, budgets.max()))
+
+        steps = 0
+        with stage(trace, "decode"):
+            for step in range(max_steps):  # leave room for EOS
+                feeds[self.tgt_input_name] = last
+                logits, *present = self.session.run(output_names, feeds)
+                steps += 1
+                next_tokens = logits[:, -1, :].argmax(axis=-1)
+                if scores is not None:
+                    chosen = np.take_along_axis(_log_softmax(logits[:, -1, :]), next_tokens[:, None], axis=-1)
+                    np.copyto(scores[:, step], chosen[:, 0], where=active)
+                active &= next_tokens != eos_idx
+                if not active.any():
+                    break
+                generated[active, step + 1] = next_tokens[active]
+                lengths[active] += 1
+                if budgets is not None or self.loop_window:
+                    self._cut_rows(generated, step + 2, active, budgets, trace)
+                    if not active.any():
+                        break
+                last = np.where(active, next_tokens, eos_idx).astype(np.int64).reshape(batch_size, 1)
+                feeds.update(zip(self.past_names, present))
+        if trace is not None:
+            trace.session_runs += steps
+            trace.decode_steps += steps
+
+        return [generated[row, : lengths[row]].tolist() for row in range(live)]
+
+    @property
+    def refills_slots(self) -> bool:
+        """
+        Rows can join a batch that is already decoding: a full-sequence decoder reads every
+        row's logits at its own position, so rows at different steps share one session call.
+        """
+        return not self.past_names and not self.position_input_name
+
+    def _continuous_decode(
+        self,
+        order: Iterator[int],
+        prepare_row: Callable[[int, np.ndarray], int],
+        slots: int,
+        trace: Optional[Trace] = None,
+        scored: bool = False,
+        budgeted: bool = False,
+    ) -> Iterator[Tuple[int, List[int], Optional[np.ndarray]]]:
+        """
+        Greedy decoding of the rows in `order` with `slots` rows in flight. `prepare_row(idx,
+        out)` preprocesses a row into `out`, a `(C, H, W)` view of the reusable input buffer,
+        and returns its step budget. Whenever rows finish, the next ones are written (and, for
+        split graphs, encoded) into their slots before the following step, so the batch stays
+        full until `order` runs dry. Yields `(index, tokens, log_probs)` as rows finish, i.e.
+        not in `order`; `log_probs` is None unless `scored` (see `_greedy_decode_batch`).
+        Budgets only count as `length_capped` when `budgeted`. Needs `refills_slots`.
+        """
+        sos_idx = self.vocab.char2idx["<SOS>"]
+        eos_idx = self.vocab.char2idx["<EOS>"]
+        pad_idx = self.vocab.char2idx["<PAD>"]
+        max_len = self.max_length
+        order = iter(order)
+        first = list(itertools.islice(order, slots))
+        if not first:
+            return
+        static = self.max_batch_size is not None
+        # A static batch dimension keeps its size: rows past the `slots` in flight stay zero
+        # and are never started, like the padding of `_greedy_decode_batch`.
+        capacity = self.max_batch_size if static else len(first)
+        inputs = self._input_rows(capacity)
+        inputs[len(first) :] = 0.0
+
+        tgt = np.full((capacity, max_len), pad_idx, dtype=np.int64)
+        lengths = np.ones(capacity, dtype=np.int64)
+        active = np.zeros(capacity, dtype=bool)
+        owners = np.zeros(capacity, dtype=np.int64)
+        limits = np.zeros(capacity, dtype=np.int64)
+        scores = np.zeros((capacity, max_len), dtype=np.float32) if scored else None
+        next_tokens = np.empty(capacity, dtype=np.int64)
+        every = np.arange(capacity)
+
+        def start(rows: np.ndarray, indices: List[int]) -> None:
+            for row, idx in zip(rows, indices):
+                limits[row] = prepare_row(idx, inputs[row])
+            tgt[rows] = pad_idx
+            tgt[rows, 0] = sos_idx
+            lengths[rows] = 1
+            active[rows] = True
+            owners[rows] = indices
+            if scores is not None:
+                scores[rows] = 0.0
+
+        start(every[: len(first)], first)
+        # For the monolithic graph the bound image buffer is `inputs` itself, so refilled rows
+        # are picked up as they are written; split graphs re-encode them into the memory.
+        feeds = self._encode(inputs, trace=trace)
+        buffers = {name: np.ascontiguousarray(value) for name, value in feeds.items()}
+        binding = self.session.io_binding()
+        values = {}
+        for name, buffer in buffers.items():
+            values[name] = ort.OrtValue.ortvalue_from_numpy(buffer, self._bind_device, 0)
+            binding.bind_ortvalue_input(name, values[name])
+        tgt_value = ort.OrtValue.ortvalue_from_numpy(tgt, self._bind_device, 0)
+        binding.bind_ortvalue_input(self.tgt_input_name, tgt_value)
+        logits = self._logits_out(capacity, max_len)
+        if logits is not None:
+            binding.bind_ortvalue_output(self.output_name, ort.OrtValue.ortvalue_from_numpy(logits))
+        else:
+            binding.bind_output(self.output_name, "cpu")
+
+        def refill(rows: np.ndarray, indices: List[int]) -> None:
+            start(rows, indices)
+            if self.encoder_session is not None:
+                whole = static or len(rows) == capacity  # static graphs only encode full batches
+                fresh = self._encode(inputs if whole else inputs[rows], trace=trace)
+                for name, value in fresh.items():
+                    if whole:
+                        buffers[name][...] = value
+                    else:
+                        axis = self._memory_batch_axes()[name]
+                        np.moveaxis(buffers[name], axis, 0)[rows] = np.moveaxis(value, axis, 0)
+            if self._bind_device != "cpu":
+                for name, value in values.items():
+                    value.update_inplace(buffers[name])
+
+        steps = 0
+        try:
+            while active.any():
+                with stage(trace, "decode"):
+                    while True:
+                        if self._bind_device != "cpu":
+                            tgt_value.update_inplace(tgt)
+                        self.session.run_with_iobinding(binding)
+                        steps += 1
+                        if logits is None:
+                            produced = binding.copy_outputs_to_cpu()[0]
+                            self._logits_dim = produced.shape[-1]
+                            logits = self._logits_out(capacity, max_len)
+                            logits[...] = produced
+                            binding.bind_ortvalue_output(self.output_name, ort.OrtValue.ortvalue_from_numpy(logits))
+                        current = logits[every, lengths - 1]  # every row at its own position
+                        if self.emits_tokens:
+                            np.copyto(next_tokens, current)
+                        else:
+                            np.argmax(current, axis=-1, out=next_tokens)
+                        if scores is not None:
+                            chosen = np.take_along_axis(_log_softmax(current), next_tokens[:, None], axis=-1)[:, 0]
+                            scores[every[active], lengths[active] - 1] = chosen[active]
+                        running = active.copy()
+                        active &= next_tokens != eos_idx
+                        tgt[every[active], lengths[active]] = next_tokens[active]
+                        lengths += active
+                        self._cut_rows(tgt, lengths, active, limits if budgeted else None, trace)
+                        active &= lengths < max_len
+                        finished = np.flatnonzero(running & ~active)
+                        if finished.size:
+                            break
+                for row in finished:
+                    length = int(lengths[row])
+                    log_probs = None
+                    if scores is not None:
+                        # Rows that stopped on <EOS> keep its score (see `_scored_batch`).
+                        log_probs = scores[row, : length - 1 + (length < max_len)].copy()
+                    yield int(owners[row]), tgt[row, :length].tolist(), log_probs
+                upcoming = list(itertools.islice(order, finished.size))
+                if upcoming:
+                    refill(finished[: len(upcoming)], upcoming)
+        finally:
+            if trace is not None:
+                trace.session_runs += steps
+                trace.decode_steps += steps
+
+    def _memory_batch_axes(self) -> Dict[str, int]:
+        """
+        Batch axis of every encoder output. Sequence-first transformers (PyTorch's default)
+        put it on axis 1. It is read from the output shapes when exactly one axis carries the
+        image input's batch dimension, and otherwise found once by encoding a batch of one and
+        of two images; graphs with a static batch dimension cannot be probed and use axis 0.
+        """
+        if self._memory_axes is None:
+            image_shape = next(inp.shape for inp in self.encoder_session.get_inputs() if inp.name == self.image_input_name)
+            batch_dim = image_shape[0] if image_shape else None
+            axes: Dict[str, int] = {}
+            for out in self.encoder_session.get_outputs():
+                matching = [axis for axis, dim in enumerate(out.shape or []) if batch_dim is not None and dim == batch_dim]
+                if len(matching) == 1:  # the image's batch dimension, by name or static size
+                    axes[out.name] = matching[0]
+            unresolved = [name for name in self.memory_names if name not in axes]
+            if unresolved and self.max_batch_size is None:
+                shape = (2, 3, self.hparams["img_height"], self.hparams["img_width"])
+                probe = np.zeros(shape, dtype=np.float32)
+                single = self.encoder_session.run(unresolved, {self.image_input_name: probe[:1]})
+                double = self.encoder_session.run(unresolved, {self.image_input_name: probe})
+                for name, one, two in zip(unresolved, single, double):
+                    differing = [axis for axis, (a, b) in enumerate(zip(one.shape, two.shape)) if a != b]
+                    axes[name] = differing[0] if differing else 0
+            self._memory_axes = {name: axes.get(name, 0) for name in self.memory_names}
+        return self._memory_axes
+
+    def _expand_feeds(self, feeds: Dict[str, np.ndarray], copies: int) -> Dict[str, np.ndarray]:
+        """Repeat every image's feeds `copies` times along the batch axis, image-major."""
+        axes = self._memory_batch_axes() if self.encoder_session is not None else {}
+        return {name: np.repeat(value, copies, axis=axes.get(name, 0)) for name, value in feeds.items()}
+
+    def _beam_decode_batch(
+        self,
+        feeds: Dict[str, np.ndarray],
+        batch_size: int,
+        beam_width: int,
+        trace: Optional[Trace] = None,
+        budgets: Optional[np.ndarray] = None,
+    ) -> List[tuple[List[int], np.ndarray]]:
+        """
+        Beam search over a batch. The `beam_width` best prefixes of every image are decoded
+        together, so each step is one session call over `N * beam_width` rows, and candidates
+        are ranked by total log-probability with one vectorized top-k over beam x vocabulary.
+        A hypothesis ends when <EOS> ranks among its image's top `beam_width` candidates; the
+        search stops once no live prefix can beat an image's best finished hypothesis, since
+        scores only decrease as a prefix grows. `beam_width=1` is greedy decoding.
+        `budgets` cap the search at the largest budget of the batch; loops are not detected.
+        Returns (tokens starting with <SOS>, log-probability of every chosen token) per image.
+        """
+        sos_idx = self.vocab.char2idx["<SOS>"]
+        eos_idx = self.vocab.char2idx["<EOS>"]
+        pad_idx = self.vocab.char2idx["<PAD>"]
+        width, max_len = int(beam_width), self.max_length
+        if budgets is not None:
+            max_len = min(max_len, int(budgets.max()) + 1)
+        rows = batch_size * width
+        feeds = self._expand_feeds(feeds, width)
+        if self.past_names:
+            feeds.update(self._empty_past(rows))
+        output_names = [self.output_name, *self.present_names]
+        # Incremental and last-position decoders return the current position only.
+        full_sequence = not (self.past_names or self.position_input_name)
+
+        tgt = np.full((batch_size, width, max_len), pad_idx, dtype=np.int64)
+        tgt[:, :, 0] = sos_idx
+        token_scores = np.zeros((batch_size, width, max_len), dtype=np.float32)
+        totals = np.full((batch_size, width), -np.inf)
+        totals[:, 0] = 0.0  # all beams start as the same prefix; expand it only once
+        best_totals = np.full(batch_size, -np.inf)
+        best: List[Optional[tuple[List[int], np.ndarray]]] = [None] * batch_size
+        images = np.arange(batch_size)[:, None]
+        position = np.zeros(1, dtype=np.int64)
+        length = 1  # tokens in every live prefix, <SOS> included
+
+        steps = 0
+        with stage(trace, "decode"):
+            for step in range(max_len - 1):  # leave room for EOS
+                flat = tgt.reshape(rows, max_len)
+                feeds[self.tgt_input_name] = flat[:, step : step + 1] if self.past_names else flat
+                if self.position_input_name:
+                    position[0] = step
+                    feeds[self.position_input_name] = position
+                logits, *present = self.session.run(output_names, feeds)
+                steps += 1
+                log_probs = _log_softmax(logits[:, step if full_sequence else 0, :]).reshape(batch_size, width, -1)
+                vocab_size = log_probs.shape[-1]
+                candidates = (totals[:, :, None] + log_probs).reshape(batch_size, -1)
+                # Each beam contributes at most one <EOS>, so the best 2k hold k continuations.
+                count = min(2 * width, candidates.shape[1])
+                top = np.argpartition(candidates, -count, axis=1)[:, -count:]
+                order = np.argsort(-np.take_along_axis(candidates, top, axis=1), axis=1, kind="stable")
+                top = np.take_along_axis(top, order, axis=1)
+                values = np.take_along_axis(candidates, top, axis=1)
+                source, tokens = np.divmod(top, vocab_size)
+                ended = tokens == eos_idx
+
+                finishing = ended[:, :width]
+                first = finishing.argmax(axis=1)
+                improved = finishing[images[:, 0], first] & (values[images[:, 0], first] > best_totals)
+                for image in np.flatnonzero(improved):
+                    beam = source[image, first[image]]
+                    best_totals[image] = values[image, first[image]]
+                    scores = token_scores[image, beam, :length].copy()
+                    scores[-1] = log_probs[image, beam, eos_idx]
+                    best[image] = (tgt[image, beam, :length].tolist(), scores)
+
+                keep = np.argsort(ended, axis=1, kind="stable")[:, :width]  # best candidates that go on
+                source = np.take_along_axis(source, keep, axis=1)
+                tokens = np.take_along_axis(tokens, keep, axis=1)
+                totals = np.take_along_axis(values, keep, axis=1)
+                tgt = tgt[images, source]
+                tgt[:, :, length] = tokens
+                token_scores = token_scores[images, source]
+                token_scores[:, :, length - 1] = log_probs[images, source, tokens]
+                length += 1
+                if self.past_names:
+                    reorder = (images * width + source).ravel()
+                    feeds.update((name, np.take(value, reorder, axis=0)) for name, value in zip(self.past_names, present))
+                if (best_totals >= totals[:, 0]).all():
+                    break
+        if trace is not None:
+            trace.session_runs += steps
+            trace.decode_steps += steps
+
+        # Images whose best prefix ran into `max_length` without <EOS> keep it, like greedy.
+        truncated = np.flatnonzero(totals[:, 0] > best_totals)
+        for image in truncated:
+            best[image] = (tgt[image, 0, :length].tolist(), token_scores[image, 0, : length - 1].copy())
+        if budgets is not None and trace is not None and max_len < self.max_length:
+            trace.length_capped += len(truncated)
+        return best
+
+    def _input_rows(self, count: int) -> np.ndarray:
+        """The first `count` rows of the reusable `(N, C, H, W)` input buffer, grown on demand."""
+        shape = (3, self.hparams["img_height"], self.hparams["img_width"])
+        if self._input_buffer is None or self._input_buffer.shape[0] < count:
+            self._input_buffer = np.empty((count, *shape), dtype=np.float32)
+        return self._input_buffer[:count]
+
+    def _prepare_batch(self, images: Sequence[ImageInput], budgets: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Preprocess `images` into a reusable `(N, C, H, W)` input buffer that grows on demand,
+        writing each image's step budget into `budgets` when given.
+        The returned view is only valid until the next call.
+        """
+        batch = self._input_rows(len(images))
+        for row, image in enumerate(images):
+            budget = self._prepare_into(image, batch[row])
+            if budgets is not None:
+                budgets[row] = budget
+        return batch
+
+    @property
+    def max_batch_size(self) -> Optional[int]:
+        """Static batch dimension of the image input, or None when the graph accepts any batch."""
+        session = self.encoder_session or self.session
+        for inp in session.get_inputs():
+            if inp.name == self.image_input_name and inp.shape and isinstance(inp.shape[0], int):
+                return inp.shape[0]
+        return None
+
+    def _slots(self, batch_size: int) -> int:
+        """Rows decoded together for a requested `batch_size`, within a static batch dimension."""
+        if batch_size < 1:
+            raise ValueError("batch_size must be at least 1")
+        return min(batch_size, self.max_batch_size or batch_size)
+
+    def _decode_scheduled(
+        self,
+        order: Sequence[int],
+        prepare_row: Callable[[int, np.ndarray], int],
+        slots: int,
+        trace: Optional[Trace],
+        budgeted: bool,
+        scored: bool = False,
+        decode: str = "greedy",
+        beam_width: int = 4,
+    ) -> list:
+        """
+        Decode the rows in `order` (longest expected output first) `slots` at a time and
+        return their texts, or scored result dicts, indexed by row. `prepare_row(idx, out)`
+        preprocesses a row into `out`, a `(C, H, W)` view of the reusable input buffer, and
+        returns its step budget; `budgeted` says whether the budgets come from `length_rate`
+        or are just `max_length - 1`.
+
+        Greedy decoding on decoders that `refills_slots` starts the next row in `order` as
+        soon as one finishes, so a long line no longer holds up the short ones batched with
+        it. Other decoders take `order` in consecutive chunks, which groups lines of similar
+        length into the same decode loop.
+        """
+        if scored and self.emits_tokens:
+            raise ValueError("Scores need logits, but this decoder only emits the argmax token")
+        results: list = [None] * len(order)
+        if decode == "greedy" and self.refills_slots and (scored or not self.is_speculative):
+            for idx, tokens, log_probs in self._continuous_decode(order, prepare_row, slots, trace, scored, budgeted):
+                results[idx] = self._scored_result(tokens, log_probs) if scored else self.vocab.decode(tokens)
+            return results
+        for start in range(0, len(order), slots):
+            chunk = order[start : start + slots]
+            image_array = self._input_rows(len(chunk))
+            budgets = np.array([prepare_row(idx, image_array[row]) for row, idx in enumerate(chunk)], dtype=np.int64)
+            if not budgeted:
+                budgets = None
+            if scored:
+                decoded = self._scored_batch(image_array, decode, beam_width, trace, budgets)
+            else:
+                tokens = self._greedy_decode_batch(image_array, trace=trace, budgets=budgets)
+                decoded = [self.vocab.decode(row) for row in tokens]
+            for idx, result in zip(chunk, decoded):
+                results[idx] = result
+        return results
+
+    def _schedule_images(
+        self, images: Sequence[ImageInput], trace: Optional[Trace]
+    ) -> Tuple[List[int], Callable[[int, np.ndarray], int]]:
+        """Longest-first order of `images` (see `length_estimate`) and a row preprocessor for `_decode_scheduled`."""
+        with stage(trace, "preprocess"):
+            loaded = [self._load_image(image) for image in images]
+            estimates = [self.length_estimate(image) for image in loaded]
+
+        def prepare_row(idx: int, out: np.ndarray) -> int:
+            with stage(trace, "preprocess"):
+                return self._prepare_into(loaded[idx], out)
+
+        return sorted(range(len(loaded)), key=lambda idx: -estimates[idx]), prepare_row
+
+    def _schedule_arrays(
+        self, image_array: np.ndarray, budgets: Optional[np.ndarray]
+    ) -> Tuple[List[int], Callable[[int, np.ndarray], int]]:
+        """`_schedule_images` for a preprocessed batch, ordered by the rows' `budgets` when given."""
+        count = len(image_array)
+
+        def prepare_row(idx: int, out: np.ndarray) -> int:
+            out[...] = image_array[idx]
+            return self.max_length - 1 if budgets is None else int(budgets[idx])
+
+        if budgets is None:
+            return list(range(count)), prepare_row
+        return sorted(range(count), key=lambda idx: -int(budgets[idx])), prepare_row
+
+    def predict(self, image: ImageInput, trace: Optional[Trace] = None) -> str:
+        budgets = self._budgets(1)
+        with stage(trace, "preprocess"):
+            image_array = self._prepare_image(image, budgets)
+        tokens = self._greedy_decode(image_array, trace=trace, budgets=budgets)
         return self.vocab.decode(tokens)
 
+    def predict_batch(
+        self, images: Sequence[ImageInput], trace: Optional[Trace] = None, batch_size: Optional[int] = None
+    ) -> List[str]:
+        """
+        Recognize several line images with one vectorized decode loop. Graphs exported with
+        a static batch dimension are fed in chunks of that size.
+        With `batch_size`, at most that many lines decode together, longest expected output
+        first, and finished lines are replaced mid-decode where the decoder allows it (see
+        `_decode_scheduled`). Results are returned in input order either way.
+        """
+        if not images:
+            return []
+        slots = self._slots(batch_size) if batch_size is not None else len(images)
+        if len(images) > slots:  # lines that fit in one batch need no scheduling
+            order, prepare_row = self._schedule_images(images, trace)
+            return self._decode_scheduled(order, prepare_row, slots, trace, self.length_rate is not None)
+        chunk = self.max_batch_size or len(images)
+        texts: List[str] = []
+        for start in range(0, len(images), chunk):
+            part = images[start : start + chunk]
+            budgets = self._budgets(len(part))
+            with stage(trace, "preprocess"):
+                image_array = self._prepare_batch(part, budgets)
+            tokens = self._greedy_decode_batch(image_array, trace=trace, budgets=budgets)
+            texts.extend(self.vocab.decode(row) for row in tokens)
+        return texts
+
+    def preprocess(self, image: ImageInput) -> np.ndarray:
+        """
+        Standalone `(1, C, H, W)` input for `image`. Uses no shared buffers, so it can run on
+        other threads while this predictor is decoding.
+        """
+        return self._prepare_image(image)
+
+    def prepare(self, image: ImageInput) -> Tuple[np.ndarray, int]:
+        """`preprocess` plus the image's `step_budget`, from a single decode of the image."""
+        budgets = np.empty(1, dtype=np.int64)
+        image_array = self._prepare_image(image, budgets)
+        return image_array, int(budgets[0])
+
+    def decode_batch(
+        self,
+        image_array: np.ndarray,
+        trace: Optional[Trace] = None,
+        budgets: Optional[np.ndarray] = None,
+        batch_size: Optional[int] = None,
+    ) -> List[str]:
+        """
+        Recognize an already preprocessed `(N, C, H, W)` batch, optionally with per-row
+        `budgets`. `batch_size` schedules the rows like `predict_batch`, ordered by budget.
+        """
+        slots = self._slots(batch_size) if batch_size is not None else len(image_array)
+        if len(image_array) > slots:
+            order, prepare_row = self._schedule_arrays(image_array, budgets)
+            return self._decode_scheduled(order, prepare_row, slots, trace, budgets is not None)
+        chunk = self.max_batch_size or len(image_array)
+        texts: List[str] = []
+        for start in range(0, len(image_array), chunk):
+            part = budgets[start : start + chunk] if budgets is not None else None
+            tokens = self._greedy_decode_batch(image_array[start : start + chunk], trace=trace, budgets=part)
+            texts.extend(self.vocab.decode(row) for row in tokens)
+        return texts
+
+    def predict_scored(
+        self,
+        images: Sequence[ImageInput],
+        decode: str = "greedy",
+        beam_width: int = 4,
+        trace: Optional[Trace] = None,
+        batch_size: Optional[int] = None,
+    ) -> List[Dict[str, object]]:
+        """
+        Recognize several line images and score them with the log-probabilities the decoder
+        already produced. Each result is `{"text", "log_prob", "chars"}` where `chars` lists
+        `{"char", "log_prob"}` per decoded character and `log_prob` is the line total
+        (<EOS> included). `decode="beam"` keeps the `beam_width` best prefixes per image.
+        `batch_size` schedules the lines as in `predict_batch`.
+        """
+        if not images:
+            return []
+        check_decoding(decode, beam_width)
+        slots = self._slots(batch_size) if batch_size is not None else len(images)
+        if len(images) > slots:
+            order, prepare_row = self._schedule_images(images, trace)
+            budgeted = self.length_rate is not None
+            return self._decode_scheduled(order, prepare_row, slots, trace, budgeted, True, decode, beam_width)
+        chunk = self.max_batch_size or len(images)
+        results: List[Dict[str, object]] = []
+        for start in range(0, len(images), chunk):
+            part = images[start : start + chunk]
+            budgets = self._budgets(len(part))
+            with stage(trace, "preprocess"):
+                image_array = self._prepare_batch(part, budgets)
+            results.extend(self._scored_batch(image_array, decode, beam_width, trace, budgets))
+        return results
+
+    def decode_scored(
+        self,
+        image_array: np.ndarray,
+        decode: str = "greedy",
+        beam_width: int = 4,
+        trace: Optional[Trace] = None,
+        budgets: Optional[np.ndarray] = None,
+        batch_size: Optional[int] = None,
+    ) -> List[Dict[str, object]]:
+        """`predict_scored` for an already preprocessed `(N, C, H, W)` batch (see `decode_batch`)."""
+        check_decoding(decode, beam_width)
+        slots = self._slots(batch_size) if batch_size is not None else len(image_array)
+        if len(image_array) > slots:
+            order, prepare_row = self._schedule_arrays(image_array, budgets)
+            budgeted = budgets is not None
+            return self._decode_scheduled(order, prepare_row, slots, trace, budgeted, True, decode, beam_width)
+        chunk = self.max_batch_size or len(image_array)
+        results: List[Dict[str, object]] = []
+        for start in range(0, len(image_array), chunk):
+            part = budgets[start : start + chunk] if budgets is not None else None
+            results.extend(self._scored_batch(image_array[start : start + chunk], decode, beam_width, trace, part))
+        return results
+
+    def _scored_batch(
+        self,
+        image_array: np.ndarray,
+        decode: str,
+        beam_width: int,
+        trace: Optional[Trace],
+        budgets: Optional[np.ndarray] = None,
+    ) -> List[Dict[str, object]]:
+        if self.emits_tokens:
+            raise ValueError("Scores need logits, but this decoder only emits the argmax token")
+        batch_size = image_array.shape[0]
+        if decode == "beam":
+            if self.max_batch_size is not None:
+                raise ValueError("Beam search needs a graph with a dynamic batch dimension")
+            feeds = self._encode(image_array, trace=trace)
+            hypotheses = self._beam_decode_batch(feeds, batch_size, beam_width, trace=trace, budgets=budgets)
+        else:
+            rows = max(batch_size, self.max_batch_size or 0)  # room for static-batch padding
+            scores = np.zeros((rows, self.max_length), dtype=np.float32)
+            tokens = self._greedy_decode_batch(image_array, trace=trace, scores=scores, budgets=budgets)
+            # Rows shorter than max_length stopped on <EOS>, whose score counts too; rows cut
+            # short by their budget or a loop add the zero score of the step they never ran.
+            hypotheses = [
+                (row, scores[idx, : len(row) - 1 + (len(row) < self.max_length)]) for idx, row in enumerate(tokens)
+            ]
+        return [self._scored_result(tokens, log_probs) for tokens, log_probs in hypotheses]
+
+    def _scored_result(self, tokens: List[int], log_probs: np.ndarray) -> Dict[str, object]:
+        skipped = (self.vocab.char2idx["<PAD>"], self.vocab.char2idx["<SOS>"])
+        chars = [
+            {"char": self.vocab.idx2char[token], "log_prob": float(score)}
+            for token, score in zip(tokens[1:], log_probs)
+            if token not in skipped
+        ]
+        return {"text": self.vocab.decode(tokens), "log_prob": float(log_probs.sum()), "chars": chars}
+
 
 __all__ = ["Predictor", "PathLike"]
@@ -0,0 +1,97 @@
+from __future__ import annotations
+
+import gc
+import threading
+from typing import TYPE_CHECKING, Dict, Optional, Tuple
+
+from .draft import NgramDrafter
+from .predictor import Predictor
+
+if TYPE_CHECKING:  # pragma: no cover
+    from .mer import Mer
+
+
+class ModelRegistry:
+    """
+    Process-wide cache of loaded models, keyed by everything that shapes an ONNX Runtime
+    session: graph and config paths, device/providers, thread counts and session options.
+
+    Every `Mer` in the process that asks for the same model gets a `Predictor.clone()` of one
+    shared predictor, so the config, vocabulary and sessions (the model weights) are loaded
+    once no matter how many instances, tenants or threads use them. Entries live until
+    `clear()`. Safe to share between threads.
+    """
+
+    def __init__(self) -> None:
+        self._predictors: Dict[Tuple[Tuple[str, str], ...], Predictor] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._predictors)
+
+    @staticmethod
+    def _key(session_kwargs: Dict[str, object]) -> Tuple[Tuple[str, str], ...]:
+        return tuple(sorted((name, repr(value)) for name, value in session_kwargs.items()))
+
+    def predictor(
+        self,
+        max_length: Optional[int] = None,
+        drafter: Optional[NgramDrafter] = None,
+        draft_tokens: int = 8,
+        length_rate: Optional[float] = None,
+        length_margin: int = 8,
+        loop_window: Optional[int] = None,
+        **session_kwargs,
+    ) -> Predictor:
+        """
+        A predictor for the model described by `session_kwargs` (see `Predictor`), built on
+        first use and shared afterwards. The decoding settings are per caller and never part
+        of the key.
+        """
+        if loop_window is not None and loop_window < 4:
+            raise ValueError("loop_window must be at least 4")
+        key = self._key(session_kwargs)
+        with self._lock:
+            shared = self._predictors.get(key)
+            if shared is None:
+                shared = self._predictors[key] = Predictor(**session_kwargs)
+        predictor = shared.clone()
+        if max_length is not None:
+            predictor.max_length = int(max_length)
+        predictor.drafter = drafter
+        predictor.draft_tokens = int(draft_tokens)
+        predictor.length_rate = length_rate
+        predictor.length_margin = int(length_margin)
+        predictor.loop_window = loop_window
+        return predictor
+
+    def clear(self) -> None:
+        """Forget every shared model; it is freed once no `Mer` instance uses it anymore."""
+        with self._lock:
+            self._predictors.clear()
+
+
+default_registry = ModelRegistry()
+
+
+def preload(freeze: bool = True, **mer_kwargs) -> "Mer":
+    """
+    Load a model into the process-wide registry ahead of time and return a `Mer` using it.
+
+    Call this in the parent of a pre-fork server (gunicorn `preload_app`, `multiprocessing`
+    with the fork start method) before workers are forked: every `Mer(**mer_kwargs)` created
+    in a worker then reuses the inherited sessions, whose memory pages are shared
+    copy-on-write instead of being loaded again per worker. With `freeze`, `gc.freeze()` moves
+    everything allocated so far out of the collector's reach, so collections in the workers
+    do not write to (and thereby copy) the shared pages.
+    """
+    from .mer import Mer
+
+    ocr = Mer(**mer_kwargs)
+    if freeze:
+        gc.collect()
+        gc.freeze()
+    return ocr
+
+
+__all__ = ["ModelRegistry", "default_registry", "preload"]
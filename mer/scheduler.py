@@ -0,0 +1,179 @@
+from __future__ import annotations
+
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, Dict, Generic, List, Optional, Sequence, Tuple, TypeVar
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+_STOP = object()
+
+
+class Overloaded(RuntimeError):
+    """Raised by `BatchScheduler` when new items would not fit under `max_queue_size`."""
+
+
+class BatchScheduler(Generic[T, R]):
+    """
+    Dynamic micro-batching in front of a batch function.
+
+    Items submitted from any thread are queued; a dispatcher thread takes the oldest item,
+    keeps collecting until `max_batch_size` items are gathered or `max_wait` seconds have
+    passed, then calls `run_batch` once and resolves every item's future separately.
+    `workers` dispatcher threads let several batches run at once (e.g. one per predictor
+    in a `PredictorPool`). With `max_queue_size`, `submit` rejects new items with
+    `Overloaded` instead of letting the backlog (and every caller's latency) grow unbounded.
+    """
+
+    def __init__(
+        self,
+        run_batch: Callable[[List[T]], List[R]],
+        max_batch_size: int = 16,
+        max_wait: float = 0.005,
+        workers: int = 1,
+        name: str = "mer-batcher",
+        max_queue_size: Optional[int] = None,
+    ) -> None:
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be at least 1")
+        if max_wait < 0:
+            raise ValueError("max_wait must be non-negative")
+        if max_queue_size is not None and max_queue_size < 1:
+            raise ValueError("max_queue_size must be at least 1")
+        self.run_batch = run_batch
+        self.max_batch_size = int(max_batch_size)
+        self.max_wait = float(max_wait)
+        self.max_queue_size = max_queue_size
+        self._queue: "queue.Queue[object]" = queue.Queue()
+        self._stats_lock = threading.Lock()
+        self._closed = False
+        self._submitted = 0
+        self._completed = 0
+        self._failed = 0
+        self._rejected = 0
+        self._batches = 0
+        self._max_queue_depth = 0
+        self._batch_sizes: Dict[int, int] = {}
+        self._threads = [
+            threading.Thread(target=self._run, name=f"{name}-{idx}", daemon=True) for idx in range(max(1, workers))
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def submit(self, item: T) -> "Future[R]":
+        """
+        Queue one item; the returned future resolves with its own result. Raises
+        `Overloaded` when the queue already holds `max_queue_size` items.
+        """
+        return self.submit_many([item])[0]
+
+    def submit_many(self, items: Sequence[T]) -> "List[Future[R]]":
+        """
+        Queue several items at once, or none of them: raises `Overloaded` when they do not
+        all fit under `max_queue_size`, so a rejected request leaves no work behind.
+        """
+        if self._closed:
+            raise RuntimeError("BatchScheduler is closed")
+        futures: "List[Future[R]]" = [Future() for _ in items]
+        with self._stats_lock:
+            self._reject_beyond_capacity(len(futures))
+            for item, future in zip(items, futures):
+                self._queue.put((item, future))
+            self._submitted += len(futures)
+            self._max_queue_depth = max(self._max_queue_depth, self._queue.qsize())
+        return futures
+
+    def check_capacity(self, count: int) -> None:
+        """
+        Raise `Overloaded` if `count` more items would not fit under `max_queue_size` right
+        now. Lets callers refuse a request before doing any work to prepare its items.
+        """
+        with self._stats_lock:
+            self._reject_beyond_capacity(count)
+
+    def _reject_beyond_capacity(self, count: int) -> None:
+        if self.max_queue_size is not None and self._queue.qsize() + count > self.max_queue_size:
+            self._rejected += count
+            raise Overloaded(f"{count} more items do not fit, {self._queue.qsize()} of {self.max_queue_size} are queued")
+
+    def queue_depth(self) -> int:
+        return self._queue.qsize()
+
+    def stats(self) -> dict:
+        """Snapshot of queue depth and batch-size statistics."""
+        with self._stats_lock:
+            batched = sum(size * count for size, count in self._batch_sizes.items())
+            return {
+                "queue_depth": self._queue.qsize(),
+                "max_queue_depth": self._max_queue_depth,
+                "submitted": self._submitted,
+                "completed": self._completed,
+                "failed": self._failed,
+                "rejected": self._rejected,
+                "batches": self._batches,
+                "mean_batch_size": batched / self._batches if self._batches else 0.0,
+                "batch_sizes": dict(sorted(self._batch_sizes.items())),
+            }
+
+    def close(self, timeout: Optional[float] = None) -> None:
+        """Stop accepting items, finish the queued ones and join the dispatcher threads."""
+        if self._closed:
+            return
+        self._closed = True
+        for _ in self._threads:
+            self._queue.put(_STOP)
+        for thread in self._threads:
+            thread.join(timeout)
+
+    def _collect(self) -> Tuple[List[Tuple[T, "Future[R]"]], bool]:
+        """Gather the next batch; the flag is False once a stop sentinel was consumed."""
+        first = self._queue.get()
+        if first is _STOP:
+            return [], False
+        batch = [first]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                entry = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if entry is _STOP:
+                return batch, False
+            batch.append(entry)
+        return batch, True
+
+    def _run(self) -> None:
+        running = True
+        while running:
+            batch, running = self._collect()
+            live = [(item, future) for item, future in batch if future.set_running_or_notify_cancel()]
+            if not live:
+                continue
+            error: Optional[BaseException] = None
+            try:
+                results = self.run_batch([item for item, _ in live])
+                if len(results) != len(live):
+                    raise RuntimeError(f"run_batch returned {len(results)} results for {len(live)} items")
+            except BaseException as exc:  # noqa: BLE001 - surfaced through every future in the batch
+                error = exc
+            # Count the batch before resolving it, so callers woken by a result see it in `stats`.
+            with self._stats_lock:
+                self._batches += 1
+                self._batch_sizes[len(live)] = self._batch_sizes.get(len(live), 0) + 1
+                if error is None:
+                    self._completed += len(live)
+                else:
+                    self._failed += len(live)
+            if error is None:
+                for (_, future), result in zip(live, results):
+                    future.set_result(result)
+            else:
+                for _, future in live:
+                    future.set_exception(error)
+
+
+__all__ = ["BatchScheduler", "Overloaded"]
@@ -0,0 +1,172 @@
+from __future__ import annotations
+
+from typing import List, Tuple
+
+from ._lazy import lazy_import
+
+np = lazy_import("numpy")
+
+Box = Tuple[int, int, int, int]  # (x0, y0, x1, y1), end-exclusive
+
+_LUMA = (0.299, 0.587, 0.114)
+
+
+def _to_gray(page: np.ndarray) -> np.ndarray:
+    if page.ndim == 2:
+        return page
+    if page.ndim == 3 and page.shape[2] in (3, 4):
+        return page[..., :3] @ np.array(_LUMA, dtype=np.float32)
+    raise ValueError(f"Expected a (H, W) or (H, W, 3|4) page array, got shape {page.shape}")
+
+
+def _otsu_threshold(gray: np.ndarray) -> float:
+    """Global Otsu threshold computed from a 256-bin histogram."""
+    hist = np.bincount(np.clip(gray, 0, 255).astype(np.uint8).ravel(), minlength=256).astype(np.float64)
+    levels = np.arange(256, dtype=np.float64)
+    weight_bg = np.cumsum(hist)
+    weight_fg = weight_bg[-1] - weight_bg
+    cum_mean = np.cumsum(hist * levels)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mean_bg = cum_mean / weight_bg
+        mean_fg = (cum_mean[-1] - cum_mean) / weight_fg
+        between = weight_bg * weight_fg * (mean_bg - mean_fg) ** 2
+    between = np.nan_to_num(between)
+    return float(np.argmax(between))
+
+
+def _runs(mask: np.ndarray) -> np.ndarray:
+    """Start/end (exclusive) pairs of the True runs in a 1-D mask, shape (R, 2)."""
+    edges = np.diff(np.concatenate(([0], mask.astype(np.int8), [0])))
+    return np.stack((np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)), axis=1)
+
+
+def _merge_small_runs(runs: List[List[int]], min_height: float) -> List[List[int]]:
+    """
+    Fold runs shorter than `min_height` (detached Khmer vowels, subscripts, punctuation)
+    into the nearest neighbouring run.
+    """
+    merged = [list(run) for run in runs]
+    idx = 0
+    while len(merged) > 1 and idx < len(merged):
+        start, end = merged[idx]
+        if end - start >= min_height:
+            idx += 1
+            continue
+        gap_prev = start - merged[idx - 1][1] if idx > 0 else None
+        gap_next = merged[idx + 1][0] - end if idx + 1 < len(merged) else None
+        if gap_next is None or (gap_prev is not None and gap_prev <= gap_next):
+            merged[idx - 1][1] = end
+            del merged[idx]
+            idx -= 1
+        else:
+            merged[idx + 1][0] = start
+            del merged[idx]
+    return merged
+
+
+def _split_tall_run(profile: np.ndarray, start: int, end: int, line_height: float, split_ratio: float) -> List[List[int]]:
+    """Split runs spanning several touching lines at their lowest-ink rows."""
+    if end - start <= split_ratio * line_height:
+        return [[start, end]]
+    margin = max(1, int(0.5 * line_height))
+    window = profile[start + margin : end - margin]
+    if window.size == 0:
+        return [[start, end]]
+    cut = start + margin + int(np.argmin(window))
+    return _split_tall_run(profile, start, cut, line_height, split_ratio) + _split_tall_run(
+        profile, cut, end, line_height, split_ratio
+    )
+
+
+def segment_lines(
+    page: np.ndarray,
+    threshold: float | None = None,
+    min_row_ink: int = 1,
+    small_run_ratio: float = 0.4,
+    split_ratio: float = 2.5,
+    padding_ratio: float = 0.1,
+) -> List[Box]:
+    """
+    Find text line boxes on a page image using horizontal projection profiles.
+
+    `page` is a (H, W) grayscale or (H, W, 3|4) array with dark text on a light background.
+    Rows with at least `min_row_ink` ink pixels form connected runs; runs shorter than
+    `small_run_ratio` of the median line height are folded into their nearest neighbour, and
+    runs taller than `split_ratio` line heights are cut at their emptiest row. Boxes are
+    returned top to bottom as end-exclusive `(x0, y0, x1, y1)` tuples.
+    """
+    gray = _to_gray(np.asarray(page))
+    height, width = gray.shape
+    if height == 0 or width == 0:
+        return []
+    cutoff = _otsu_threshold(gray) if threshold is None else threshold
+    ink = gray <= cutoff
+    profile = np.count_nonzero(ink, axis=1)
+    runs = _runs(profile >= max(1, min_row_ink))
+    if len(runs) == 0:
+        return []
+
+    heights = runs[:, 1] - runs[:, 0]
+    line_height = float(np.median(heights))
+    tall = heights[heights >= small_run_ratio * line_height]
+    if tall.size:
+        line_height = float(np.median(tall))
+
+    merged = _merge_small_runs(runs.tolist(), small_run_ratio * line_height)
+    bands: List[List[int]] = []
+    for start, end in merged:
+        bands.extend(_split_tall_run(profile, start, end, line_height, split_ratio))
+
+    pad = int(round(padding_ratio * line_height))
+    boxes: List[Box] = []
+    for start, end in bands:
+        columns = np.flatnonzero(ink[start:end].any(axis=0))
+        if columns.size == 0:
+            continue
+        boxes.append(
+            (
+                max(0, int(columns[0]) - pad),
+                max(0, start - pad),
+                min(width, int(columns[-1]) + 1 + pad),
+                min(height, end + pad),
+            )
+        )
+    return boxes
+
+
+def _ink_mask(image: np.ndarray, contrast: float) -> np.ndarray:
+    gray = _to_gray(np.asarray(image))
+    if gray.size == 0:
+        return np.zeros(gray.shape, dtype=bool)
+    return np.abs(gray.astype(np.float32) - np.median(gray)) >= contrast
+
+
+def ink_fraction(image: np.ndarray, contrast: float = 48.0) -> float:
+    """
+    Share of pixels whose gray level differs from the background (the median level) by at
+    least `contrast`, for dark-on-light and light-on-dark text alike. Blank and near-blank
+    crops (paper, a few specks of noise) score close to zero.
+    """
+    ink = _ink_mask(image, contrast)
+    return float(np.count_nonzero(ink)) / ink.size if ink.size else 0.0
+
+
+def ink_extent(image: np.ndarray, contrast: float = 48.0) -> Tuple[int, int]:
+    """
+    `(width, height)` in pixels of the box around every ink pixel (see `ink_fraction`), i.e.
+    the span of the written text without the crop's margins. `(0, 0)` for blank images.
+    """
+    ink = _ink_mask(image, contrast)
+    columns = np.flatnonzero(ink.any(axis=0)) if ink.size else []
+    if len(columns) == 0:
+        return 0, 0
+    rows = np.flatnonzero(ink.any(axis=1))
+    return int(columns[-1] - columns[0] + 1), int(rows[-1] - rows[0] + 1)
+
+
+def crop_lines(page: np.ndarray, boxes: List[Box]) -> List[np.ndarray]:
+    """Views into `page` for each box; no pixel data is copied."""
+    return [page[y0:y1, x0:x1] for x0, y0, x1, y1 in boxes]
+
+
+__all__ = ["Box", "segment_lines", "crop_lines", "ink_fraction", "ink_extent"]
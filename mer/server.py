@@ -0,0 +1,288 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import time
+from email.parser import BytesParser
+from email.policy import HTTP
+from http import HTTPStatus
+from io import BytesIO
+from typing import TYPE_CHECKING, Dict, List, Optional, Sequence, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+from ._lazy import lazy_import
+from .scheduler import Overloaded
+
+if TYPE_CHECKING:  # pragma: no cover
+    from .mer import Mer
+
+np = lazy_import("numpy")
+
+DEFAULT_MAX_BODY_SIZE = 16 * 1024 * 1024
+LATENCY_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+_NPY_MAGIC = b"\x93NUMPY"
+_TRUE = ("1", "true", "yes")
+
+Response = Tuple[HTTPStatus, dict, Dict[str, str]]
+
+
+class HttpError(Exception):
+    def __init__(self, status: HTTPStatus, message: str) -> None:
+        super().__init__(message)
+        self.status = status
+
+
+class LatencyHistogram:
+    """Request latencies counted into fixed millisecond buckets (upper bounds), plus a sum."""
+
+    def __init__(self, bounds_ms: Sequence[float] = LATENCY_BUCKETS_MS) -> None:
+        self.bounds_ms = tuple(bounds_ms)
+        self.counts = [0] * (len(self.bounds_ms) + 1)  # the last bucket is +Inf
+        self.sum_ms = 0.0
+
+    def observe(self, ms: float) -> None:
+        idx = next((i for i, bound in enumerate(self.bounds_ms) if ms <= bound), len(self.bounds_ms))
+        self.counts[idx] += 1
+        self.sum_ms += ms
+
+    def as_dict(self) -> dict:
+        count = sum(self.counts)
+        labels = [str(bound) for bound in self.bounds_ms] + ["+Inf"]
+        return {
+            "count": count,
+            "mean": round(self.sum_ms / count, 3) if count else 0.0,
+            "buckets": dict(zip(labels, self.counts)),
+        }
+
+
+def decode_images(body: bytes, content_type: str) -> Tuple[List[object], bool]:
+    """
+    Images in a `/recognize` request body and whether it is a batch.
+
+    - `multipart/form-data` (or any multipart type): one image file per part, a batch.
+    - A `.npy` payload (detected by its magic bytes): uint8 pixels; `(H, W)`, `(H, W, 1)`
+      and `(H, W, 3)` arrays are one image, `(N, H, W, C)` arrays a batch of N.
+    - Anything else: one encoded image file (PNG, JPEG, ...).
+    """
+    if content_type.lower().startswith("multipart/"):
+        message = BytesParser(policy=HTTP).parsebytes(b"Content-Type: " + content_type.encode("latin-1") + b"\r\n\r\n" + body)
+        if not message.is_multipart():
+            raise HttpError(HTTPStatus.BAD_REQUEST, "Malformed multipart body")
+        images = [part.get_payload(decode=True) for part in message.iter_parts()]
+        if not images:
+            raise HttpError(HTTPStatus.BAD_REQUEST, "Multipart body has no parts")
+        return images, True
+    if body.startswith(_NPY_MAGIC):
+        try:
+            pixels = np.load(BytesIO(body), allow_pickle=False)
+        except ValueError as exc:
+            raise HttpError(HTTPStatus.BAD_REQUEST, f"Invalid .npy payload: {exc}") from None
+        if pixels.ndim == 4:
+            return list(pixels), True
+        return [pixels], False
+    if not body:
+        raise HttpError(HTTPStatus.BAD_REQUEST, "Empty request body")
+    return [body], False
+
+
+class OcrServer:
+    """
+    Minimal asyncio HTTP/1.1 front end for a `Mer` instance; no dependencies beyond the
+    standard library.
+
+    Every request goes through `Mer.arecognize_lines`, so concurrent requests share the
+    micro-batching scheduler; when its lines would not fit among `batch_max_queue` waiting
+    ones, the request is answered with 429 before any of its images is decoded. Endpoints:
+
+    - `POST /recognize`: one image or a batch (see `decode_images`). Query parameters
+      `json=1` (scored results), `decode` and `beam_width` are passed through. Returns
+      `{"text": ...}` (or the JSON result) for one image, `{"results": [...]}` for a batch.
+    - `GET /metrics`: request counts by status, a latency histogram, lines recognized and
+      the scheduler's queue depth and batch-size histogram.
+    - `GET /health`: liveness probe.
+    """
+
+    def __init__(
+        self,
+        ocr: "Mer",
+        host: str = "127.0.0.1",
+        port: int = 8000,
+        max_body_size: int = DEFAULT_MAX_BODY_SIZE,
+    ) -> None:
+        self.ocr = ocr
+        self.host = host
+        self.port = int(port)
+        self.max_body_size = int(max_body_size)
+        self.latency = LatencyHistogram()
+        self._status_counts: Dict[int, int] = {}
+        self._lines = 0
+        self._in_flight = 0
+        self._started = time.monotonic()
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    async def start(self) -> int:
+        """Start listening and return the bound port (useful with `port=0`)."""
+        self._server = await asyncio.start_server(self._handle_connection, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        self._started = time.monotonic()
+        return self.port
+
+    async def serve_forever(self) -> None:
+        if self._server is None:
+            await self.start()
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def close(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    def metrics(self) -> dict:
+        return {
+            "uptime_s": round(time.monotonic() - self._started, 3),
+            "requests": {
+                "total": sum(self._status_counts.values()),
+                "in_flight": self._in_flight,
+                "by_status": {str(code): count for code, count in sorted(self._status_counts.items())},
+            },
+            "lines": self._lines,
+            "latency_ms": self.latency.as_dict(),
+            "batching": self.ocr.batching_stats(),
+        }
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            keep_alive = True
+            while keep_alive:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                keep_alive = await self._handle_request(request_line, reader, writer)
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.LimitOverrunError, ValueError):
+            pass  # client went away or sent an oversized header line
+        finally:
+            writer.close()
+
+    async def _handle_request(
+        self, request_line: bytes, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> bool:
+        """Read, answer and count one request; returns whether the connection stays open."""
+        start = time.perf_counter()
+        headers: Dict[str, str] = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+        parts = request_line.decode("latin-1").split()
+        keep_alive = len(parts) == 3 and parts[2] == "HTTP/1.1" and headers.get("connection", "").lower() != "close"
+        extra: Dict[str, str] = {}
+        self._in_flight += 1
+        try:
+            if len(parts) != 3:
+                raise HttpError(HTTPStatus.BAD_REQUEST, "Malformed request line")
+            if "chunked" in headers.get("transfer-encoding", "").lower():
+                keep_alive = False
+                raise HttpError(HTTPStatus.LENGTH_REQUIRED, "Chunked bodies are not supported; send Content-Length")
+            try:
+                length = int(headers.get("content-length", "0") or 0)
+            except ValueError:
+                raise HttpError(HTTPStatus.BAD_REQUEST, "Invalid Content-Length") from None
+            if length > self.max_body_size:
+                keep_alive = False  # the unread body would be parsed as the next request
+                raise HttpError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, f"Body exceeds {self.max_body_size} bytes")
+            body = await reader.readexactly(length) if length else b""
+            status, payload, extra = await self._dispatch(parts[0], parts[1], headers, body)
+        except HttpError as exc:
+            status, payload = exc.status, {"error": str(exc)}
+        except Exception as exc:  # noqa: BLE001 - reported to the client, the server keeps running
+            status, payload = HTTPStatus.INTERNAL_SERVER_ERROR, {"error": f"{type(exc).__name__}: {exc}"}
+        finally:
+            self._in_flight -= 1
+        self._status_counts[status.value] = self._status_counts.get(status.value, 0) + 1
+        if status is HTTPStatus.OK and len(parts) == 3 and parts[1].startswith("/recognize"):
+            self.latency.observe((time.perf_counter() - start) * 1000.0)
+        await self._respond(writer, status, payload, extra, keep_alive)
+        return keep_alive
+
+    async def _dispatch(self, method: str, target: str, headers: Dict[str, str], body: bytes) -> Response:
+        url = urlsplit(target)
+        routes = {"/recognize": "POST", "/metrics": "GET", "/health": "GET"}
+        if url.path not in routes:
+            raise HttpError(HTTPStatus.NOT_FOUND, f"No route for {url.path}")
+        if method != routes[url.path]:
+            raise HttpError(HTTPStatus.METHOD_NOT_ALLOWED, f"{url.path} only accepts {routes[url.path]}")
+        if url.path == "/health":
+            return HTTPStatus.OK, {"status": "ok"}, {}
+        if url.path == "/metrics":
+            return HTTPStatus.OK, self.metrics(), {}
+
+        query = {name: values[-1] for name, values in parse_qs(url.query).items()}
+        json_result = query.get("json", "").lower() in _TRUE
+        try:
+            beam_width = int(query["beam_width"]) if "beam_width" in query else None
+        except ValueError:
+            raise HttpError(HTTPStatus.BAD_REQUEST, "beam_width must be an integer") from None
+        images, batch = decode_images(body, headers.get("content-type", ""))
+        try:
+            results = await self.ocr.arecognize_lines(
+                images, json_result=json_result, decode=query.get("decode"), beam_width=beam_width
+            )
+        except Overloaded as exc:
+            return HTTPStatus.TOO_MANY_REQUESTS, {"error": f"Server overloaded: {exc}"}, {"Retry-After": "1"}
+        except (ValueError, OSError) as exc:  # bad pixels or options, undecodable image files
+            raise HttpError(HTTPStatus.BAD_REQUEST, str(exc)) from None
+        self._lines += len(results)
+        shaped = [result if isinstance(result, dict) else {"text": result} for result in results]
+        return HTTPStatus.OK, {"results": shaped} if batch else shaped[0], {}
+
+    @staticmethod
+    async def _respond(
+        writer: asyncio.StreamWriter, status: HTTPStatus, payload: dict, extra: Dict[str, str], keep_alive: bool
+    ) -> None:
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        head = [
+            f"HTTP/1.1 {status.value} {status.phrase}",
+            "Content-Type: application/json; charset=utf-8",
+            f"Content-Length: {len(body)}",
+            f"Connection: {'keep-alive' if keep_alive else 'close'}",
+        ]
+        head.extend(f"{name}: {value}" for name, value in extra.items())
+        writer.write(("\r\n".join(head) + "\r\n\r\n").encode("latin-1") + body)
+        await writer.drain()
+
+
+def serve(
+    host: str = "127.0.0.1",
+    port: int = 8000,
+    max_body_size: int = DEFAULT_MAX_BODY_SIZE,
+    batch_max_queue: Optional[int] = 256,
+    **mer_kwargs,
+) -> None:
+    """
+    Load the model and serve it over HTTP until interrupted (see `OcrServer`). Extra keyword
+    arguments are forwarded to `Mer`; `batch_max_queue` bounds the lines waiting to be
+    batched before requests are rejected with 429.
+    """
+    from .mer import Mer
+
+    ocr = Mer(batch_max_queue=batch_max_queue, **mer_kwargs)
+    server = OcrServer(ocr, host=host, port=port, max_body_size=max_body_size)
+
+    async def main() -> None:
+        bound = await server.start()
+        print(f"serving on http://{host}:{bound}", flush=True)
+        await server.serve_forever()
+
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        ocr.close()
+
+
+__all__ = ["OcrServer", "LatencyHistogram", "decode_images", "serve", "DEFAULT_MAX_BODY_SIZE"]
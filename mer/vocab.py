@@ -3,8 +3,6 @@ import os
 from pathlib import Path
 from typing import List, Sequence, Union
 
-import torch
-
 PathLike = Union[str, "os.PathLike[str]"]  # noqa: F821
 
 
@@ -60,8 +58,7 @@ class Vocabulary:
         eos = self.char2idx["<EOS>"]
         result: List[str] = []
         for token in tokens:
-            if isinstance(token, torch.Tensor):  # pragma: no cover - convenience
-                token = int(token.item())
+            token = int(token)  # also accepts NumPy scalars and 0-d tensors
             if token in (pad, sos):
                 continue
             if token == eos:
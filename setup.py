@@ -6,8 +6,7 @@ def read(*paths):
         return f.read()
     
 requirements = [
-    'torch',
-    'torchvision',
+    'numpy',
     'onnxruntime-gpu',
     'pillow',
     'huggingface-hub',
@@ -25,6 +24,13 @@ setup(
     keywords='ocr',
     description='Khmer OCR',
     install_requires=requirements,
+    extras_require={
+        'export': ['onnx'],
+        'torch': ['torch', 'torchvision'],
+    },
+    entry_points={
+        'console_scripts': ['mer=mer.cli:main'],
+    },
     long_description=(read('README.md')),
     long_description_content_type='text/markdown',
 	classifiers= [
@@ -0,0 +1,180 @@
+import json
+from pathlib import Path
+from typing import Optional, Tuple, Union
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from mer.constants import CONFIG_FILENAME, MODEL_FILENAME
+
+# Toy vocabulary: <PAD>=0, <SOS>=1, <EOS>=2, A=3, B=4.
+TOY_VOCAB = {
+    "specials": ["<PAD>", "<SOS>", "<EOS>"],
+    "char2idx": {"<PAD>": 0, "<SOS>": 1, "<EOS>": 2, "A": 3, "B": 4},
+    "idx2char": {"0": "<PAD>", "1": "<SOS>", "2": "<EOS>", "3": "A", "4": "B"},
+}
+TOY_HEIGHT = 16
+TOY_WIDTH = 32
+TOY_MAX_LEN = 8
+
+
+def _toy_transitions() -> np.ndarray:
+    # Row i scores the token that follows token i: <SOS> -> A -> B -> <EOS>.
+    table = np.zeros((5, 5), dtype=np.float32)
+    table[1, 3] = 5.0
+    table[3, 4] = 5.0
+    table[4, 2] = 10.0
+    table[0, 2] = 10.0
+    table[2, 2] = 10.0
+    return table
+
+
+def loop_transitions() -> np.ndarray:
+    """
+    Toy transition table whose greedy decode of dark images repeats A until max_length:
+    <SOS> slightly prefers A, but after A the model is unsure forever while B ends the line.
+    """
+    transitions = np.zeros((5, 5), dtype=np.float32)
+    transitions[1, 3], transitions[1, 4] = 1.0, 0.9
+    transitions[3, 3] = transitions[3, 4] = 2.0
+    transitions[4, 2] = transitions[0, 2] = transitions[2, 2] = 10.0
+    return transitions
+
+
+def build_toy_model(
+    path: Path, projection: bool = False, transitions: Optional[np.ndarray] = None, batch: Union[str, int] = "batch"
+) -> Path:
+    """
+    Write a tiny stand-in for khmer_ocr.onnx with the same `images`/`tgt` -> `logits` interface.
+
+    The "encoder" reduces the image to its mean brightness and turns it into an <EOS> bias,
+    the "decoder" looks up a fixed transition table for every tgt position. Dark images decode
+    to "AB"; bright (blank) images decode to "". `projection` appends an identity output
+    projection (MatMul + bias Add), like the real model's vocabulary head. `transitions`
+    replaces the (5, 5) transition table. An int `batch` exports a static batch dimension.
+    """
+    onnx = pytest.importorskip("onnx")
+    helper = onnx.helper
+    TensorProto = onnx.TensorProto
+
+    eos_bias = np.zeros((1, 1, 5), dtype=np.float32)
+    eos_bias[0, 0, 2] = 3.0
+    nodes = [
+        helper.make_node("ReduceMean", ["images"], ["pooled"], axes=[1, 2, 3], keepdims=0),
+        helper.make_node("Reshape", ["pooled", "memory_shape"], ["pooled_3d"]),
+        helper.make_node("Mul", ["pooled_3d", "eos_bias"], ["memory"]),
+        helper.make_node("Gather", ["transitions", "tgt"], ["scores"], axis=0),
+        helper.make_node("Add", ["scores", "memory"], ["hidden" if projection else "logits"]),
+    ]
+    initializers = [
+        onnx.numpy_helper.from_array(np.array([-1, 1, 1], dtype=np.int64), "memory_shape"),
+        onnx.numpy_helper.from_array(eos_bias, "eos_bias"),
+        onnx.numpy_helper.from_array(_toy_transitions() if transitions is None else transitions, "transitions"),
+    ]
+    if projection:
+        nodes += [
+            helper.make_node("MatMul", ["hidden", "head_weight"], ["projected"]),
+            helper.make_node("Add", ["projected", "head_bias"], ["logits"]),
+        ]
+        initializers += [
+            onnx.numpy_helper.from_array(np.eye(5, dtype=np.float32), "head_weight"),
+            onnx.numpy_helper.from_array(np.zeros(5, dtype=np.float32), "head_bias"),
+        ]
+    graph = helper.make_graph(
+        nodes,
+        "toy_ocr",
+        [
+            helper.make_tensor_value_info("images", TensorProto.FLOAT, [batch, 3, TOY_HEIGHT, TOY_WIDTH]),
+            helper.make_tensor_value_info("tgt", TensorProto.INT64, [batch, "seq"]),
+        ],
+        [helper.make_tensor_value_info("logits", TensorProto.FLOAT, [batch, "seq", 5])],
+        initializer=initializers,
+    )
+    model = helper.make_model(graph, opset_imports=[helper.make_opsetid("", 13)])
+    model.ir_version = 8
+    onnx.save(model, str(path))
+    return path
+
+
+def build_toy_incremental_decoder(path: Path, transitions: Optional[np.ndarray] = None) -> Path:
+    """
+    Write a decoder matching the split toy encoder that consumes one token per step and
+    carries a `past_key_values.0.key`/`present.0.key` cache of shape (batch, 1, seq, 5).
+    `transitions` replaces the (5, 5) transition table, as in `build_toy_model`.
+    """
+    onnx = pytest.importorskip("onnx")
+    helper = onnx.helper
+    TensorProto = onnx.TensorProto
+
+    nodes = [
+        helper.make_node("Gather", ["transitions", "tgt"], ["scores"], axis=0),
+        helper.make_node("Unsqueeze", ["scores", "head_axis"], ["key"]),
+        helper.make_node("Concat", ["past_key_values.0.key", "key"], ["present.0.key"], axis=2),
+        helper.make_node("Add", ["scores", "memory"], ["logits"]),
+    ]
+    graph = helper.make_graph(
+        nodes,
+        "toy_ocr_decoder_with_past",
+        [
+            helper.make_tensor_value_info("memory", TensorProto.FLOAT, ["batch", 1, 5]),
+            helper.make_tensor_value_info("tgt", TensorProto.INT64, ["batch", 1]),
+            helper.make_tensor_value_info("past_key_values.0.key", TensorProto.FLOAT, ["batch", 1, "past_seq", 5]),
+        ],
+        [
+            helper.make_tensor_value_info("logits", TensorProto.FLOAT, ["batch", 1, 5]),
+            helper.make_tensor_value_info("present.0.key", TensorProto.FLOAT, ["batch", 1, "seq", 5]),
+        ],
+        initializer=[
+            onnx.numpy_helper.from_array(_toy_transitions() if transitions is None else transitions, "transitions"),
+            onnx.numpy_helper.from_array(np.array([1], dtype=np.int64), "head_axis"),
+        ],
+    )
+    model = helper.make_model(graph, opset_imports=[helper.make_opsetid("", 13)])
+    model.ir_version = 8
+    onnx.save(model, str(path))
+    return path
+
+
+def inked_line(color: str = "black", size: Tuple[int, int] = (40, 12)) -> Image.Image:
+    """
+    Solid `color` line image with a short contrasting stroke, like a single glyph, so the
+    blank-line check lets it through. The toy model decodes it like the solid color.
+    """
+    image = Image.new("RGB", size, color=color)
+    width, height = size
+    image.paste("white" if color == "black" else "black", (width // 2, 0, width // 2 + 1, max(1, height // 2)))
+    return image
+
+
+def write_toy_config(path: Path) -> Path:
+    config = {
+        "vocab": TOY_VOCAB,
+        "hyperparameters": {
+            "img_height": TOY_HEIGHT,
+            "img_width": TOY_WIDTH,
+            "max_decode_len": TOY_MAX_LEN,
+        },
+    }
+    path.write_text(json.dumps(config), encoding="utf-8")
+    return path
+
+
+@pytest.fixture
+def toy_model_dir(tmp_path):
+    pytest.importorskip("onnxruntime")
+    model_dir = tmp_path / "toy_model"
+    model_dir.mkdir()
+    build_toy_model(model_dir / MODEL_FILENAME)
+    write_toy_config(model_dir / CONFIG_FILENAME)
+    return model_dir
+
+
+@pytest.fixture(autouse=True)
+def isolated_model_registry():
+    # Tests build models in throwaway directories (and stub Predictor); never share them across tests.
+    from mer.registry import default_registry
+
+    default_registry.clear()
+    yield
+    default_registry.clear()
@@ -0,0 +1,36 @@
+import json
+
+from PIL import Image
+
+from mer.cli import main
+from conftest import inked_line
+
+
+def test_bench_cli_writes_json_report(toy_model_dir, tmp_path):
+    lines = tmp_path / "lines"
+    lines.mkdir()
+    for idx, image in enumerate([inked_line(), Image.new("RGB", (40, 12), color="white"), inked_line()]):
+        image.save(lines / f"line_{idx}.png")
+    out = tmp_path / "bench.json"
+
+    args = ["bench", str(lines), "--out", str(out), "--batch-sizes", "1,2", "--threads", "1", "--repeats", "1"]
+    assert main(args + ["--no-segment", "--model-path", str(toy_model_dir), "--device", "cpu"]) == 0
+
+    report = json.loads(out.read_text(encoding="utf-8"))
+    assert report["lines"] == 3
+    assert set(report["cold_start_ms"]) == {"import", "ensure_artifacts", "session_creation"}
+    assert {"p50", "p95", "p99"} <= set(report["latency_ms"])
+    assert report["latency_ms"]["count"] == 3
+    assert report["decode_steps_per_line"] == {"mean": 2.0, "max": 3}  # the blank line never reaches the model
+    assert [(row["threads"], row["batch_size"]) for row in report["throughput"]] == [(1, 1), (1, 2)]
+    assert report["meta"]["providers"] == ["CPUExecutionProvider"]
+
+
+def test_bench_cli_fails_over_the_import_budget(toy_model_dir, tmp_path):
+    lines = tmp_path / "lines"
+    lines.mkdir()
+    inked_line().save(lines / "line.png")
+    args = ["bench", str(lines), "--out", str(tmp_path / "bench.json"), "--batch-sizes", "1", "--repeats", "1"]
+    args += ["--no-segment", "--model-path", str(toy_model_dir), "--device", "cpu"]
+    assert main(args + ["--max-import-ms", "0.001"]) == 1
+    assert main(args + ["--max-import-ms", "60000"]) == 0
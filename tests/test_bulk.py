@@ -0,0 +1,48 @@
+import json
+
+from PIL import Image
+
+from mer import bulk
+from mer.cli import main
+from conftest import inked_line
+
+
+def _write_lines(folder, count):
+    folder.mkdir()
+    paths = []
+    for idx in range(count):
+        path = folder / f"line_{idx}.png"
+        (inked_line() if idx % 2 == 0 else Image.new("RGB", (40, 12), color="white")).save(path)
+        paths.append(path)
+    return paths
+
+
+def test_recognize_paths_in_process(toy_model_dir, tmp_path):
+    paths = _write_lines(tmp_path / "lines", 5) + [tmp_path / "missing.png"]
+    records = list(bulk.recognize_paths(paths, processes=1, chunk_size=2, model_path=toy_model_dir, device="cpu"))
+    assert [r["path"] for r in records] == [str(p) for p in paths]
+    assert [r.get("text") for r in records] == ["AB", "", "AB", "", "AB", None]
+    assert "FileNotFoundError" in records[-1]["error"]
+
+
+def test_recognize_paths_with_worker_processes(toy_model_dir, tmp_path):
+    paths = _write_lines(tmp_path / "lines", 4)
+    records = list(bulk.recognize_paths(paths, processes=2, chunk_size=1, model_path=toy_model_dir, device="cpu"))
+    assert records == [{"path": str(p), "text": t} for p, t in zip(paths, ["AB", "", "AB", ""])]
+
+
+def test_bulk_cli_resumes_from_existing_output(toy_model_dir, tmp_path):
+    paths = _write_lines(tmp_path / "lines", 3)
+    out = tmp_path / "results.jsonl"
+    out.write_text(json.dumps({"path": str(paths[0]), "text": "cached"}) + "\n" + '{"path": "trunc', encoding="utf-8")
+
+    args = ["bulk", str(tmp_path / "lines"), "--out", str(out), "--processes", "1"]
+    assert main(args + ["--model-path", str(toy_model_dir), "--device", "cpu"]) == 0
+
+    records = [json.loads(line) for line in out.read_text(encoding="utf-8").splitlines() if line.endswith("}")]
+    assert records == [
+        {"path": str(paths[0]), "text": "cached"},
+        {"path": str(paths[1]), "text": ""},
+        {"path": str(paths[2]), "text": "AB"},
+    ]
+    assert bulk.completed_paths(out) == {str(p) for p in paths}
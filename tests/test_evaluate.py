@@ -0,0 +1,29 @@
+import pytest
+from PIL import Image
+
+from mer.cli import main
+from mer.evaluate import character_error_rate, load_samples
+from conftest import inked_line
+
+
+def test_character_error_rate_ignores_layout_whitespace():
+    assert character_error_rate("AB\nBA", "  AB \n\nBA") == 0.0
+    assert character_error_rate("ABBA", "ABA") == 0.25
+    assert character_error_rate("AB", "") == 1.0
+    assert character_error_rate("", "") == 0.0
+
+
+def test_check_cli_compares_int8_with_fp32(toy_model_dir, tmp_path, capsys):
+    pytest.importorskip("onnxruntime.quantization")
+    samples = tmp_path / "samples"
+    samples.mkdir()
+    inked_line().save(samples / "sample_1.png")
+    (samples / "sample_1_text.md").write_text("AB", encoding="utf-8")
+    Image.new("RGB", (40, 12), color="black").save(samples / "sample_1_annotated.png")
+    assert [path.name for path, _ in load_samples(samples)] == ["sample_1.png"]
+
+    args = ["check", "--samples", str(samples), "--model-path", str(toy_model_dir), "--device", "cpu"]
+    assert main(args + ["--max-delta", "0"]) == 0
+    output = capsys.readouterr().out
+    assert "fp32: CER 0.0000" in output and "int8: CER 0.0000" in output
+    assert "CER delta (int8 - fp32): +0.0000" in output
@@ -1,4 +1,7 @@
 import json
+import os
+import subprocess
+import sys
 from pathlib import Path
 
 import pytest
@@ -9,6 +12,7 @@ from mer.artifacts import ensure_artifacts
 from mer.constants import MODEL_FILENAME, CONFIG_FILENAME
 from mer import artifacts as artifacts_module
 from mer import predictor as predictor_module
+from conftest import inked_line
 
 
 def _write_dummy_config(path: Path) -> None:
@@ -35,7 +39,16 @@ def _write_dummy_config(path: Path) -> None:
 
 def _stub_predictor(monkeypatch, return_value: str = "dummy-text") -> None:
     monkeypatch.setattr(predictor_module.Predictor, "__init__", lambda self, *args, **kwargs: None)
-    monkeypatch.setattr(predictor_module.Predictor, "predict", lambda self, image: return_value)
+    monkeypatch.setattr(predictor_module.Predictor, "input_size", (320, 128))
+    monkeypatch.setattr(predictor_module.Predictor, "predict", lambda self, image, trace=None: return_value)
+    monkeypatch.setattr(
+        predictor_module.Predictor, "predict_batch", lambda self, images, trace=None, batch_size=None: [return_value for _ in images]
+    )
+
+    def fake_predict_scored(self, images, decode="greedy", beam_width=4, trace=None, batch_size=None):
+        return [{"text": text, "log_prob": -0.5, "chars": []} for text in self.predict_batch(images, trace=trace)]
+
+    monkeypatch.setattr(predictor_module.Predictor, "predict_scored", fake_predict_scored)
 
 
 def _prepare_dummy_artifacts(tmp_path: Path) -> None:
@@ -103,7 +116,7 @@ def test_mer_recognize_line_uses_predictor(tmp_path, monkeypatch):
     _stub_predictor(monkeypatch, return_value="dummy-text")
 
     sample_img = tmp_path / "line.png"
-    Image.new("RGB", (10, 10), color="white").save(sample_img)
+    inked_line("white", (10, 10)).save(sample_img)
 
     ocr = Mer(cache_dir=tmp_path, model_path=tmp_path)
     assert ocr.recognize_line(sample_img) == "dummy-text"
@@ -115,7 +128,7 @@ def test_mer_postprocess_flag(tmp_path, monkeypatch):
     _stub_predictor(monkeypatch, return_value=raw_text)
 
     sample_img = tmp_path / "line.png"
-    Image.new("RGB", (10, 10), color="white").save(sample_img)
+    inked_line("white", (10, 10)).save(sample_img)
 
     ocr = Mer(cache_dir=tmp_path, model_path=tmp_path, postprocess=False)
     assert ocr.recognize_line(sample_img) == raw_text
@@ -126,11 +139,11 @@ def test_mer_recognize_line_json_result(tmp_path, monkeypatch):
     _stub_predictor(monkeypatch, return_value="dummy-json-text")
 
     sample_img = tmp_path / "line.png"
-    Image.new("RGB", (10, 10), color="white").save(sample_img)
+    inked_line("white", (10, 10)).save(sample_img)
 
     ocr = Mer(cache_dir=tmp_path, model_path=tmp_path)
     result = ocr.recognize_line(sample_img, json_result=True)
-    assert result == {"text": "dummy-json-text"}
+    assert result == {"text": "dummy-json-text", "log_prob": -0.5, "chars": []}
 
 
 def test_mer_predict_alias_respects_default_json_flag(tmp_path, monkeypatch):
@@ -138,11 +151,11 @@ def test_mer_predict_alias_respects_default_json_flag(tmp_path, monkeypatch):
     _stub_predictor(monkeypatch, return_value="alias-text")
 
     sample_img = tmp_path / "line.png"
-    Image.new("RGB", (10, 10), color="white").save(sample_img)
+    inked_line("white", (10, 10)).save(sample_img)
 
     ocr = Mer(cache_dir=tmp_path, model_path=tmp_path, json_result=True)
     result = ocr.predict(sample_img)
-    assert result == {"text": "alias-text"}
+    assert result["text"] == "alias-text"
 
 
 def test_mer_predict_overrides_json_flag(tmp_path, monkeypatch):
@@ -150,14 +163,303 @@ def test_mer_predict_overrides_json_flag(tmp_path, monkeypatch):
     _stub_predictor(monkeypatch, return_value="overridden-text")
 
     sample_img = tmp_path / "line.png"
-    Image.new("RGB", (10, 10), color="white").save(sample_img)
+    inked_line("white", (10, 10)).save(sample_img)
 
     ocr = Mer(cache_dir=tmp_path, model_path=tmp_path)
     result = ocr.predict(sample_img, json_result=True)
-    assert result == {"text": "overridden-text"}
+    assert result["text"] == "overridden-text" and "log_prob" in result
     assert ocr.predict(sample_img, json_result=False) == "overridden-text"
 
 
+def test_mer_recognize_lines_batches_in_order(tmp_path, monkeypatch):
+    _prepare_dummy_artifacts(tmp_path)
+    _stub_predictor(monkeypatch)
+    batches: list[tuple] = []
+
+    def fake_predict_batch(self, images, trace=None, batch_size=None):
+        batches.append((len(images), batch_size))
+        return [f"line {image.width}" for image in images]
+
+    monkeypatch.setattr(predictor_module.Predictor, "predict_batch", fake_predict_batch)
+    images = [inked_line("white", (width, 10)) for width in range(1, 6)]
+
+    ocr = Mer(cache_dir=tmp_path, model_path=tmp_path)
+    assert ocr.recognize_lines(images, batch_size=2) == [f"line {w}" for w in range(1, 6)]
+    assert batches == [(5, 2)]  # the predictor schedules the lines into batches of 2
+    assert ocr.recognize_lines(images[:1], json_result=True) == [{"text": "line 1", "log_prob": -0.5, "chars": []}]
+    with pytest.raises(ValueError):
+        ocr.recognize_lines(images, batch_size=0)
+
+
+def test_mer_recognize_page_returns_lines_with_boxes(tmp_path, monkeypatch):
+    _prepare_dummy_artifacts(tmp_path)
+    _stub_predictor(monkeypatch)
+    monkeypatch.setattr(
+        predictor_module.Predictor, "predict_batch", lambda self, images, trace=None, batch_size=None: [f"w{image.width}" for image in images]
+    )
+    page = Image.new("RGB", (100, 80), color="white")
+    page.paste((0, 0, 0), (10, 10, 90, 25))
+    page.paste((0, 0, 0), (10, 50, 60, 65))
+
+    ocr = Mer(cache_dir=tmp_path, model_path=tmp_path)
+    result = ocr.recognize_page(page, json_result=True)
+    assert [line["text"] for line in result["lines"]] == ["w84", "w54"]
+    assert result["lines"][0]["bbox"] == [8, 8, 92, 27]
+    assert result["text"] == "w84\nw54"
+    assert ocr.recognize_page(page) == "w84\nw54"
+
+
+def test_mer_workers_run_concurrently(tmp_path, monkeypatch):
+    import threading
+    from concurrent.futures import ThreadPoolExecutor
+
+    _prepare_dummy_artifacts(tmp_path)
+    _stub_predictor(monkeypatch)
+    barrier = threading.Barrier(3, timeout=5)
+
+    def fake_predict(self, image, trace=None):
+        barrier.wait()  # only passes if three calls are in flight at once
+        return "done"
+
+    monkeypatch.setattr(predictor_module.Predictor, "predict", fake_predict)
+    sample_img = inked_line("white", (10, 10))
+
+    ocr = Mer(cache_dir=tmp_path, model_path=tmp_path, workers=3)
+    assert len({id(p) for p in ocr._pool.predictors}) == 3
+    with ThreadPoolExecutor(max_workers=3) as executor:
+        results = list(executor.map(ocr.recognize_line, [sample_img] * 3))
+    assert results == ["done"] * 3
+    assert ocr._pool.idle() == 3
+
+
+def test_mer_arecognize_lines_uses_micro_batches(tmp_path, monkeypatch):
+    import asyncio
+
+    _prepare_dummy_artifacts(tmp_path)
+    _stub_predictor(monkeypatch)
+    monkeypatch.setattr(
+        predictor_module.Predictor, "predict_batch", lambda self, images, trace=None, batch_size=None: [f"w{image.width}" for image in images]
+    )
+    images = [inked_line("white", (width, 10)) for width in range(1, 7)]
+
+    ocr = Mer(cache_dir=tmp_path, model_path=tmp_path, batch_max_size=4, batch_max_wait=0.05)
+    assert ocr.batching_stats() == {}
+    results = asyncio.run(ocr.arecognize_lines(images))
+    assert results == [f"w{width}" for width in range(1, 7)]
+    assert asyncio.run(ocr.arecognize_line(images[0], json_result=True)) == {"text": "w1", "log_prob": -0.5, "chars": []}
+    stats = ocr.batching_stats()
+    assert stats["completed"] == 7
+    assert max(stats["batch_sizes"]) <= 4
+    ocr.close()
+
+
+def test_mer_cache_bypasses_predictor(tmp_path, monkeypatch):
+    _prepare_dummy_artifacts(tmp_path)
+    _stub_predictor(monkeypatch)
+    calls: list[int] = []
+
+    def fake_predict_batch(self, images, trace=None, batch_size=None):
+        calls.append(len(images))
+        return [f"w{image.width}" for image in images]
+
+    monkeypatch.setattr(predictor_module.Predictor, "predict_batch", fake_predict_batch)
+    monkeypatch.setattr(predictor_module.Predictor, "predict", lambda self, image, trace=None: fake_predict_batch(self, [image])[0])
+    a = inked_line("white", (10, 10))
+    b = inked_line("white", (12, 10))
+
+    ocr = Mer(cache_dir=tmp_path, model_path=tmp_path, cache_size=2, cache_disk=True)
+    assert ocr.recognize_lines([a, b, a]) == ["w10", "w12", "w10"]
+    assert calls == [2]
+    assert ocr.recognize_line(a.copy()) == "w10"
+    assert ocr.recognize_lines([b]) == ["w12"]
+    assert calls == [2]
+    stats = ocr.cache_stats()
+    assert stats["hits"] == 2 and stats["misses"] == 2
+    ocr.recognize_line(inked_line("white", (14, 10)))
+    assert ocr.cache_stats()["evictions"] == 1
+    ocr.close()
+
+    # A fresh instance finds the results in the on-disk tier; another max_length does not.
+    reopened = Mer(cache_dir=tmp_path, model_path=tmp_path, cache_size=2, cache_disk=True)
+    assert reopened.recognize_line(a) == "w10"
+    assert reopened.cache_stats()["disk_hits"] == 1
+    other = Mer(cache_dir=tmp_path, model_path=tmp_path, cache_size=2, cache_disk=True, max_length=4)
+    other.recognize_line(a)
+    assert other.cache_stats()["misses"] == 1
+    assert len(calls) == 3
+
+
+def test_mer_iter_recognize_streams_with_bounded_prefetch(toy_model_dir):
+    consumed: list[int] = []
+
+    def source():
+        for idx in range(50):
+            consumed.append(idx)
+            yield inked_line() if idx % 2 == 0 else Image.new("RGB", (40, 12), color="white")
+
+    ocr = Mer(model_path=toy_model_dir, device="cpu")
+    stream = ocr.iter_recognize(source(), prefetch=1, batch_size=4)
+    first = [next(stream) for _ in range(4)]
+    assert first == ["AB", "", "AB", ""]
+    assert len(consumed) <= 3 * 4  # current batch + the window being prefetched
+    rest = list(stream)
+    assert len(rest) == 46 and rest[:2] == ["AB", ""]
+
+    assert list(ocr.iter_recognize([], batch_size=2)) == []
+
+
+def test_mer_stats_callbacks_and_profiling(toy_model_dir, tmp_path):
+    seen: list[dict] = []
+    ocr = Mer(model_path=toy_model_dir, device="cpu", callbacks=[seen.append], profile_dir=tmp_path / "profiles")
+
+    result = ocr.recognize_line(inked_line(), return_stats=True)
+    assert result["text"] == "AB"
+    stats = result["stats"]
+    assert stats["decode_steps"] == 3 and stats["session_runs"] == 3  # A, B, then <EOS>
+    assert {"decode_image", "preprocess", "decode", "postprocess", "total"} <= set(stats["timings_ms"])
+    assert seen == [stats]
+
+    records = ocr.recognize_lines(
+        [inked_line(), Image.new("RGB", (40, 12), color="white")], return_stats=True
+    )
+    assert [record["text"] for record in records] == ["AB", ""]
+    assert records[0]["stats"]["batch_size"] == 2 and records[0]["stats"]["decode_steps"] == 3
+    assert ocr.recognize_line(Image.new("RGB", (40, 12), color="white")) == ""
+    assert len(seen) == 3
+
+    profiles = ocr.end_profiling()
+    assert len(profiles) == 1 and Path(profiles[0]).exists()
+    assert ocr.end_profiling() == []
+
+
+def test_mer_speculative_decoding_uses_draft_corpus(toy_model_dir):
+    ocr = Mer(model_path=toy_model_dir, device="cpu", speculative=True, draft_corpus=["AB"])
+    result = ocr.recognize_line(inked_line(), return_stats=True)
+    assert result["text"] == "AB"
+    assert result["stats"]["decode_steps"] == 1
+
+
+def test_mer_json_results_carry_log_probs_and_beam_search(toy_model_dir):
+    dark = inked_line()
+    ocr = Mer(model_path=toy_model_dir, device="cpu", cache_size=8)
+
+    result = ocr.recognize_line(dark, json_result=True)
+    assert result["text"] == "AB"
+    assert [char["char"] for char in result["chars"]] == ["A", "B"]
+    assert result["log_prob"] < sum(char["log_prob"] for char in result["chars"]) < 0  # <EOS> counts too
+    assert ocr.recognize_line(dark) == "AB"  # plain text and scored results are cached apart
+    assert ocr.recognize_line(dark, json_result=True) == result
+    assert ocr.cache_stats()["hits"] == 1
+
+    beam = ocr.recognize_line(dark, json_result=True, decode="beam", beam_width=3)
+    assert beam["text"] == "AB" and beam["log_prob"] == pytest.approx(result["log_prob"])
+    assert ocr.recognize_lines([dark], decode="beam") == ["AB"]
+    assert [record["text"] for record in ocr.iter_recognize([dark, dark], json_result=True)] == ["AB", "AB"]
+    with pytest.raises(ValueError):
+        ocr.recognize_line(dark, decode="beam", beam_width=0)
+
+    beam_default = Mer(model_path=toy_model_dir, device="cpu", decode="beam", beam_width=2)
+    page = beam_default.recognize_page(dark, json_result=True)
+    assert page["text"] == "AB" and set(page["lines"][0]) == {"text", "log_prob", "chars", "bbox"}
+    with pytest.raises(ValueError):
+        Mer(model_path=toy_model_dir, device="cpu", decode="sampling")
+
+
+def test_mer_skips_blank_lines_before_inference(toy_model_dir):
+    blank = Image.new("RGB", (40, 12), color="white")
+    ocr = Mer(model_path=toy_model_dir, device="cpu")
+    batches: list[int] = []
+    predict_batch = ocr._predictor.predict_batch
+
+    def counting_predict_batch(images, trace=None, batch_size=None):
+        batches.append(len(images))
+        return predict_batch(images, trace=trace, batch_size=batch_size)
+
+    ocr._predictor.predict_batch = counting_predict_batch
+    records = ocr.recognize_lines([blank, inked_line(), blank], return_stats=True)
+    assert [record["text"] for record in records] == ["", "AB", ""]
+    assert batches == [1]
+    assert records[0]["stats"]["blank_skipped"] == 2 and records[0]["stats"]["decode_steps"] == 3
+    assert ocr.recognize_lines([blank, blank]) == ["", ""] and batches == [1]
+
+    result = ocr.recognize_line(blank, return_stats=True)
+    assert result["stats"]["blank_skipped"] == 1 and result["stats"]["session_runs"] == 0
+    assert ocr.recognize_line(blank, json_result=True) == {"text": "", "log_prob": 0.0, "chars": []}
+    assert list(ocr.iter_recognize([blank, inked_line()])) == ["", "AB"]
+
+    unchecked = Mer(model_path=toy_model_dir, device="cpu", blank_threshold=None)
+    result = unchecked.recognize_line(blank, return_stats=True)
+    assert result["text"] == "" and result["stats"]["blank_skipped"] == 0 and result["stats"]["session_runs"] == 1
+
+
+def test_mer_bounds_decoding_by_line_geometry_and_loops(tmp_path):
+    from conftest import build_toy_model, loop_transitions, write_toy_config
+
+    build_toy_model(tmp_path / MODEL_FILENAME, transitions=loop_transitions())
+    write_toy_config(tmp_path / CONFIG_FILENAME)
+    wide, narrow = Image.new("RGB", (64, 20), color="black"), Image.new("RGB", (64, 20), color="black")
+    wide.paste("white", (4, 4, 28, 12))
+    narrow.paste("white", (4, 4, 12, 12))
+
+    unbounded = Mer(model_path=tmp_path, device="cpu", length_rate=None)
+    assert unbounded.recognize_lines([wide, narrow]) == ["A" * 7] * 2
+
+    ocr = Mer(model_path=tmp_path, device="cpu", length_rate=1.0, length_margin=2)
+    budgets = [ocr._predictor.step_budget(wide), ocr._predictor.step_budget(narrow)]
+    records = ocr.recognize_lines([wide, narrow], return_stats=True)
+    assert [record["text"] for record in records] == ["A" * budget for budget in budgets]
+    assert records[0]["stats"]["length_capped"] == 2 and records[0]["stats"]["loop_stopped"] == 0
+    assert list(ocr.iter_recognize([wide, narrow], batch_size=2)) == ["A" * budget for budget in budgets]
+
+    looping = Mer(model_path=tmp_path, device="cpu", loop_window=4)
+    result = looping.recognize_line(wide, return_stats=True)
+    assert result["text"] == "AAAA" and result["stats"]["loop_stopped"] == 1
+
+
+def test_mer_instances_share_registered_models(toy_model_dir):
+    from mer.registry import default_registry
+
+    first = Mer(model_path=toy_model_dir, device="cpu")
+    second = Mer(model_path=toy_model_dir, device="cpu", max_length=2, speculative=True)
+    assert second._predictor.session is first._predictor.session
+    assert second._predictor.vocab is first._predictor.vocab
+    assert (first._predictor.max_length, second._predictor.max_length) == (8, 2)
+    assert first._predictor.drafter is None and second._predictor.drafter is not None
+    assert len(default_registry) == 1
+
+    threaded = Mer(model_path=toy_model_dir, device="cpu", intra_op_num_threads=1)
+    isolated = Mer(model_path=toy_model_dir, device="cpu", shared_models=False)
+    assert threaded._predictor.session is not first._predictor.session
+    assert isolated._predictor.session is not first._predictor.session
+    assert len(default_registry) == 2
+    assert [ocr.recognize_line(inked_line()) for ocr in (first, threaded, isolated)] == ["AB"] * 3
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="needs fork()")
+def test_preload_shares_the_model_with_forked_workers(toy_model_dir):
+    import gc
+
+    from mer.registry import preload
+
+    parent = preload(model_path=toy_model_dir, device="cpu")
+    try:
+        assert gc.get_freeze_count() > 0
+    finally:
+        gc.unfreeze()
+    read_fd, write_fd = os.pipe()
+    pid = os.fork()
+    if pid == 0:  # worker: reuses the inherited session instead of loading the model again
+        worker = Mer(model_path=toy_model_dir, device="cpu")
+        shared = worker._predictor.session is parent._predictor.session
+        os.write(write_fd, json.dumps([shared, worker.recognize_line(inked_line())]).encode())
+        os._exit(0)
+    os.close(write_fd)
+    with os.fdopen(read_fd) as pipe:
+        report = pipe.read()
+    os.waitpid(pid, 0)
+    assert json.loads(report) == [True, "AB"]
+
+
 def test_mer_markdown_flag_raises(tmp_path):
     _prepare_dummy_artifacts(tmp_path)
     with pytest.raises(ValueError):
@@ -170,3 +472,45 @@ def test_postprocess_text():
     assert postprocess_text("   spaced\n\tIndented") == "spaced\nIndented"
     assert postprocess_text("a   b  c") == "a b c"
     assert postprocess_text("") == ""
+
+
+# Cold-start budget for `import mer` plus resolving `mer.Mer`, in microseconds. Generous on
+# purpose (a cold import takes well under half of it); it catches eager heavy imports.
+IMPORT_BUDGET_US = 250_000
+HEAVY_MODULES = {"numpy", "onnxruntime", "PIL.Image", "huggingface_hub", "tqdm", "torch", "torchvision"}
+
+
+def _profile_import(code: str) -> tuple[set, int]:
+    """Modules imported by `code` and the cumulative microseconds spent importing `mer*`."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True,
+        text=True,
+        check=True,
+        cwd=Path(__file__).resolve().parents[1],
+    )
+    imported = set()
+    mer_cumulative_us = 0
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.split("|")
+        imported.add(name.strip())
+        # Top-level entries already include everything imported underneath them; submodules
+        # resolved lazily after `import mer` (e.g. `mer.mer`) show up as top-level entries too.
+        top_level = not name[1:].startswith(" ")
+        if top_level and name.strip().split(".")[0] == "mer":
+            mer_cumulative_us += int(cumulative)
+    return imported, mer_cumulative_us
+
+
+def test_import_defers_heavy_dependencies():
+    code = "import mer; mer.postprocess_text(' a '); from mer import Mer, ensure_artifacts"
+    imported, mer_cumulative_us = _profile_import(code)
+    assert "mer" in imported and not HEAVY_MODULES & imported
+    # Best of three, so one scheduling hiccup on a loaded machine does not fail the run.
+    for _ in range(2):
+        if mer_cumulative_us < IMPORT_BUDGET_US:
+            break
+        mer_cumulative_us = min(mer_cumulative_us, _profile_import(code)[1])
+    assert 0 < mer_cumulative_us < IMPORT_BUDGET_US
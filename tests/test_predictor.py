@@ -0,0 +1,620 @@
+import shutil
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from mer.constants import CONFIG_FILENAME, DECODER_FILENAME, ENCODER_FILENAME, MODEL_FILENAME
+from mer.draft import NgramDrafter
+from mer.predictor import Predictor
+from conftest import loop_transitions
+
+
+def _dark_line():
+    return Image.new("RGB", (64, 20), color="black")
+
+
+def _blank_line():
+    return Image.new("RGB", (64, 20), color="white")
+
+
+def _split(model_dir):
+    export = pytest.importorskip("mer.export")
+    return export.split_model(model_dir / MODEL_FILENAME)
+
+
+def test_predictor_monolithic_decode(toy_model_dir):
+    predictor = Predictor(toy_model_dir / MODEL_FILENAME, config_path=toy_model_dir / CONFIG_FILENAME, device="cpu")
+    assert not predictor.is_split
+    assert predictor.predict(_dark_line()) == "AB"
+    assert predictor.predict(_blank_line()) == ""
+
+
+def test_split_model_writes_encoder_and_decoder(toy_model_dir):
+    encoder_path, decoder_path = _split(toy_model_dir)
+    assert encoder_path == toy_model_dir / ENCODER_FILENAME
+    assert decoder_path == toy_model_dir / DECODER_FILENAME
+
+    predictor = Predictor(
+        toy_model_dir / MODEL_FILENAME,
+        config_path=toy_model_dir / CONFIG_FILENAME,
+        device="cpu",
+        encoder_path=encoder_path,
+        decoder_path=decoder_path,
+    )
+    assert predictor.is_split
+    assert predictor.memory_names == ["memory"]
+    assert predictor.image_input_name == "images"
+    assert predictor.tgt_input_name == "tgt"
+    assert predictor.predict(_dark_line()) == "AB"
+    assert predictor.predict(_blank_line()) == ""
+
+
+def test_split_predictor_runs_encoder_once(toy_model_dir):
+    encoder_path, decoder_path = _split(toy_model_dir)
+    predictor = Predictor(
+        toy_model_dir / MODEL_FILENAME,
+        config_path=toy_model_dir / CONFIG_FILENAME,
+        device="cpu",
+        encoder_path=encoder_path,
+        decoder_path=decoder_path,
+    )
+    calls = {"encoder": 0, "decoder": 0}
+
+    class Counting:
+        def __init__(self, session, key):
+            self._session = session
+            self._key = key
+
+        def __getattr__(self, name):
+            return getattr(self._session, name)
+
+        def run(self, *args, **kwargs):
+            calls[self._key] += 1
+            return self._session.run(*args, **kwargs)
+
+        def run_with_iobinding(self, binding):
+            calls[self._key] += 1
+            return self._session.run_with_iobinding(binding)
+
+    predictor.encoder_session = Counting(predictor.encoder_session, "encoder")
+    predictor.session = Counting(predictor.session, "decoder")
+    assert predictor.predict(_dark_line()) == "AB"
+    assert calls == {"encoder": 1, "decoder": 3}
+
+
+def test_ensure_artifacts_reports_split_graphs(toy_model_dir):
+    from mer.artifacts import ensure_artifacts
+
+    artifacts = ensure_artifacts(local_dir=toy_model_dir)
+    assert not artifacts.is_split
+
+    pytest.importorskip("onnx")
+    artifacts = ensure_artifacts(local_dir=toy_model_dir, split=True)
+    assert artifacts.is_split
+    assert artifacts.encoder == toy_model_dir / ENCODER_FILENAME
+    assert artifacts.decoder == toy_model_dir / DECODER_FILENAME
+
+
+def test_incremental_decoder_uses_past_key_values(toy_model_dir):
+    from conftest import build_toy_incremental_decoder
+
+    encoder_path, decoder_path = _split(toy_model_dir)
+    build_toy_incremental_decoder(decoder_path)
+    predictor = Predictor(
+        toy_model_dir / MODEL_FILENAME,
+        config_path=toy_model_dir / CONFIG_FILENAME,
+        device="cpu",
+        encoder_path=encoder_path,
+        decoder_path=decoder_path,
+    )
+    assert predictor.is_incremental
+    assert predictor.past_names == ["past_key_values.0.key"]
+    assert predictor.present_names == ["present.0.key"]
+
+    seen = []
+    session = predictor.session
+
+    class Recording:
+        def __getattr__(self, name):
+            return getattr(session, name)
+
+        def run(self, output_names, feeds):
+            seen.append((feeds["tgt"].shape, feeds["past_key_values.0.key"].shape[2]))
+            return session.run(output_names, feeds)
+
+    predictor.session = Recording()
+    assert predictor.predict(_dark_line()) == "AB"
+    assert predictor.predict(_blank_line()) == ""
+    assert seen[:3] == [((1, 1), 0), ((1, 1), 1), ((1, 1), 2)]
+
+
+def test_predict_batch_stops_when_all_rows_finish(toy_model_dir):
+    predictor = Predictor(toy_model_dir / MODEL_FILENAME, config_path=toy_model_dir / CONFIG_FILENAME, device="cpu")
+    calls = []
+    session = predictor.session
+
+    class Counting:
+        def __getattr__(self, name):
+            return getattr(session, name)
+
+        def run(self, output_names, feeds):
+            calls.append(feeds["images"].shape[0])
+            return session.run(output_names, feeds)
+
+        def run_with_iobinding(self, binding):
+            session.run_with_iobinding(binding)
+            calls.append(binding.get_outputs()[0].shape()[0])
+
+    predictor.session = Counting()
+    images = [_dark_line(), _blank_line(), _dark_line(), _blank_line()]
+    assert predictor.predict_batch(images) == ["AB", "", "AB", ""]
+    assert calls == [4, 4, 4]
+    assert predictor.predict_batch([]) == []
+
+
+def test_incremental_predict_batch(toy_model_dir):
+    from conftest import build_toy_incremental_decoder
+
+    encoder_path, decoder_path = _split(toy_model_dir)
+    build_toy_incremental_decoder(decoder_path)
+    predictor = Predictor(
+        toy_model_dir / MODEL_FILENAME,
+        config_path=toy_model_dir / CONFIG_FILENAME,
+        device="cpu",
+        encoder_path=encoder_path,
+        decoder_path=decoder_path,
+    )
+    assert predictor.predict_batch([_blank_line(), _dark_line()]) == ["", "AB"]
+
+
+def test_numpy_preprocessing_matches_torchvision(toy_model_dir):
+    transforms = pytest.importorskip("torchvision.transforms")
+    predictor = Predictor(toy_model_dir / MODEL_FILENAME, config_path=toy_model_dir / CONFIG_FILENAME, device="cpu")
+    rng = np.random.default_rng(0)
+    image = Image.fromarray(rng.integers(0, 256, (37, 91, 3), dtype=np.uint8))
+    reference = transforms.Compose(
+        [
+            transforms.Resize((predictor.hparams["img_height"], predictor.hparams["img_width"])),
+            transforms.ToTensor(),
+            transforms.Normalize(mean=[0.485, 0.456, 0.406], std=[0.229, 0.224, 0.225]),
+        ]
+    )(image)
+    prepared = predictor._prepare_image(image)
+    assert prepared.dtype == np.float32
+    np.testing.assert_allclose(prepared[0], reference.numpy(), atol=1e-5)
+
+    batch = predictor._prepare_batch([image, image])
+    np.testing.assert_allclose(batch[1], reference.numpy(), atol=1e-5)
+    assert predictor._prepare_batch([image]).base is batch.base
+
+
+def test_clone_shares_session_with_own_buffers(toy_model_dir):
+    predictor = Predictor(
+        toy_model_dir / MODEL_FILENAME,
+        config_path=toy_model_dir / CONFIG_FILENAME,
+        device="cpu",
+        intra_op_num_threads=1,
+        inter_op_num_threads=1,
+    )
+    assert predictor.session.get_session_options().intra_op_num_threads == 1
+    predictor.predict_batch([_dark_line()])
+
+    twin = predictor.clone()
+    assert twin.session is predictor.session
+    assert twin.vocab is predictor.vocab
+    assert twin._input_buffer is None
+    assert twin.predict_batch([_dark_line(), _blank_line()]) == ["AB", ""]
+    assert twin._input_buffer is not predictor._input_buffer
+
+
+def test_optimized_model_is_cached_and_reused(toy_model_dir, tmp_path):
+    options = {"graph_optimization_level": "extended", "execution_mode": "sequential", "enable_mem_pattern": False}
+    cache = tmp_path / "optimized"
+    kwargs = dict(config_path=toy_model_dir / CONFIG_FILENAME, device="cpu", session_options=options)
+
+    first = Predictor(toy_model_dir / MODEL_FILENAME, optimized_model_dir=cache, **kwargs)
+    cached = list(cache.iterdir())
+    assert len(cached) == 1 and cached[0].suffix == ".ort"
+    mtime = cached[0].stat().st_mtime_ns
+
+    second = Predictor(toy_model_dir / MODEL_FILENAME, optimized_model_dir=cache, **kwargs)
+    assert list(cache.iterdir()) == cached and cached[0].stat().st_mtime_ns == mtime
+    assert first.predict(_dark_line()) == second.predict(_dark_line()) == "AB"
+
+    # Different options get their own entry; a corrupt entry is rebuilt.
+    Predictor(toy_model_dir / MODEL_FILENAME, optimized_model_dir=cache, **{**kwargs, "session_options": {}})
+    assert len(list(cache.iterdir())) == 2
+    cached[0].write_bytes(b"truncated")
+    assert Predictor(toy_model_dir / MODEL_FILENAME, optimized_model_dir=cache, **kwargs).predict(_blank_line()) == ""
+
+    with pytest.raises(ValueError):
+        Predictor(toy_model_dir / MODEL_FILENAME, **{**kwargs, "session_options": {"graph_optimization_level": "max"}})
+    with pytest.raises(ValueError):
+        Predictor(toy_model_dir / MODEL_FILENAME, **{**kwargs, "session_options": {"no_such_option": 1}})
+
+
+def test_ensure_artifacts_quantizes_int8_variants(toy_model_dir):
+    pytest.importorskip("onnxruntime.quantization")
+    from mer.artifacts import ensure_artifacts
+
+    artifacts = ensure_artifacts(local_dir=toy_model_dir, split=True, precision="int8")
+    assert artifacts.precision == "int8"
+    assert [path.name for path in (artifacts.weights, artifacts.encoder, artifacts.decoder)] == [
+        "khmer_ocr_int8.onnx",
+        "khmer_ocr_encoder_int8.onnx",
+        "khmer_ocr_decoder_int8.onnx",
+    ]
+    assert all(path.exists() for path in (artifacts.weights, artifacts.encoder, artifacts.decoder))
+
+    predictor = Predictor(
+        artifacts.weights,
+        config_path=artifacts.config,
+        device="cpu",
+        encoder_path=artifacts.encoder,
+        decoder_path=artifacts.decoder,
+    )
+    assert predictor.predict_batch([_dark_line(), _blank_line()]) == ["AB", ""]
+    with pytest.raises(ValueError):
+        ensure_artifacts(local_dir=toy_model_dir, precision="int4")
+
+
+def test_int8_falls_back_to_local_quantization_when_not_published(toy_model_dir, tmp_path, monkeypatch):
+    pytest.importorskip("onnxruntime.quantization")
+    from mer import artifacts as artifacts_module
+
+    requested = []
+
+    def fake_download(repo_id, filename, local_dir, local_dir_use_symlinks):
+        requested.append(filename)
+        if filename not in (MODEL_FILENAME, CONFIG_FILENAME):
+            raise FileNotFoundError(filename)
+        return shutil.copy(toy_model_dir / filename, local_dir / filename)
+
+    class FakeProgress:
+        def __init__(self, total, **kwargs):
+            self.total, self.done, self.closed = total, 0, False
+            progress.append(self)
+
+        def update(self):
+            assert not self.closed
+            self.done += 1
+
+        def close(self):
+            self.closed = True
+
+    progress = []
+    monkeypatch.setattr(artifacts_module, "hf_hub_download", fake_download)
+    monkeypatch.setattr(artifacts_module, "tqdm", FakeProgress)
+    artifacts = artifacts_module.ensure_artifacts(cache_dir=tmp_path, show_progress=False, precision="int8")
+    assert requested == [MODEL_FILENAME, CONFIG_FILENAME, "khmer_ocr_int8.onnx"]
+    assert [(bar.total, bar.done, bar.closed) for bar in progress] == [(3, 3, True)]
+    assert artifacts.weights == tmp_path / "khmer_ocr_int8.onnx" and artifacts.weights.exists()
+
+    import onnx
+
+    op_types = {node.op_type for node in onnx.load(str(artifacts.weights)).graph.node}
+    assert "DequantizeLinear" in op_types
+
+
+def test_io_bound_decode_reuses_logits_buffer(toy_model_dir):
+    predictor = Predictor(toy_model_dir / MODEL_FILENAME, config_path=toy_model_dir / CONFIG_FILENAME, device="cpu")
+    predictor._logits_dim = None  # as if the vocabulary axis were symbolic in the graph
+    assert predictor.predict_batch([_dark_line(), _blank_line()]) == ["AB", ""]
+    assert predictor._logits_dim == 5
+    buffer = predictor._logits_buffer
+    assert predictor.predict(_dark_line()) == "AB"
+    assert predictor.predict_batch([_blank_line(), _dark_line()]) == ["", "AB"]
+    assert predictor._logits_buffer is buffer
+
+
+@pytest.mark.parametrize("emit", ["logits", "token"])
+def test_last_position_rewrite_hoists_gather_above_projection(tmp_path, emit):
+    onnx = pytest.importorskip("onnx")
+    from conftest import build_toy_model, write_toy_config
+    from mer.export import gather_last_position
+
+    model_path = build_toy_model(tmp_path / MODEL_FILENAME, projection=True)
+    write_toy_config(tmp_path / CONFIG_FILENAME)
+    rewritten = gather_last_position(model_path, emit=emit)
+    assert rewritten == tmp_path / "khmer_ocr_lastpos.onnx"
+
+    nodes = list(onnx.load(str(rewritten)).graph.node)
+    gather = next(node for node in nodes if node.input[:2] == ["hidden", "position"])
+    assert nodes.index(gather) < next(i for i, node in enumerate(nodes) if node.op_type == "MatMul")
+
+    predictor = Predictor(rewritten, config_path=tmp_path / CONFIG_FILENAME, device="cpu")
+    assert predictor.is_last_position and predictor.emits_tokens == (emit == "token")
+    assert predictor.predict_batch([_dark_line(), _blank_line(), _dark_line()]) == ["AB", "", "AB"]
+    with pytest.raises(ValueError):
+        gather_last_position(rewritten)
+
+
+def test_ensure_artifacts_last_position_with_split_graphs(toy_model_dir):
+    from mer.artifacts import ensure_artifacts
+
+    pytest.importorskip("onnx")
+    artifacts = ensure_artifacts(local_dir=toy_model_dir, split=True, last_position=True)
+    assert artifacts.last_position and artifacts.decoder.name == "khmer_ocr_decoder_lastpos.onnx"
+    predictor = Predictor(
+        artifacts.weights,
+        config_path=artifacts.config,
+        device="cpu",
+        encoder_path=artifacts.encoder,
+        decoder_path=artifacts.decoder,
+    )
+    assert predictor.is_last_position
+    assert predictor.predict_batch([_blank_line(), _dark_line()]) == ["", "AB"]
+
+
+@pytest.mark.parametrize("corpus", [[], ["AB"], ["BA", "BBBB"]])
+@pytest.mark.parametrize("max_length", [2, 8])
+def test_speculative_decoding_matches_greedy(toy_model_dir, corpus, max_length):
+    from mer.draft import NgramDrafter
+    from mer.instrument import Trace
+
+    kwargs = dict(config_path=toy_model_dir / CONFIG_FILENAME, device="cpu", max_length=max_length)
+    greedy = Predictor(toy_model_dir / MODEL_FILENAME, **kwargs)
+    drafter = NgramDrafter.from_texts(greedy.vocab, corpus)
+    speculative = Predictor(toy_model_dir / MODEL_FILENAME, drafter=drafter, **kwargs)
+    assert speculative.is_speculative
+
+    images = [_dark_line(), _blank_line(), _dark_line()]
+    for _ in range(2):  # the second pass drafts from what the first one decoded
+        trace = Trace()
+        assert speculative.predict_batch(images, trace=trace) == greedy.predict_batch(images)
+    if max_length == 8:
+        assert trace.session_runs < 3  # plain greedy needs one call per token: A, B, <EOS>
+        if len(corpus) < 2:
+            assert trace.session_runs == 1  # all three verified in a single call
+
+
+def test_drafter_stops_after_eos(toy_model_dir):
+    vocab = Predictor(toy_model_dir / MODEL_FILENAME, config_path=toy_model_dir / CONFIG_FILENAME, device="cpu").vocab
+    drafter = NgramDrafter()
+    drafter.observe(vocab.encode("AB") + vocab.encode("AB"))  # a context that runs past <EOS>
+    eos = vocab.char2idx["<EOS>"]
+    prefix = vocab.encode("A")[:-1]
+    assert len(drafter.propose(prefix, 6)) == 6
+    assert drafter.propose(prefix, 6, stop=eos) == [vocab.char2idx["B"], eos]
+
+
+def _toy_predictor(model_dir, variant, transitions=None):
+    kwargs = dict(config_path=model_dir / CONFIG_FILENAME, device="cpu")
+    if variant != "monolithic":
+        kwargs["encoder_path"], kwargs["decoder_path"] = _split(model_dir)
+    if variant == "incremental":
+        from conftest import build_toy_incremental_decoder
+
+        build_toy_incremental_decoder(kwargs["decoder_path"], transitions=transitions)
+    return Predictor(model_dir / MODEL_FILENAME, **kwargs)
+
+
+@pytest.mark.parametrize("variant", ["monolithic", "split", "incremental"])
+def test_scored_decoding_reports_model_log_probs(toy_model_dir, variant):
+    import onnxruntime as ort
+
+    reference_session = ort.InferenceSession(str(toy_model_dir / MODEL_FILENAME), providers=["CPUExecutionProvider"])
+    predictor = _toy_predictor(toy_model_dir, variant)
+    dark, blank = predictor.predict_scored([_dark_line(), _blank_line()])
+    assert dark["text"] == "AB" and [char["char"] for char in dark["chars"]] == ["A", "B"]
+    assert blank["text"] == "" and blank["chars"] == [] and blank["log_prob"] < 0
+
+    tgt = np.array([[1, 3, 4]], dtype=np.int64)  # <SOS> A B
+    logits = reference_session.run(None, {"images": predictor.preprocess(_dark_line()), "tgt": tgt})[0][0]
+    log_probs = logits - logits.max(axis=-1, keepdims=True)
+    log_probs -= np.log(np.exp(log_probs).sum(axis=-1, keepdims=True))
+    expected = [log_probs[0, 3], log_probs[1, 4], log_probs[2, 2]]  # A, B, <EOS>
+    assert [char["log_prob"] for char in dark["chars"]] == pytest.approx(expected[:2], abs=1e-5)
+    assert dark["log_prob"] == pytest.approx(sum(expected), abs=1e-5)
+
+    beam = predictor.predict_scored([_dark_line(), _blank_line()], decode="beam", beam_width=3)
+    assert [result["text"] for result in beam] == ["AB", ""]
+    assert [result["log_prob"] for result in beam] == pytest.approx([dark["log_prob"], blank["log_prob"]], abs=1e-5)
+    with pytest.raises(ValueError):
+        predictor.predict_scored([_dark_line()], decode="sample")
+
+
+def _greedy_loop_model(model_dir):
+    """Toy model whose greedy decode of dark images repeats A until max_length."""
+    from conftest import build_toy_model, write_toy_config
+
+    build_toy_model(model_dir / MODEL_FILENAME, transitions=loop_transitions())
+    write_toy_config(model_dir / CONFIG_FILENAME)
+    return model_dir
+
+
+def test_beam_search_recovers_from_a_greedy_mistake(tmp_path):
+    _greedy_loop_model(tmp_path)
+    predictor = Predictor(tmp_path / MODEL_FILENAME, config_path=tmp_path / CONFIG_FILENAME, device="cpu")
+
+    greedy = predictor.predict_scored([_dark_line()])[0]
+    assert greedy["text"] == "A" * 7  # runs into max_length
+
+    calls = []
+    session = predictor.session
+
+    class Counting:
+        def __getattr__(self, name):
+            return getattr(session, name)
+
+        def run(self, output_names, feeds):
+            calls.append(feeds["images"].shape[0])
+            return session.run(output_names, feeds)
+
+    predictor.session = Counting()
+    beams = predictor.predict_scored([_dark_line(), _dark_line()], decode="beam", beam_width=3)
+    assert [result["text"] for result in beams] == ["B", "B"]
+    assert beams[0]["log_prob"] > greedy["log_prob"]
+    assert calls == [6, 6]  # both images' beams in one call per step: B, then <EOS>
+
+
+def test_array_and_buffer_inputs_match_pil(toy_model_dir):
+    from mer.images import from_array
+
+    predictor = Predictor(toy_model_dir / MODEL_FILENAME, config_path=toy_model_dir / CONFIG_FILENAME, device="cpu")
+    gray = np.random.default_rng(0).integers(0, 256, (37, 91), dtype=np.uint8)
+    reference = predictor._prepare_image(Image.fromarray(gray).convert("RGB"))
+    for pixels in (gray, memoryview(gray), gray[:, :, None], np.repeat(gray[:, :, None], 3, axis=2)):
+        np.testing.assert_allclose(predictor._prepare_image(pixels), reference, atol=1e-5)
+    assert predictor.predict(np.zeros((20, 64), dtype=np.uint8)) == "AB"
+
+    shared = from_array(gray)
+    gray[0, 0] = 255 - gray[0, 0]
+    assert shared.getpixel((0, 0)) == gray[0, 0]
+
+    with pytest.raises(ValueError):
+        from_array(gray.astype(np.float32))
+    with pytest.raises(ValueError):
+        from_array(np.zeros((4, 4, 4), dtype=np.uint8))
+
+
+def test_jpeg_lines_are_draft_decoded_near_model_size(toy_model_dir, tmp_path):
+    from mer.images import open_image
+
+    predictor = Predictor(toy_model_dir / MODEL_FILENAME, config_path=toy_model_dir / CONFIG_FILENAME, device="cpu")
+    width, height = predictor.input_size
+    path = tmp_path / "line.jpg"
+    Image.new("RGB", (width * 4 + 7, height * 4 + 3), color="black").save(path, quality=90)
+
+    drafted = open_image(path, draft_size=predictor.input_size)
+    assert drafted.size == (width + 2, height + 1)
+    assert open_image(path.read_bytes(), draft_size=predictor.input_size).size == drafted.size
+    assert open_image(path).size == (width * 4 + 7, height * 4 + 3)
+    assert predictor.predict(path) == "AB"
+
+
+def _ink_box(width, height, size=(64, 20)):
+    """Dark line image with one light `width` x `height` block of "text"."""
+    image = Image.new("RGB", size, color="black")
+    image.paste("white", (4, 4, 4 + width, 4 + height))
+    return image
+
+
+@pytest.mark.parametrize("variant", ["monolithic", "split", "incremental", "speculative"])
+def test_step_budgets_follow_the_inked_width(tmp_path, variant):
+    from mer.instrument import Trace
+
+    model_dir = _greedy_loop_model(tmp_path)
+    predictor = _toy_predictor(model_dir, "monolithic" if variant == "speculative" else variant, loop_transitions())
+    if variant == "speculative":
+        predictor.drafter, predictor.draft_tokens = NgramDrafter.from_texts(predictor.vocab, ["AAAAAAA"]), 4
+    wide, narrow = _ink_box(24, 8), _ink_box(8, 8)
+    assert predictor.predict(wide) == "A" * 7  # no budget: runs into max_length
+
+    predictor.length_rate, predictor.length_margin = 1.0, 2
+    budgets = [predictor.step_budget(wide), predictor.step_budget(narrow)]
+    assert budgets[0] > budgets[1] >= 3 and budgets[0] < 7
+    assert predictor.step_budget(_ink_box(0, 0)) == 2  # blank: the margin only
+    trace = Trace()
+    texts = predictor.predict_batch([wide, narrow], trace=trace)
+    assert [len(text) for text in texts] == budgets
+    assert texts == [predictor.predict(wide), predictor.predict(narrow)]
+    assert trace.length_capped == 2 and trace.decode_steps <= budgets[0]
+
+    array, budget = predictor.prepare(narrow)
+    assert budget == budgets[1]
+    assert predictor.decode_batch(array, budgets=np.array([budget])) == [texts[1]]
+    if variant != "speculative":
+        scored = predictor.predict_scored([wide, narrow])
+        assert [result["text"] for result in scored] == texts
+        assert [len(result["chars"]) for result in scored] == budgets
+
+
+@pytest.mark.parametrize("variant", ["monolithic", "incremental", "speculative"])
+def test_loop_window_stops_repeating_output(tmp_path, variant):
+    from mer.instrument import Trace
+
+    model_dir = _greedy_loop_model(tmp_path)
+    predictor = _toy_predictor(model_dir, "monolithic" if variant == "speculative" else variant, loop_transitions())
+    if variant == "speculative":
+        predictor.drafter, predictor.draft_tokens = NgramDrafter.from_texts(predictor.vocab, ["AAAAAAA"]), 4
+    predictor.loop_window = 4
+    trace = Trace()
+    assert predictor.predict_batch([_dark_line(), _blank_line()], trace=trace) == ["AAAA", ""]
+    assert trace.loop_stopped == 1
+    assert trace.decode_steps == (1 if variant == "speculative" else 4)  # the drafted loop is verified at once
+    with pytest.raises(ValueError):
+        Predictor(model_dir / MODEL_FILENAME, config_path=model_dir / CONFIG_FILENAME, device="cpu", loop_window=3)
+
+
+@pytest.mark.parametrize("variant", ["monolithic", "split", "incremental", "speculative"])
+def test_scheduled_batches_order_by_length_and_refill_slots(tmp_path, variant):
+    from mer.instrument import Trace
+
+    model_dir = _greedy_loop_model(tmp_path)
+    predictor = _toy_predictor(model_dir, "monolithic" if variant == "speculative" else variant, loop_transitions())
+    if variant == "speculative":
+        predictor.drafter, predictor.draft_tokens = NgramDrafter.from_texts(predictor.vocab, ["A"]), 4
+    predictor.length_rate, predictor.length_margin = 1.0, 0
+    images = [_ink_box(8, 8), _ink_box(40, 8), _ink_box(8, 8), _blank_line(), _ink_box(16, 8), _ink_box(56, 8)]
+    assert [predictor.length_estimate(image) for image in images] == [1.0, 5.0, 1.0, 0.0, 2.0, 7.0]
+    expected = ["A", "AAAAA", "A", "", "AA", "AAAAAAA"]
+
+    fixed, scheduled = Trace(), Trace()
+    pairs = [predictor.predict_batch(images[start : start + 2], trace=fixed) for start in (0, 2, 4)]
+    assert [text for pair in pairs for text in pair] == expected
+    assert predictor.predict_batch(images, trace=scheduled, batch_size=2) == expected
+    assert scheduled.length_capped == fixed.length_capped == 5
+    if variant != "speculative":  # drafted tokens change the step counts
+        # Fixed pairs run 5 + 1 + 7 steps. Refilled slots finish the 7-step line alongside the
+        # rest in 9; decoders that cannot refill at least pair the lines by length (7 + 2 + 1).
+        assert fixed.decode_steps == 13
+        assert scheduled.decode_steps == (10 if variant == "incremental" else 9)
+    with pytest.raises(ValueError):
+        predictor.predict_batch(images, batch_size=0)
+
+    array = np.concatenate([predictor.prepare(image)[0] for image in images])
+    budgets = np.array([predictor.step_budget(image) for image in images])
+    assert predictor.decode_batch(array, budgets=budgets, batch_size=3) == expected
+    if variant != "speculative":
+        scored = predictor.predict_scored(images, batch_size=2)
+        assert scored == predictor.predict_scored(images)
+        assert [result["text"] for result in predictor.decode_scored(array, budgets=budgets, batch_size=3)] == expected
+
+    predictor.length_rate, predictor.loop_window = None, 4
+    assert predictor.predict_batch(images, batch_size=2) == ["AAAA"] * 3 + [""] + ["AAAA"] * 2
+
+
+def test_scheduled_batches_on_a_static_batch_split_graph(tmp_path):
+    from conftest import build_toy_model, write_toy_config
+
+    build_toy_model(tmp_path / MODEL_FILENAME, batch=1)
+    write_toy_config(tmp_path / CONFIG_FILENAME)
+    predictor = _toy_predictor(tmp_path, "split")
+    assert predictor.max_batch_size == 1 and predictor._memory_batch_axes() == {"memory": 0}
+    images = [_dark_line(), _blank_line(), _dark_line()]
+    assert predictor.predict_batch(images, batch_size=4) == ["AB", "", "AB"]
+    assert [result["text"] for result in predictor.predict_scored(images, batch_size=4)] == ["AB", "", "AB"]
+
+
+@pytest.mark.parametrize("variant", ["monolithic", "split"])
+def test_scheduled_batches_smaller_than_a_static_batch_dimension(tmp_path, variant):
+    from conftest import build_toy_model, write_toy_config
+
+    build_toy_model(tmp_path / MODEL_FILENAME, batch=4)
+    write_toy_config(tmp_path / CONFIG_FILENAME)
+    predictor = _toy_predictor(tmp_path, variant)
+    assert predictor.max_batch_size == 4
+    images = [_dark_line(), _blank_line(), _dark_line(), _dark_line(), _blank_line()]
+    expected = ["AB", "", "AB", "AB", ""]
+    assert predictor.predict_batch(images, batch_size=2) == expected
+    assert [result["text"] for result in predictor.predict_scored(images, batch_size=2)] == expected
+    image_array = predictor._prepare_batch(images).copy()
+    assert predictor.decode_batch(image_array, batch_size=2) == expected
+    assert [result["text"] for result in predictor.decode_scored(image_array, batch_size=2)] == expected
+
+
+@pytest.mark.parametrize("variant", ["monolithic", "split"])
+def test_static_batch_graphs_pad_the_last_chunk(tmp_path, variant):
+    from conftest import build_toy_model, write_toy_config
+
+    build_toy_model(tmp_path / MODEL_FILENAME, batch=2)
+    write_toy_config(tmp_path / CONFIG_FILENAME)
+    predictor = _toy_predictor(tmp_path, variant)
+    assert predictor.max_batch_size == 2
+    assert predictor.predict(_dark_line()) == "AB"
+    assert predictor.predict_batch([_dark_line(), _blank_line(), _dark_line()]) == ["AB", "", "AB"]
+    scored = predictor.predict_scored([_blank_line(), _dark_line(), _dark_line()])
+    assert [result["text"] for result in scored] == ["", "AB", "AB"]
+    assert scored[1] == predictor.predict_scored([_dark_line(), _blank_line()])[0]
@@ -0,0 +1,87 @@
+import threading
+
+import pytest
+
+from mer.scheduler import BatchScheduler, Overloaded
+
+
+def test_scheduler_batches_and_resolves_each_future():
+    sizes = []
+    release = threading.Event()
+
+    def run_batch(items):
+        release.wait(5)
+        sizes.append(len(items))
+        return [item * 10 for item in items]
+
+    scheduler = BatchScheduler(run_batch, max_batch_size=4, max_wait=0.2)
+    futures = [scheduler.submit(i) for i in range(6)]
+    release.set()
+    assert [f.result(timeout=5) for f in futures] == [0, 10, 20, 30, 40, 50]
+    scheduler.close(timeout=5)
+
+    assert sum(sizes) == 6 and max(sizes) <= 4
+    stats = scheduler.stats()
+    assert stats["submitted"] == stats["completed"] == 6
+    assert stats["batches"] == len(sizes)
+    assert stats["queue_depth"] == 0
+    assert sum(size * count for size, count in stats["batch_sizes"].items()) == 6
+
+
+def test_scheduler_propagates_errors_and_rejects_after_close():
+    def run_batch(items):
+        raise ValueError("boom")
+
+    scheduler = BatchScheduler(run_batch, max_batch_size=2, max_wait=0.0)
+    future = scheduler.submit("x")
+    with pytest.raises(ValueError):
+        future.result(timeout=5)
+    scheduler.close(timeout=5)
+    assert scheduler.stats()["failed"] == 1
+    with pytest.raises(RuntimeError):
+        scheduler.submit("y")
+
+
+def test_scheduler_rejects_items_beyond_max_queue_size():
+    started, release = threading.Event(), threading.Event()
+
+    def run_batch(items):
+        started.set()
+        release.wait(5)
+        return items
+
+    scheduler = BatchScheduler(run_batch, max_batch_size=1, max_wait=0.0, max_queue_size=1)
+    running = scheduler.submit("a")
+    assert started.wait(5)  # "a" left the queue, so one more item fits
+    queued = scheduler.submit("b")
+    with pytest.raises(Overloaded):
+        scheduler.submit("c")
+    release.set()
+    assert [running.result(timeout=5), queued.result(timeout=5)] == ["a", "b"]
+    scheduler.close(timeout=5)
+    assert scheduler.stats()["rejected"] == 1 and scheduler.stats()["submitted"] == 2
+    with pytest.raises(ValueError):
+        BatchScheduler(run_batch, max_queue_size=0)
+
+
+def test_scheduler_admits_several_items_all_or_nothing():
+    started, release = threading.Event(), threading.Event()
+
+    def run_batch(items):
+        started.set()
+        release.wait(5)
+        return items
+
+    scheduler = BatchScheduler(run_batch, max_batch_size=1, max_wait=0.0, max_queue_size=2)
+    running = scheduler.submit("a")
+    assert started.wait(5)
+    with pytest.raises(Overloaded):
+        scheduler.submit_many(["b", "c", "d"])
+    with pytest.raises(Overloaded):
+        scheduler.check_capacity(3)
+    assert scheduler.queue_depth() == 0  # nothing of the rejected call was queued
+    queued = scheduler.submit_many(["b", "c"])
+    release.set()
+    assert [running.result(timeout=5)] + [future.result(timeout=5) for future in queued] == ["a", "b", "c"]
+    scheduler.close(timeout=5)
+    assert scheduler.stats()["rejected"] == 6 and scheduler.stats()["submitted"] == 3
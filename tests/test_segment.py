@@ -0,0 +1,75 @@
+from pathlib import Path
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from mer.segment import crop_lines, ink_extent, ink_fraction, segment_lines
+
+SAMPLES = Path(__file__).resolve().parents[1] / "samples"
+
+
+def _synthetic_page() -> np.ndarray:
+    page = np.full((120, 200), 255, dtype=np.uint8)
+    page[10:30, 20:180] = 0  # line 1
+    page[32:35, 40:60] = 0  # detached subscript belonging to line 1
+    page[60:80, 10:100] = 0  # line 2
+    page[95:115, 30:190] = 0  # line 3
+    return page
+
+
+def test_segment_lines_finds_lines_in_reading_order():
+    boxes = segment_lines(_synthetic_page(), padding_ratio=0.0)
+    assert boxes == [(20, 10, 180, 35), (10, 60, 100, 80), (30, 95, 190, 115)]
+
+
+def test_segment_lines_blank_page():
+    assert segment_lines(np.full((50, 50, 3), 255, dtype=np.uint8)) == []
+
+
+def test_crop_lines_returns_views():
+    page = _synthetic_page()
+    crops = crop_lines(page, segment_lines(page))
+    assert len(crops) == 3
+    assert all(np.shares_memory(crop, page) for crop in crops)
+
+
+def test_segment_lines_matches_sample_ground_truth():
+    page = np.asarray(Image.open(SAMPLES / "sample_1.png").convert("RGB"))
+    expected = (SAMPLES / "sample_1_text.md").read_text(encoding="utf-8").splitlines()
+    assert len(segment_lines(page)) == len(expected)
+
+
+def test_ink_fraction_separates_blank_crops_from_text():
+    rng = np.random.default_rng(0)
+    paper = np.clip(rng.normal(235, 6, size=(40, 400)), 0, 255).astype(np.uint8)  # scanner noise
+    assert ink_fraction(paper) == 0.0
+    specks = paper.copy()
+    specks[5, 10:13] = 0
+    assert ink_fraction(specks) < 0.001
+    assert ink_fraction(255 - _synthetic_page()) == ink_fraction(_synthetic_page()) > 0.1  # either polarity
+    assert ink_fraction(np.zeros((0, 10), dtype=np.uint8)) == 0.0
+
+    page = np.asarray(Image.open(SAMPLES / "sample_3.png").convert("L"))
+    assert min(ink_fraction(crop) for crop in crop_lines(page, segment_lines(page))) > 0.05
+
+
+def test_ink_extent_spans_the_text_without_margins():
+    image = np.full((20, 60), 255, dtype=np.uint8)
+    image[5:13, 10:40] = 0
+    image[15, 50] = 0  # a detached mark still counts
+    assert ink_extent(image) == (41, 11)
+    assert ink_extent(np.full((20, 60), 255, dtype=np.uint8)) == (0, 0)
+
+
+@pytest.mark.parametrize("name", ["sample_1", "sample_4", "sample_5"])
+def test_default_length_budget_covers_sample_lines(name):
+    # Mer's default budget is 6 tokens per text height of inked width plus 8; the bundled
+    # lines stay within 5 characters (tokens) per text height, leaving 20% headroom.
+    page = np.asarray(Image.open(SAMPLES / f"{name}.png").convert("L"))
+    expected = (SAMPLES / f"{name}_text.md").read_text(encoding="utf-8").splitlines()
+    crops = crop_lines(page, segment_lines(page))
+    assert len(crops) == len(expected)
+    for crop, text in zip(crops, expected):
+        width, height = ink_extent(crop)
+        assert len(text) <= 5.0 * width / height + 8
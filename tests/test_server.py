@@ -0,0 +1,177 @@
+import asyncio
+import http.client
+import io
+import json
+import threading
+
+import numpy as np
+
+from mer import Mer
+from mer.server import OcrServer
+from conftest import inked_line
+
+
+def _png(image):
+    buffer = io.BytesIO()
+    image.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def _npy(array):
+    buffer = io.BytesIO()
+    np.save(buffer, array)
+    return buffer.getvalue()
+
+
+def _multipart(files, boundary="mer-test-boundary"):
+    body = b""
+    for idx, data in enumerate(files):
+        body += (
+            f"--{boundary}\r\nContent-Disposition: form-data; name=\"image\"; filename=\"{idx}.png\"\r\n"
+            "Content-Type: image/png\r\n\r\n"
+        ).encode() + data + b"\r\n"
+    return body + f"--{boundary}--\r\n".encode(), f"multipart/form-data; boundary={boundary}"
+
+
+def _request(port, method, path, body=None, content_type="application/octet-stream"):
+    connection = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+    headers = {"Content-Type": content_type} if body is not None else {}
+    connection.request(method, path, body=body, headers=headers)
+    response = connection.getresponse()
+    payload = json.loads(response.read())
+    connection.close()
+    return response.status, payload, dict(response.getheaders())
+
+
+def _with_server(ocr, scenario):
+    async def main():
+        server = OcrServer(ocr, port=0)
+        port = await server.start()
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(None, scenario, port)
+        finally:
+            await server.close()
+
+    try:
+        return asyncio.run(main())
+    finally:
+        ocr.close()
+
+
+def test_server_recognizes_files_batches_and_arrays(toy_model_dir):
+    dark = _png(inked_line())
+
+    def scenario(port):
+        assert _request(port, "POST", "/recognize", dark)[:2] == (200, {"text": "AB"})
+        status, scored, _ = _request(port, "POST", "/recognize?json=1&decode=beam&beam_width=2", dark)
+        assert status == 200 and scored["text"] == "AB" and scored["log_prob"] < 0
+
+        body, content_type = _multipart([dark, _png(inked_line("white"))])
+        status, batch, _ = _request(port, "POST", "/recognize", body, content_type)
+        assert status == 200 and [result["text"] for result in batch["results"]] == ["AB", ""]
+
+        gray = np.asarray(inked_line().convert("L"))
+        assert _request(port, "POST", "/recognize", _npy(gray))[:2] == (200, {"text": "AB"})
+        status, batch, _ = _request(port, "POST", "/recognize", _npy(np.stack([gray[:, :, None]] * 3)))
+        assert status == 200 and batch == {"results": [{"text": "AB"}] * 3}
+
+        assert _request(port, "POST", "/recognize", b"not an image")[0] == 400
+        assert _request(port, "POST", "/recognize", _npy(gray.astype(np.float32)))[0] == 400
+        assert _request(port, "POST", "/recognize?decode=sampling", dark)[0] == 400
+        assert _request(port, "GET", "/recognize")[0] == 405
+        assert _request(port, "GET", "/nowhere")[0] == 404
+        assert _request(port, "GET", "/health")[:2] == (200, {"status": "ok"})
+        return _request(port, "GET", "/metrics")[1]
+
+    metrics = _with_server(Mer(model_path=toy_model_dir, device="cpu"), scenario)
+    assert metrics["requests"]["by_status"] == {"200": 6, "400": 3, "404": 1, "405": 1}
+    assert metrics["lines"] == 8
+    assert metrics["latency_ms"]["count"] == 5
+    assert sum(metrics["latency_ms"]["buckets"].values()) == 5
+    assert metrics["batching"]["completed"] == 8  # rejected inputs never reach the scheduler
+    assert sum(int(size) * count for size, count in metrics["batching"]["batch_sizes"].items()) == 8
+
+
+def test_server_answers_429_when_the_batching_queue_is_full(toy_model_dir):
+    ocr = Mer(model_path=toy_model_dir, device="cpu", batch_max_size=1, batch_max_wait=0.0, batch_max_queue=1)
+    started, release = threading.Event(), threading.Event()
+    predict_images = ocr._predict_images
+
+    def blocking_predict_images(images, trace=None, decoding=None):
+        started.set()
+        release.wait(10)
+        return predict_images(images, trace=trace, decoding=decoding)
+
+    ocr._predict_images = blocking_predict_images
+    dark = _png(inked_line())
+
+    def scenario(port):
+        responses = {}
+
+        def send(name):
+            responses[name] = _request(port, "POST", "/recognize", dark)
+
+        first = threading.Thread(target=send, args=("running",))
+        first.start()
+        assert started.wait(10)
+        second = threading.Thread(target=send, args=("queued",))
+        second.start()
+        while ocr.batching_stats()["queue_depth"] < 1:
+            threading.Event().wait(0.01)
+        responses["rejected"] = _request(port, "POST", "/recognize", dark)
+        release.set()
+        first.join(10)
+        second.join(10)
+        return responses, _request(port, "GET", "/metrics")[1]
+
+    responses, metrics = _with_server(ocr, scenario)
+    assert responses["running"][:2] == responses["queued"][:2] == (200, {"text": "AB"})
+    status, payload, headers = responses["rejected"]
+    assert status == 429 and "overloaded" in payload["error"] and headers["Retry-After"] == "1"
+    assert metrics["requests"]["by_status"] == {"200": 2, "429": 1}
+    assert metrics["batching"]["rejected"] == 1
+
+
+def test_server_rejects_a_batch_as_a_whole(toy_model_dir):
+    ocr = Mer(model_path=toy_model_dir, device="cpu", batch_max_size=1, batch_max_wait=0.0, batch_max_queue=2)
+    started, release = threading.Event(), threading.Event()
+    predict_images, coerce_image = ocr._predict_images, ocr._coerce_image
+    coerced = []
+
+    def blocking_predict_images(images, trace=None, decoding=None):
+        started.set()
+        release.wait(10)
+        return predict_images(images, trace=trace, decoding=decoding)
+
+    def counting_coerce_image(image):
+        coerced.append(image)
+        return coerce_image(image)
+
+    ocr._predict_images, ocr._coerce_image = blocking_predict_images, counting_coerce_image
+    dark = _png(inked_line())
+
+    def scenario(port):
+        responses = {}
+        first = threading.Thread(target=lambda: responses.setdefault("running", _request(port, "POST", "/recognize", dark)))
+        first.start()
+        assert started.wait(10)
+        body, content_type = _multipart([dark] * 3)  # two of the three lines would fit
+        responses["rejected"] = _request(port, "POST", "/recognize", body, content_type)
+        release.set()
+        first.join(10)
+        return responses, ocr.batching_stats()
+
+    responses, stats = _with_server(ocr, scenario)
+    assert responses["running"][:2] == (200, {"text": "AB"})
+    assert responses["rejected"][0] == 429
+    assert len(coerced) == 1  # none of the rejected request's images was decoded...
+    assert stats["submitted"] == stats["completed"] == 1  # ...or queued
+    assert stats["rejected"] == 3
+
+
+def test_serve_cli_is_registered():
+    from mer.cli import build_parser
+
+    args = build_parser().parse_args(["serve", "--port", "0", "--max-queue", "8", "--device", "cpu"])
+    assert (args.port, args.max_queue, args.max_batch_size) == (0, 8, 16)